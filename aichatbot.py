@@ -11,6 +11,8 @@ from pygame import mixer
 import cv2
 from flask import Flask, render_template_string, request, jsonify
 
+from camera_service import CameraClient
+
 # ESP8266 Serial Configuration
 BAUD_RATE = 115200
 
@@ -44,6 +46,9 @@ mic = sr.Microphone()
 # Flask app for web control
 app = Flask(__name__)
 
+# Frames from camera_service.py when it is running (it owns the camera)
+camera = CameraClient()
+
 # Microphone control
 mic_lock = threading.Lock()
 current_mic_source = "raspberry_pi"  # "raspberry_pi" or "phone"
@@ -91,8 +96,23 @@ def rotate_in_place(step_time=0.4):
 # ===== Camera / Explore Helpers ===== #
 def capture_image(index: int):
     filename = f"explore_{index}.jpg"
-    
-    # Try Raspberry Pi camera first
+
+    # While the camera service runs it holds the camera: take its next
+    # frame instead of opening the device a second time
+    if camera.available():
+        try:
+            found = camera.capture(newer_than=time.monotonic(), timeout=3.0)
+        except Exception as e:
+            print(f"[CAMERA] Camera service error: {e}")
+            found = None
+        if found is not None:
+            with open(filename, 'wb') as f:
+                f.write(found[2])
+            print(f"Captured image: {filename} (camera service frame {found[0]})")
+            return filename
+        print("[CAMERA] No frame from the camera service, opening the camera directly")
+
+    # No (working) camera service: try the Raspberry Pi camera first
     try:
         import subprocess
         result = subprocess.run(
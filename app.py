@@ -2,26 +2,33 @@ from flask import Flask, render_template, request, jsonify, Response
 import cv2
 import requests
 import numpy as np
+import os
 import socket
 import threading
 import time
 from threading import Thread
 
+from frame_hub import FrameHub
+from lazy_frame import LazyFrame
+from mjpeg_demux import MJPEGDemuxer
+
 app = Flask(__name__)
 
 # Configuration
-ESP32_STREAM_URL = "http://10.30.152.68/stream"
-ESP8266_IP = "10.30.152.186"
-ESP8266_PORT = 8888
+ESP32_STREAM_URL = os.environ.get("ESP32_STREAM_URL", "http://10.30.152.68/stream")
+ESP8266_IP = os.environ.get("ESP8266_IP", "10.30.152.186")
+ESP8266_PORT = int(os.environ.get("ESP8266_PORT", 8888))
+VIDEO_PASS_THROUGH = True  # Relay the ESP32's JPEGs to /video_feed as received (False: decode + re-encode)
 
 # Global state
 current_mode = "manual"  # manual, human_follow, object_follow
 robot_status = "stopped"
 udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+video_hub = FrameHub()
 
 class VideoStream:
     def __init__(self):
-        self.frame = None
+        self.latest = LazyFrame()  # camera JPEG; pixels decoded only when asked for
         self.running = True
         self.thread = Thread(target=self.update)
         self.thread.daemon = True
@@ -30,27 +37,35 @@ class VideoStream:
     def update(self):
         try:
             stream = requests.get(ESP32_STREAM_URL, stream=True, timeout=5)
-            bytes_data = b''
+            demuxer = MJPEGDemuxer()
             for chunk in stream.iter_content(chunk_size=2048):
                 if not self.running:
                     break
-                bytes_data += chunk
-                a = bytes_data.find(b'\xff\xd8')
-                b = bytes_data.find(b'\xff\xd9')
-                if a != -1 and b != -1:
-                    jpg = bytes_data[a:b+2]
-                    bytes_data = bytes_data[b+2:]
-                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                jpg = demuxer.latest(chunk)
+                if jpg is None:
+                    continue
+                self.latest.set_jpeg(jpg)
+                if not video_hub.has_clients():
+                    continue
+                if VIDEO_PASS_THROUGH:
+                    video_hub.publish(jpg)
+                else:
+                    _, frame = self.latest.pixels()
                     if frame is not None:
-                        self.frame = frame
+                        ret, buffer = cv2.imencode('.jpg', frame)
+                        if ret:
+                            video_hub.publish(buffer.tobytes())
         except Exception as e:
             print(f"Stream error: {e}")
+
+    @property
+    def frame(self):
+        """Newest frame as a BGR array, decoded on first access"""
+        return self.latest.pixels()[1]
     
     def get_frame(self):
-        if self.frame is not None:
-            ret, buffer = cv2.imencode('.jpg', self.frame)
-            return buffer.tobytes()
-        return None
+        """Latest JPEG published to /video_feed clients"""
+        return video_hub.latest()[1]
 
 video_stream = VideoStream()
 
@@ -78,15 +93,13 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    def generate():
-        while True:
-            frame = video_stream.get_frame()
-            if frame:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            time.sleep(0.1)
-    
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(video_hub.stream(request.remote_addr), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video_stats')
+def video_stats():
+    stats = video_hub.stats()
+    stats["camera"] = video_stream.latest.stats()
+    return jsonify(stats)
 
 @app.route('/control', methods=['POST'])
 def control():
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""FOMO heatmap decoding cost: old dequantize + argmax path vs FomoDecoder.
+
+  python bench_fomo_decoder.py                       # synthetic heatmaps
+  python bench_fomo_decoder.py heatmaps.npy          # recorded (N, H, W, C) int8 heatmaps
+  python bench_fomo_decoder.py --record frames/ -o heatmaps.npy   # run the model over JPEGs
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from fomo_decoder import FomoDecoder
+from inference_engine import InferenceEngine
+
+FRAME_W = 640
+FRAME_H = 480
+
+
+def record_heatmaps(model, frames_dir):
+    import cv2
+    from tflite_preprocess import InputPreprocessor
+
+    engine = InferenceEngine(model)
+    preprocess = InputPreprocessor(engine.interpreter)
+    heatmaps = []
+    for path in sorted(glob.glob(os.path.join(frames_dir, '*.jpg'))):
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        preprocess(frame)
+        engine.invoke()
+        heatmaps.append(engine.output().copy())
+    return np.stack(heatmaps)
+
+
+def synthetic_heatmaps(detail, count):
+    """Background-dominated heatmaps with 0-3 person blobs each"""
+    _, grid_h, grid_w, channels = detail['shape']
+    rng = np.random.default_rng(0)
+    heatmaps = np.full((count, grid_h, grid_w, channels), -128, dtype=np.int8)
+    heatmaps[..., 0] = 127
+    for hm in heatmaps:
+        for _ in range(rng.integers(0, 4)):
+            y, x = rng.integers(0, grid_h - 2), rng.integers(0, grid_w - 2)
+            h, w = rng.integers(1, 4, size=2)
+            hm[y:y + h, x:x + w, 1] = rng.integers(-60, 127)
+            hm[y:y + h, x:x + w, 0] = -100
+        hm[..., 1] = np.maximum(hm[..., 1], rng.integers(-128, -110, size=(grid_h, grid_w)))
+    return heatmaps
+
+
+def legacy_decode(detail, threshold):
+    """main2.tracking_loop FOMO decoding before FomoDecoder"""
+    def run(heatmap):
+        output_data = heatmap
+        if detail['dtype'] == np.int8:
+            output_data = (output_data.astype(np.float32) + 128) / 255.0
+        if output_data.shape[2] > 1:
+            output_data = output_data[:, :, 1:]
+        max_idx = np.argmax(output_data)
+        max_y, max_x, max_c = np.unravel_index(max_idx, output_data.shape)
+        if output_data[max_y, max_x, max_c] <= threshold:
+            return []
+        grid_h, grid_w, _ = output_data.shape
+        return [(int((max_x + 0.5) * (FRAME_W / grid_w)), int((max_y + 0.5) * (FRAME_H / grid_h)))]
+    return run
+
+
+def measure(name, fn, heatmaps, iterations):
+    found = sum(len(fn(hm)) for hm in heatmaps)
+    times = []
+    for i in range(iterations):
+        heatmap = heatmaps[i % len(heatmaps)]
+        t0 = time.perf_counter()
+        fn(heatmap)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    p50 = times[len(times) // 2] * 1e6
+    p95 = times[int(len(times) * 0.95)] * 1e6
+    print(f"{name:<8} p50 {p50:8.1f} us  p95 {p95:8.1f} us  "
+          f"detections {found} over {len(heatmaps)} heatmaps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('heatmaps', nargs='?', help=".npy of recorded heatmaps (default: synthetic)")
+    parser.add_argument('--record', metavar='FRAMES_DIR', help="generate heatmaps from a directory of .jpg frames")
+    parser.add_argument('-o', '--output', help="save the recorded heatmaps to this .npy")
+    parser.add_argument('-n', '--iterations', type=int, default=5000)
+    parser.add_argument('--threshold', type=float, default=0.12)
+    parser.add_argument('--model', default="ei-model.tflite")
+    args = parser.parse_args()
+
+    detail = InferenceEngine(args.model).output_details[0]
+
+    if args.record:
+        heatmaps = record_heatmaps(args.model, args.record)
+        if args.output:
+            np.save(args.output, heatmaps)
+            print(f"Saved {len(heatmaps)} heatmaps to {args.output}")
+    elif args.heatmaps:
+        heatmaps = np.load(args.heatmaps)
+    else:
+        heatmaps = synthetic_heatmaps(detail, 200)
+
+    decoder = FomoDecoder(detail, args.threshold)
+    print(f"Heatmaps {heatmaps.shape} {heatmaps.dtype}, threshold {args.threshold} "
+          f"-> quantized {decoder.q_threshold}")
+
+    measure("legacy", legacy_decode(detail, args.threshold), heatmaps, args.iterations)
+    measure("decoder", lambda hm: decoder.decode(hm, FRAME_W, FRAME_H), heatmaps, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
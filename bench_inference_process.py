@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Single-process main2 vs inference in a worker process, with 0-2 viewers.
+
+Runs bench_pipeline.py once per combination of INFERENCE_PROCESS off/on
+and 0, 1 and 2 connected /video_feed viewers, replaying the same frames,
+and prints one line per run. Each run is a fresh interpreter so the two
+designs do not share warm-up or leftover threads.
+
+  python bench_inference_process.py --synthetic 300
+  python bench_inference_process.py frames/ --server-overlay   # viewers get drawn, re-encoded frames
+  python bench_inference_process.py --viewers 0 2 4 --json matrix.json
+
+capture fps and viewer fps show whether the camera and the stream keep
+up; inference/s and the inference p50 whether the model does;
+capture->send is the glass-to-motor latency of the resulting commands and
+main CPU the load left on the process that serves Flask.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_pipeline.py")
+
+
+def run(source, passthrough, process, viewers):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        report_path = f.name
+    cmd = [sys.executable, BENCH] + ([source] if source else []) + passthrough + [
+        '--full', '--viewers', str(viewers), '--json', report_path]
+    if process:
+        cmd.append('--process')
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        with open(report_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(result.stdout[-2000:])
+        raise RuntimeError(f"bench_pipeline failed: {' '.join(cmd)}")
+    finally:
+        os.unlink(report_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', nargs='?', help="directory of .jpg frames or a recorded MJPEG stream")
+    parser.add_argument('--synthetic', type=int, default=300, help="frames to generate without a source")
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--viewers', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--server-overlay', action='store_true', help="viewers get drawn, re-encoded frames")
+    parser.add_argument('--json', help="write all reports to this file")
+    args = parser.parse_args()
+
+    passthrough = ['--synthetic', str(args.synthetic), '--fps', str(args.fps)]
+    if args.server_overlay:
+        passthrough.append('--server-overlay')
+
+    print(f"{'inference':<12}{'viewers':>8}{'capture':>9}{'viewer':>8}{'infer/s':>9}"
+          f"{'infer p50':>11}{'cap->send p50':>15}{'main CPU':>10}")
+    reports = []
+    for process in (False, True):
+        for viewers in args.viewers:
+            report = run(args.source, passthrough, process, viewers)
+            reports.append(report)
+            viewer_fps = min(report["viewer_fps"]) if report["viewer_fps"] else None
+            g2m = report["glass_to_motor"]["capture_to_send"]
+            print(f"{'worker' if process else 'in-process':<12}{viewers:>8}{report['capture_fps']:>9.1f}"
+                  f"{viewer_fps if viewer_fps is not None else '-':>8}{report['inference_fps']:>9.2f}"
+                  f"{report['stages']['inference']['p50_ms']:>9.1f}ms"
+                  f"{(str(g2m['p50_ms']) + 'ms') if g2m else '-':>15}{report['main_cpu_percent']:>9.1f}%",
+                  flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=1)
+        print(f"reports written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Throughput of MJPEGDemuxer vs the old buffer += chunk scan.
+
+Record a stream once, then replay it offline:
+  python bench_mjpeg_demux.py --record http://10.30.152.68/stream --seconds 10 esp32.mjpeg
+  python bench_mjpeg_demux.py esp32.mjpeg --chunk 1024 --chunk 8192
+"""
+import argparse
+import sys
+import time
+
+import requests
+
+from mjpeg_demux import MJPEGDemuxer
+
+
+def record(url, path, seconds):
+    """Save the raw multipart body of a live stream to a file"""
+    print(f"Recording {url} for {seconds}s -> {path}")
+    response = requests.get(url, stream=True, timeout=5)
+    response.raise_for_status()
+    deadline = time.time() + seconds
+    total = 0
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            f.write(chunk)
+            total += len(chunk)
+            if time.time() > deadline:
+                break
+    print(f"Recorded {total / 1e6:.1f} MB")
+
+
+def legacy_scan(chunks):
+    """The pre-demuxer loop: rescan from offset 0, one frame per chunk"""
+    frames = 0
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        start = buffer.find(b'\xff\xd8')
+        end = buffer.find(b'\xff\xd9')
+        if start != -1 and end != -1 and end > start:
+            jpeg_data = buffer[start:end+2]
+            buffer = buffer[end+2:]
+            frames += 1
+    return frames, len(buffer)
+
+
+def demux_all(chunks):
+    demuxer = MJPEGDemuxer()
+    frames = 0
+    for chunk in chunks:
+        frames += len(demuxer.feed(chunk))
+    return frames, len(demuxer._buf)
+
+
+def demux_latest(chunks):
+    demuxer = MJPEGDemuxer()
+    for chunk in chunks:
+        demuxer.latest(chunk)
+    return demuxer.frames - demuxer.dropped, len(demuxer._buf)
+
+
+def run(name, fn, chunks, total_bytes, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        frames, backlog = fn(chunks)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {name:<14} {total_bytes / best / 1e6:8.1f} MB/s  {frames:6d} frames  "
+          f"{best * 1000:8.1f} ms  backlog {backlog} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('stream_file', help="recorded MJPEG/multipart stream")
+    parser.add_argument('--record', metavar='URL', help="record from URL into stream_file first")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--chunk', type=int, action='append', help="chunk size(s) to replay with")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.stream_file, args.seconds)
+
+    with open(args.stream_file, 'rb') as f:
+        data = f.read()
+    if not data:
+        print("Stream file is empty")
+        sys.exit(1)
+
+    print(f"Replaying {len(data) / 1e6:.1f} MB from {args.stream_file}")
+    for chunk_size in args.chunk or [1024, 2048, 8192]:
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        print(f"chunk_size={chunk_size}")
+        run("legacy", legacy_scan, chunks, len(data), args.repeat)
+        run("demux feed", demux_all, chunks, len(data), args.repeat)
+        run("demux latest", demux_latest, chunks, len(data), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
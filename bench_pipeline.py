@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Replay recorded frames through main2's tracking pipeline, headless.
+
+The real main2 module is imported and run. The camera and the robot
+are replaced by local stand-ins:
+
+- rpicam-vid: a script placed first on PATH that writes the recorded
+  JPEGs to stdout at --fps, so RPiCamera, MJPEGDemuxer and the capture
+  decode run as they do on the Pi.
+- the ESP8266: a UDP socket on localhost that records every command
+  the transport sends.
+
+The run goes through capture, preprocessing, inference, decoding,
+tracking and the control decision. It reports throughput, per-stage
+latency percentiles, command counts and memory peaks.
+
+  python bench_pipeline.py frames/                # directory of .jpg frames
+  python bench_pipeline.py drive.mjpeg --loops 3  # recorded stream (bench_mjpeg_demux.py --record)
+  python bench_pipeline.py --synthetic 300 --full --json before.json
+  python bench_pipeline.py --synthetic 300 --full --no-metrics   # instrumentation overhead
+  python bench_pipeline.py --synthetic 300 --full --process --viewers 2   # see bench_inference_process.py
+
+--viewers N serves main2's Flask app on localhost and connects N
+/video_feed clients, each a separate process that reads and discards
+the stream, so only the server side of a viewer loads main2.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from mjpeg_demux import MJPEGDemuxer
+
+REPLAY_SCRIPT = """#!{python}
+import os, sys, time
+with open(os.environ["BENCH_REPLAY_STREAM"], "rb") as f:
+    data = f.read()
+bounds = [int(n) for n in os.environ["BENCH_REPLAY_BOUNDS"].split(",")]
+fps = float(os.environ["BENCH_REPLAY_FPS"])
+loops = int(os.environ["BENCH_REPLAY_LOOPS"])
+out = sys.stdout.buffer
+try:
+    # Hold on the first frame (inside RPiCamera's stall timeout) until the
+    # pipeline is running
+    while not os.path.exists(os.environ["BENCH_REPLAY_GO"]):
+        out.write(data[bounds[0]:bounds[1]])
+        out.flush()
+        time.sleep(0.2)
+    t = time.monotonic()
+    for _ in range(loops):
+        for start, end in zip(bounds, bounds[1:]):
+            out.write(data[start:end])
+            out.flush()
+            if fps > 0:
+                t += 1.0 / fps
+                time.sleep(max(0.0, t - time.monotonic()))
+except BrokenPipeError:
+    sys.exit(0)
+open(os.environ["BENCH_REPLAY_DONE"], "w").close()
+time.sleep(3600)  # keep the pipe open; RPiCamera would restart an exited camera
+"""
+
+
+VIEWER_SCRIPT = """
+import sys, urllib.request
+with urllib.request.urlopen(sys.argv[1]) as response:
+    while response.read(65536):
+        pass
+"""
+
+
+def load_jpegs(source, synthetic):
+    if source is None:
+        return synthetic_jpegs(synthetic)
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, '*.jpg')) + glob.glob(os.path.join(source, '*.jpeg')))
+        jpegs = []
+        for path in files:
+            with open(path, 'rb') as f:
+                jpegs.append(f.read())
+        return jpegs
+    # Recorded stream: multipart (ESP32 /stream) or raw concatenated JPEGs
+    demuxer = MJPEGDemuxer(max_frame_size=4 << 20)
+    jpegs = []
+    with open(source, 'rb') as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            jpegs.extend(demuxer.feed(chunk))
+    return jpegs
+
+
+def synthetic_jpegs(count, width=640, height=480):
+    """A bright figure walking across a noisy room"""
+    rng = np.random.default_rng(0)
+    room = cv2.GaussianBlur(rng.integers(40, 200, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    jpegs = []
+    for i in range(count):
+        frame = room.copy()
+        x = int((i * 7) % (width + 160)) - 80
+        cv2.rectangle(frame, (x, height // 4), (x + 80, height - 40), (230, 230, 230), -1)
+        cv2.circle(frame, (x + 40, height // 4 - 30), 30, (200, 180, 170), -1)
+        jpegs.append(cv2.imencode('.jpg', frame)[1].tobytes())
+    return jpegs
+
+
+class Timer:
+    """Latency samples for one wrapped callable"""
+    def __init__(self):
+        self.samples = []
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - t0)
+        return timed
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ms = np.array(self.samples) * 1000
+        return {"count": len(ms), "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                "p99_ms": round(float(np.percentile(ms, 99)), 3),
+                "max_ms": round(float(ms.max()), 3)}
+
+
+class CommandSink:
+    """Local stand-in for the ESP8266 command port"""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.commands = []
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def addr(self):
+        return self.sock.getsockname()
+
+    def _run(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            self.commands.append((time.monotonic(), data.decode(errors='replace')))
+
+    def summary(self, seconds):
+        counts = {}
+        for _, cmd in self.commands:
+            name = cmd.split(':')[0]
+            counts[name] = counts.get(name, 0) + 1
+        return {"sent": len(self.commands), "per_second": round(len(self.commands) / seconds, 2),
+                "by_command": counts}
+
+
+def install_replay(jpegs, fps, loops, workdir):
+    stream_path = os.path.join(workdir, "replay.mjpeg")
+    bounds = [0]
+    with open(stream_path, 'wb') as f:
+        for jpeg in jpegs:
+            f.write(jpeg)
+            bounds.append(bounds[-1] + len(jpeg))
+    script = os.path.join(workdir, "rpicam-vid")
+    with open(script, 'w') as f:
+        f.write(REPLAY_SCRIPT.format(python=sys.executable))
+    os.chmod(script, os.stat(script).st_mode | stat.S_IXUSR)
+    done = os.path.join(workdir, "done")
+    go = os.path.join(workdir, "go")
+    os.environ.update({
+        "PATH": workdir + os.pathsep + os.environ.get("PATH", ""),
+        "BENCH_REPLAY_STREAM": stream_path,
+        "BENCH_REPLAY_BOUNDS": ",".join(map(str, bounds)),
+        "BENCH_REPLAY_FPS": str(fps),
+        "BENCH_REPLAY_LOOPS": str(loops),
+        "BENCH_REPLAY_DONE": done,
+        "BENCH_REPLAY_GO": go,
+    })
+    return go, done
+
+
+def start_viewers(app, hub, count):
+    """Serve app on localhost and connect `count` /video_feed viewer processes"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/video_feed"
+    viewers = [subprocess.Popen([sys.executable, '-c', VIEWER_SCRIPT, url]) for _ in range(count)]
+    deadline = time.monotonic() + 10
+    while hub.client_count() < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return viewers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', nargs='?', help="directory of .jpg frames or a recorded MJPEG stream")
+    parser.add_argument('--synthetic', type=int, default=300, help="frames to generate without a source")
+    parser.add_argument('--fps', type=float, default=30.0, help="replay rate (0 = as fast as the pipe allows)")
+    parser.add_argument('--loops', type=int, default=1)
+    parser.add_argument('--full', action='store_true',
+                        help="disable the motion gate and presence cascade (infer on every cadence slot)")
+    parser.add_argument('--no-metrics', action='store_true', help="disable main2's /metrics instrumentation")
+    parser.add_argument('--process', action='store_true', help="run inference in main2's worker process")
+    parser.add_argument('--viewers', type=int, default=0, help="/video_feed clients connected during the run")
+    parser.add_argument('--server-overlay', action='store_true',
+                        help="draw and re-encode frames for viewers (main2 SERVER_OVERLAY)")
+    parser.add_argument('--tracemalloc', action='store_true', help="also trace the Python allocation peak (slower)")
+    parser.add_argument('--json', help="write the report to this file")
+    parser.add_argument('--trace', help="dump the per-command latency trace (JSON lines) to this file")
+    args = parser.parse_args()
+
+    jpegs = load_jpegs(args.source, args.synthetic)
+    if not jpegs:
+        parser.error("no frames found")
+    first = cv2.imdecode(np.frombuffer(jpegs[0], dtype=np.uint8), cv2.IMREAD_COLOR)
+    print(f"[BENCH] {len(jpegs)} frames of {first.shape[1]}x{first.shape[0]}, "
+          f"{args.loops} loop(s) at {args.fps or 'max'} fps")
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    go_marker, done_marker = install_replay(jpegs, args.fps, args.loops, workdir)
+    sink = CommandSink()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    os.environ["INFERENCE_PROCESS"] = "1" if args.process else "0"
+    import main2
+
+    timers = {name: Timer() for name in ("jpeg_decode", "preprocess", "invoke", "decode", "round_trip")}
+    cv2.imdecode = timers["jpeg_decode"].wrap(cv2.imdecode)
+    if main2.worker is not None:
+        # Preprocess, invoke and decode happen in the worker; time the wait for it
+        main2.worker.infer = timers["round_trip"].wrap(main2.worker.infer)
+    else:
+        main2.preprocess = timers["preprocess"].wrap(main2.preprocess)
+        main2.engine.invoke = timers["invoke"].wrap(main2.engine.invoke)
+        if main2.decoder is not None:
+            main2.decoder.decode = timers["decode"].wrap(main2.decoder.decode)
+    main2.transport.addr = sink.addr
+    main2.transport.verbose = False
+    if args.full:
+        main2.motion_gate.max_staleness = 0.0
+        main2.cascade.enabled = False
+    main2.metrics.enabled = not args.no_metrics
+    main2.current_mode = "AUTO"
+    main2.SERVER_OVERLAY = args.server_overlay
+    viewers = start_viewers(main2.app, main2.video_hub, args.viewers) if args.viewers else []
+
+    start_count = main2.camera.frame_count
+    t0 = time.monotonic()
+    cpu0 = time.process_time()
+    main2.pipeline.start()
+    open(go_marker, 'w').close()
+    while not os.path.exists(done_marker):
+        time.sleep(0.1)
+    time.sleep(0.5)  # let the last frames drain through inference and control
+    elapsed = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+    clients = main2.video_hub.stats()["clients"]
+    worker_stats = main2.worker.stats() if main2.worker is not None else None
+    main2.pipeline.stop()
+    for viewer in viewers:
+        viewer.kill()
+    if main2.worker is not None:
+        main2.worker.stop()
+    main2.motor.stop()
+
+    stages = main2.pipeline.stats()
+    frames = main2.camera.frame_count - start_count
+    report = {
+        "metrics_enabled": not args.no_metrics,
+        "inference_process": args.process,
+        "server_overlay": args.server_overlay,
+        "viewers": len(clients),
+        "viewer_fps": [round(c["sent"] / elapsed, 1) for c in clients],
+        "frames_replayed": len(jpegs) * args.loops,
+        "frames_captured": frames,
+        "seconds": round(elapsed, 2),
+        "capture_fps": round(frames / elapsed, 1),
+        "inferences": stages["inference"]["processed"],
+        "inference_fps": round(stages["inference"]["processed"] / elapsed, 2),
+        "decisions": stages["control"]["processed"],
+        "main_cpu_percent": round(cpu / elapsed * 100, 1),
+        "stages": {name: {k: stages[name][k] for k in ("processed", "p50_ms", "p95_ms", "avg_latency_ms", "busy")}
+                   for name in ("capture", "inference", "control", "render")},
+        "steps": {name: timer.summary() for name, timer in timers.items()},
+        "commands": sink.summary(elapsed),
+        "glass_to_motor": main2.trace.summary(),
+        "tracker": main2.tracker.stats(),
+        "motion_gate": main2.motion_gate.stats(),
+        "cascade": main2.cascade.stats(),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    if worker_stats is not None:
+        report["worker"] = worker_stats
+    if args.tracemalloc:
+        report["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+
+    print(f"\n[BENCH] {report['frames_captured']}/{report['frames_replayed']} frames in {report['seconds']}s: "
+          f"capture {report['capture_fps']} fps, inference {report['inference_fps']}/s, "
+          f"{report['decisions']} control decisions, {report['commands']['sent']} UDP commands")
+    print(f"[BENCH] inference {'in worker process' if report['inference_process'] else 'in-process'}, "
+          f"main process CPU {report['main_cpu_percent']}%, viewers {report['viewers']} "
+          f"at {report['viewer_fps']} fps")
+    print(f"{'stage':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, s in report["stages"].items():
+        print(f"{name:<12}{s['processed']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}")
+    for name, s in report["steps"].items():
+        if s["count"]:
+            print(f"  {name:<10}{s['count']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}")
+    g2m = report["glass_to_motor"]["capture_to_send"]
+    if g2m:
+        print(f"[BENCH] capture -> UDP send p50 {g2m['p50_ms']} ms, p95 {g2m['p95_ms']} ms "
+              f"over {report['glass_to_motor']['window']} traced commands")
+    memory = f"max RSS {report['max_rss_mb']} MB"
+    if args.tracemalloc:
+        memory += f", Python heap peak {report['tracemalloc_peak_mb']} MB"
+    print(f"[BENCH] {memory}")
+
+    if args.trace:
+        count = main2.trace.dump(args.trace)
+        print(f"[BENCH] {count} trace entries written to {args.trace}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"[BENCH] report written to {args.json}")
+    # Camera, telemetry and Flask-side threads are daemons tied to main2's globals
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
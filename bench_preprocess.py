@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Per-frame cost of TFLite input preprocessing: old main2 path vs InputPreprocessor.
+
+  python bench_preprocess.py                 # synthetic 640x480 frames
+  python bench_preprocess.py frames/ -n 500  # directory of recorded JPEGs
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from inference_engine import InferenceEngine
+from tflite_preprocess import InputPreprocessor
+
+FRAME_W = 320
+FRAME_H = 240
+
+
+def load_frames(path, count):
+    if path:
+        files = sorted(glob.glob(os.path.join(path, '*.jpg')))[:count]
+        frames = [cv2.imread(f) for f in files]
+        return [f for f in frames if f is not None]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(min(count, 50))]
+
+
+def legacy_path(interpreter):
+    """main2.tracking_loop preprocessing before InputPreprocessor"""
+    detail = interpreter.get_input_details()[0]
+    _, input_height, input_width, input_channels = detail['shape']
+    input_index = detail['index']
+
+    def run(frame):
+        img = cv2.resize(frame, (FRAME_W, FRAME_H))
+        img_resized = cv2.resize(img, (input_width, input_height), interpolation=cv2.INTER_NEAREST)
+        if input_channels == 1:
+            img_processed = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
+            img_processed = np.expand_dims(img_processed, axis=-1)
+        else:
+            img_processed = img_resized[:, :, ::-1]
+        input_data = np.expand_dims(img_processed, axis=0)
+        if detail['dtype'] == np.float32:
+            input_data = np.float32(input_data) / 255.0
+        elif detail['dtype'] == np.int8:
+            input_data = (input_data.astype(np.int16) - 128).astype(np.int8)
+        interpreter.set_tensor(input_index, input_data)
+    return run
+
+
+def measure(name, fn, frames, iterations):
+    for frame in frames[:5]:
+        fn(frame)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    fn(frames[0])
+    _, peak = tracemalloc.get_traced_memory()
+    snap_before = tracemalloc.take_snapshot()
+    for frame in frames[:10]:
+        fn(frame)
+    snap_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    leaked = sum(s.size_diff for s in snap_after.compare_to(snap_before, 'lineno') if s.size_diff > 0)
+
+    times = []
+    for i in range(iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        fn(frame)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    p50 = times[len(times) // 2] * 1e6
+    p95 = times[int(len(times) * 0.95)] * 1e6
+    print(f"{name:<14} p50 {p50:8.1f} us  p95 {p95:8.1f} us  "
+          f"peak alloc/frame {(peak - base) / 1024:8.1f} KiB  retained {leaked / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('frames', nargs='?', help="directory of .jpg frames (default: synthetic)")
+    parser.add_argument('-n', '--iterations', type=int, default=1000)
+    parser.add_argument('--model', default="ei-model.tflite")
+    args = parser.parse_args()
+
+    interpreter = InferenceEngine(args.model).interpreter
+    frames = load_frames(args.frames, args.iterations)
+    detail = interpreter.get_input_details()[0]
+    print(f"Model input {detail['shape'][1:]} {np.dtype(detail['dtype']).name} "
+          f"quantization={detail['quantization']}, {len(frames)} frames of {frames[0].shape}")
+
+    measure("legacy", legacy_path(interpreter), frames, args.iterations)
+    for name, interp in (("fused nearest", cv2.INTER_NEAREST), ("fused linear", cv2.INTER_LINEAR),
+                         ("fused area", cv2.INTER_AREA)):
+        measure(name, InputPreprocessor(interpreter, interpolation=interp), frames, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
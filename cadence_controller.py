@@ -0,0 +1,159 @@
+"""Runtime inference cadence: the number of frames between inferences.
+
+CadenceController measures the capture frame rate and the inference
+latency as the robot runs. Once a second it picks the frame spacing that
+reaches target_rate decisions per second without spending more than
+cpu_budget of a core in the model. It backs off further while the SoC is
+hot or throttled and while someone is watching /video_feed, because JPEG
+encoding competes for the same cores.
+"""
+import math
+import threading
+import time
+
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"
+THROTTLED_FILE = "/sys/devices/platform/soc/soc:firmware/get_throttled"
+
+
+def read_soc_temperature():
+    """SoC temperature in degrees C, or None off the Pi"""
+    try:
+        with open(THERMAL_ZONE) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+def read_throttled():
+    """True while the firmware reports under-voltage or thermal throttling now"""
+    try:
+        with open(THROTTLED_FILE) as f:
+            flags = int(f.read().strip(), 16)
+    except (OSError, ValueError):
+        return False
+    return bool(flags & 0xF)  # bits 0-3: under-voltage, freq capped, throttled, soft temp limit
+
+
+def parse_settings(params):
+    """(target_rate, cpu_budget) from a POSTed mapping, None for absent keys; ValueError if not finite numbers"""
+    if not isinstance(params, dict):
+        raise ValueError("expected an object with target_rate and/or cpu_budget")
+    settings = []
+    for key in ("target_rate", "cpu_budget"):
+        value = params.get(key)
+        if value is not None:
+            # bool is an int subclass; JSON true must not read as 1.0
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{key} must be a number")
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{key} must be a number") from None
+            if not math.isfinite(value):
+                raise ValueError(f"{key} must be finite")
+        settings.append(value)
+    return tuple(settings)
+
+
+class CadenceController:
+    def __init__(self, target_rate=5.0, cpu_budget=0.5, frame_skip=1, min_skip=1, max_skip=15,
+                 hot_temperature=75.0, throttle_factor=0.5, viewer_factor=0.75,
+                 viewers=None, update_interval=1.0):
+        self.target_rate = target_rate          # wanted decisions (inferences) per second
+        self.cpu_budget = cpu_budget            # fraction of one core the model may use
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.hot_temperature = hot_temperature
+        self.throttle_factor = throttle_factor  # rate multiplier while hot or throttled
+        self.viewer_factor = viewer_factor      # rate multiplier while /video_feed has clients
+        self.viewers = viewers                  # callable returning the viewer count
+        self.update_interval = update_interval
+        self.lock = threading.Lock()
+        self.frame_skip = frame_skip
+        self.capture_fps = 0.0
+        self.inference_latency = 0.0
+        self.temperature = None
+        self.throttled = False
+        self.viewer_count = 0
+        self.rate_limit = target_rate
+        self.reason = "startup"
+        self.adjustments = 0
+        self._last_frame = None
+        self._last_update = time.monotonic()
+
+    def observe_frame(self, now=None):
+        """Called once per captured frame; returns the current frame skip"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self._last_frame is not None:
+                interval = now - self._last_frame
+                if interval > 0:
+                    fps = 1.0 / interval
+                    self.capture_fps = fps if not self.capture_fps else 0.9 * self.capture_fps + 0.1 * fps
+            self._last_frame = now
+            if now - self._last_update >= self.update_interval:
+                self._last_update = now
+                self._update()
+            return self.frame_skip
+
+    def observe_inference(self, latency):
+        with self.lock:
+            if not self.inference_latency:
+                self.inference_latency = latency
+            else:
+                self.inference_latency = 0.8 * self.inference_latency + 0.2 * latency
+
+    def configure(self, target_rate=None, cpu_budget=None):
+        with self.lock:
+            if target_rate is not None:
+                self.target_rate = max(0.1, target_rate)
+            if cpu_budget is not None:
+                self.cpu_budget = min(max(cpu_budget, 0.05), 1.0)
+            self._update()
+
+    def _update(self):
+        # Called with the lock held
+        self.temperature = read_soc_temperature()
+        self.throttled = read_throttled()
+        self.viewer_count = self.viewers() if self.viewers else 0
+
+        rate = self.target_rate
+        reason = "target rate"
+        if self.inference_latency > 0:
+            cpu_rate = self.cpu_budget / self.inference_latency
+            if cpu_rate < rate:
+                rate, reason = cpu_rate, "cpu budget"
+        if self.throttled or (self.temperature is not None and self.temperature >= self.hot_temperature):
+            rate *= self.throttle_factor
+            reason = "thermal"
+        if self.viewer_count:
+            rate *= self.viewer_factor
+            reason += " + viewers"
+        self.rate_limit = rate
+        self.reason = reason
+
+        if not self.capture_fps or rate <= 0:
+            return
+        skip = min(max(math.ceil(self.capture_fps / rate), self.min_skip), self.max_skip)
+        if skip != self.frame_skip:
+            self.frame_skip = skip
+            self.adjustments += 1
+
+    def stats(self):
+        with self.lock:
+            decision_rate = self.capture_fps / self.frame_skip if self.frame_skip else 0.0
+            return {
+                "frame_skip": self.frame_skip,
+                "target_rate": self.target_rate,
+                "cpu_budget": self.cpu_budget,
+                "rate_limit": round(self.rate_limit, 2),
+                "reason": self.reason,
+                "capture_fps": round(self.capture_fps, 1),
+                "max_decision_rate": round(decision_rate, 2),
+                "inference_latency_ms": round(self.inference_latency * 1000, 2),
+                "inference_cpu": round(self.inference_latency * decision_rate, 3),
+                "temperature": self.temperature,
+                "throttled": self.throttled,
+                "viewers": self.viewer_count,
+                "adjustments": self.adjustments,
+            }
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Single owner of the Pi camera, sharing its frames with local processes.
+
+CameraService runs one rpicam-vid in MJPEG mode and publishes each JPEG,
+with its sequence number and the monotonic time its bytes arrived, on a
+FrameRing named CAMERA_RING in shared memory. CameraClient attaches to
+that ring read-only from any local process: main2 with CAMERA_MODE=shared,
+and aichatbot for its explore snapshots. Readers never touch the device
+and cannot disturb each other; one that falls behind skips to the newest
+frame.
+
+  python camera_service.py                      # 640x480@30 into /dev/shm/robot_camera
+  python camera_service.py --width 1280 --height 720 --fps 15
+"""
+import argparse
+import os
+import select
+import signal
+import subprocess
+import sys
+import time
+
+from frame_ring import FrameRing
+from mjpeg_demux import MJPEGDemuxer
+
+CAMERA_RING = os.environ.get("CAMERA_RING", "robot_camera")
+CAMERA_W = 640
+CAMERA_H = 480
+CAMERA_FPS = 30
+CAMERA_SLOTS = 4
+CAMERA_STALL_TIMEOUT = 2.0  # Restart rpicam-vid if no data arrives for this long
+CAMERA_RESTART_DELAY = 1.0
+CLIENT_CHECK_INTERVAL = 0.5  # How often a waiting client checks that the service is still the same
+
+
+class CameraService:
+    def __init__(self, name=CAMERA_RING, width=CAMERA_W, height=CAMERA_H, framerate=CAMERA_FPS,
+                 slots=CAMERA_SLOTS):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.framerate = framerate
+        self.slots = slots
+        self.ring = None
+        self.process = None
+        self.running = False
+        self.restarts = 0
+        self.published = 0
+        self.oversized = 0
+
+    def run(self):
+        """Publish frames until stop() or SIGTERM; restarts rpicam-vid when it exits or stalls"""
+        self.ring = self._create_ring()
+        self.running = True
+        print(f"[CAMERA] Publishing {self.width}x{self.height}@{self.framerate} on shared memory {self.name!r}")
+        try:
+            while self.running:
+                try:
+                    self._capture_stream()
+                except Exception as e:
+                    print(f"[CAMERA] Error: {e}")
+                if self.running:
+                    self.restarts += 1
+                    print(f"[CAMERA] Capture stopped, restarting in {CAMERA_RESTART_DELAY}s...")
+                    time.sleep(CAMERA_RESTART_DELAY)
+        finally:
+            self._stop_process()
+            ring, self.ring = self.ring, None
+            ring.close()  # readers see the ring closed and re-attach to the next one
+
+    def stop(self):
+        self.running = False
+
+    def _create_ring(self):
+        # Slots hold the camera's JPEGs; a raw frame's size bounds any of them
+        shape = (self.height, self.width, 3)
+        try:
+            return FrameRing.create(shape, self.slots, name=self.name)
+        except FileExistsError:
+            # Left behind by a service that was killed; its readers re-attach
+            print(f"[CAMERA] Replacing stale shared memory {self.name!r}")
+            os.unlink(os.path.join("/dev/shm", self.name))
+            return FrameRing.create(shape, self.slots, name=self.name)
+
+    def _capture_stream(self):
+        cmd = ['rpicam-vid', '-t', '0', '-n', '--nopreview',
+               '--width', str(self.width), '--height', str(self.height),
+               '--framerate', str(self.framerate), '--codec', 'mjpeg', '-o', '-']
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        print(f"[CAMERA] rpicam-vid started (mjpeg {self.width}x{self.height}@{self.framerate})")
+        try:
+            pipe = self.process.stdout
+            demuxer = MJPEGDemuxer()
+            while self.running:
+                ready, _, _ = select.select([pipe], [], [], CAMERA_STALL_TIMEOUT)
+                if not ready:
+                    raise RuntimeError(f"no data from rpicam-vid for {CAMERA_STALL_TIMEOUT}s")
+                chunk = pipe.read(65536)
+                captured = time.monotonic()
+                if not chunk:
+                    return
+                jpeg = demuxer.latest(chunk)
+                if jpeg is None:
+                    continue
+                try:
+                    self.ring.write_jpeg(jpeg, captured)
+                    self.published += 1
+                except ValueError:
+                    self.oversized += 1
+        finally:
+            self._stop_process()
+
+    def _stop_process(self):
+        process, self.process = self.process, None
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def stats(self):
+        return {"name": self.name, "published": self.published, "restarts": self.restarts,
+                "oversized": self.oversized}
+
+
+class CameraClient:
+    """Read-only access to the camera service's frames.
+
+    Attaches lazily, so constructing one never fails; the read methods
+    raise FileNotFoundError while no camera service is running. A ring
+    whose service closed it, died (SIGKILL, OOM, power loss never mark it
+    closed) or was replaced under the same name is dropped and the
+    current one attached.
+    """
+    def __init__(self, name=CAMERA_RING):
+        self.name = name
+        self.ring = None
+        self.last_seq = 0
+        self.frames = 0
+        self.reattached = 0
+
+    @property
+    def path(self):
+        return os.path.join("/dev/shm", self.name)
+
+    def available(self):
+        """True while a live camera service publishes on the ring"""
+        try:
+            return not self._stale(self._ring())
+        except (OSError, ValueError):
+            return False
+
+    def _stale(self, ring):
+        if ring.closed or not ring.writer_alive():
+            return True
+        try:
+            return os.stat(self.path).st_ino != ring.inode
+        except FileNotFoundError:
+            return True
+
+    def _ring(self):
+        if self.ring is not None and self._stale(self.ring):
+            self.close()
+            self.reattached += 1
+        if self.ring is None:
+            ring = FrameRing.attach(self.name, readonly=True)
+            if not ring.writer_alive():
+                # Left by a killed service, not yet removed or replaced
+                ring.close()
+                raise FileNotFoundError(f"camera service for {self.path} is not running")
+            self.ring = ring
+            self.last_seq = 0
+        return self.ring
+
+    def next_jpeg(self, timeout=None):
+        """(seq, captured, jpeg) of the newest frame after the last one returned, None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                ring = self._ring()
+            except FileNotFoundError:
+                # Between a service dying and its replacement creating the ring
+                if deadline is None or time.monotonic() >= deadline:
+                    raise
+                time.sleep(min(CLIENT_CHECK_INTERVAL, max(deadline - time.monotonic(), 0)))
+                continue
+            # Wait in slices so a dead or replaced service is noticed mid-wait
+            wait = CLIENT_CHECK_INTERVAL
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0))
+            seq = ring.wait(self.last_seq, wait)
+            if seq is not None:
+                found = ring.read_jpeg(seq)
+                if found is not None:
+                    self.last_seq = seq
+                    self.frames += 1
+                    return found
+                continue  # lapped while copying; take the next one
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+
+    def capture(self, newer_than=None, timeout=3.0):
+        """(seq, captured, jpeg) of the first frame captured at or after newer_than (default: now)"""
+        newer_than = time.monotonic() if newer_than is None else newer_than
+        deadline = time.monotonic() + timeout
+        while True:
+            found = self.next_jpeg(max(deadline - time.monotonic(), 0))
+            if found is None or found[1] >= newer_than:
+                return found
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def stats(self):
+        stats = {"name": self.name, "attached": self.ring is not None, "frames": self.frames,
+                 "reattached": self.reattached, "last_seq": self.last_seq}
+        if self.ring is not None:
+            stats["write_seq"] = self.ring.write_seq
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--name', default=CAMERA_RING, help="shared memory name readers attach to")
+    parser.add_argument('--width', type=int, default=CAMERA_W)
+    parser.add_argument('--height', type=int, default=CAMERA_H)
+    parser.add_argument('--fps', type=int, default=CAMERA_FPS)
+    parser.add_argument('--slots', type=int, default=CAMERA_SLOTS)
+    args = parser.parse_args()
+
+    service = CameraService(args.name, args.width, args.height, args.fps, args.slots)
+    # start_servers.py and systemd stop us with SIGTERM; unwind so the ring is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        pass
+    print(f"[CAMERA] Stopped: {service.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 # Simple ESP32-CAM stream test
 from flask import Flask, Response
+import os
 import threading
 import time
 import requests
@@ -7,7 +8,9 @@ import numpy as np
 from PIL import Image, ImageDraw
 import io
 
-ESP32_STREAM_URL = "http://10.30.152.68/stream"
+from mjpeg_demux import MJPEGDemuxer
+
+ESP32_STREAM_URL = os.environ.get("ESP32_STREAM_URL", "http://10.30.152.68/stream")
 
 app = Flask(__name__)
 frame_lock = threading.Lock()
@@ -32,27 +35,15 @@ class MJPEGCamera:
         while self.running:
             try:
                 response = requests.get(self.url, stream=True, timeout=3)
-                buffer = b''
+                demuxer = MJPEGDemuxer()
                 for chunk in response.iter_content(chunk_size=8192):
                     if not self.running:
                         break
-                    buffer += chunk
-                    
-                    while True:
-                        start = buffer.find(b'\xff\xd8')
-                        if start == -1:
-                            break
-                        end = buffer.find(b'\xff\xd9', start)
-                        if end == -1:
-                            break
-                            
-                        jpeg_data = buffer[start:end+2]
-                        buffer = buffer[end+2:]
-                        
+                    jpeg_data = demuxer.latest(chunk)
+                    if jpeg_data is not None:
                         try:
                             img = Image.open(io.BytesIO(jpeg_data))
-                            if self.frame is None or len(buffer) < 4096:
-                                self.frame = np.array(img)
+                            self.frame = np.array(img)
                         except:
                             pass
             except Exception as e:
@@ -0,0 +1,56 @@
+"""Server-Sent Events broadcast of per-frame tracking metadata.
+
+The producer publishes one small dict per frame (zones, target, status
+text). It is serialised to JSON once, and every /events client generator
+waits on a condition variable for a newer sequence, so a slow browser
+skips to the latest state as with FrameHub. The page draws the overlay
+on a canvas.
+"""
+import json
+import threading
+
+
+class EventHub:
+    def __init__(self, idle_timeout=15.0):
+        self.idle_timeout = idle_timeout  # send an SSE comment this often to keep proxies open
+        self._cond = threading.Condition()
+        self._message = None
+        self._seq = 0
+        self._clients = 0
+        self.skipped = 0
+
+    def has_clients(self):
+        return self._clients > 0
+
+    def client_count(self):
+        return self._clients
+
+    def publish(self, event):
+        """Serialise event once and wake every client"""
+        message = ("data: " + json.dumps(event, separators=(',', ':')) + "\n\n").encode()
+        with self._cond:
+            self._message = message
+            self._seq += 1
+            self._cond.notify_all()
+
+    def stream(self, running=lambda: True):
+        """text/event-stream generator for one client"""
+        with self._cond:
+            self._clients += 1
+            last_seq = self._seq
+        try:
+            yield b"retry: 2000\n\n"
+            while running():
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != last_seq, self.idle_timeout):
+                        message = b": keepalive\n\n"
+                    else:
+                        self.skipped += self._seq - last_seq - 1
+                        last_seq, message = self._seq, self._message
+                yield message
+        finally:
+            with self._cond:
+                self._clients -= 1
+
+    def stats(self):
+        return {"published": self._seq, "clients": self._clients, "skipped": self.skipped}
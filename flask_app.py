@@ -1,11 +1,12 @@
 from flask import Flask, render_template, request, jsonify
+import os
 import socket
 
 app = Flask(__name__)
 
 # Robot Configuration
-ESP8266_IP = "10.30.152.186"
-ESP8266_PORT = 8888
+ESP8266_IP = os.environ.get("ESP8266_IP", "10.30.152.186")
+ESP8266_PORT = int(os.environ.get("ESP8266_PORT", 8888))
 
 def send_command(command):
     try:
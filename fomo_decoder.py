@@ -0,0 +1,120 @@
+"""Multi-object decoder for FOMO heatmaps.
+
+The old decode dequantized the whole int8 heatmap to float32 and kept the
+single global argmax, so two people in frame made the target jump between
+them. FomoDecoder converts the confidence threshold into the quantized
+domain once, thresholds the raw int8 cells, groups neighbouring cells per
+class with a vectorized connected-component pass and returns one
+Detection per blob.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # fall back to the numpy labelling pass
+    cv2 = None
+
+# x, y: blob centroid; width, height: cell bounding box, all in output
+# pixels. confidence: best cell in the blob. label: class index in the
+# model output (background is 0).
+Detection = namedtuple("Detection", "x y width height confidence label cells")
+
+
+def label_components(mask):
+    """4-connected component labels for a 2-D bool mask (0 = background).
+
+    Uses cv2.connectedComponents when OpenCV is available. Otherwise every
+    set cell starts with a unique label and repeatedly takes the
+    minimum of its set neighbours; on a FOMO grid (12x12 for 96x96 input)
+    this converges in a handful of whole-array steps.
+    """
+    if cv2 is not None:
+        _, labels = cv2.connectedComponents(mask.view(np.uint8), connectivity=4)
+        return labels
+    h, w = mask.shape
+    big = h * w + 1
+    labels = np.where(mask, np.arange(1, h * w + 1).reshape(h, w), big)
+    padded = np.full((h + 2, w + 2), big, dtype=labels.dtype)
+    while True:
+        padded[1:-1, 1:-1] = labels
+        neighbours = np.minimum(np.minimum(padded[:-2, 1:-1], padded[2:, 1:-1]),
+                                np.minimum(padded[1:-1, :-2], padded[1:-1, 2:]))
+        updated = np.where(mask, np.minimum(labels, neighbours), big)
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    labels[~mask] = 0
+    return labels
+
+
+class FomoDecoder:
+    def __init__(self, output_detail, threshold, skip_background=True):
+        self.dtype = np.dtype(output_detail['dtype'])
+        scale, zero_point = output_detail.get('quantization') or (0.0, 0)
+        self.scale = scale
+        self.zero_point = zero_point
+        self.skip_background = skip_background
+        self.threshold = threshold
+        if self.dtype.kind in 'iu' and scale:
+            info = np.iinfo(self.dtype)
+            q = math.ceil(threshold / scale + zero_point)
+            self.q_threshold = int(min(max(q, info.min), info.max + 1))
+        else:
+            self.q_threshold = threshold
+        self.last_max_score = 0.0
+
+    def dequantize(self, value):
+        if self.dtype.kind in 'iu' and self.scale:
+            return (float(value) - self.zero_point) * self.scale
+        return float(value)
+
+    def decode(self, heatmap, width, height):
+        """Detections in a width x height frame from one (H, W, C) heatmap"""
+        if heatmap.shape[2] > 1 and self.skip_background:
+            classes = heatmap[:, :, 1:]
+            label_offset = 1
+        else:
+            classes = heatmap
+            label_offset = 0
+        grid_h, grid_w, num_classes = classes.shape
+        cell_w = width / grid_w
+        cell_h = height / grid_h
+
+        self.last_max_score = self.dequantize(classes.max())
+        mask = classes >= self.q_threshold
+        if not mask.any():
+            return []
+
+        detections = []
+        for c in np.flatnonzero(mask.any(axis=(0, 1))):
+            scores = classes[:, :, c]
+            labels = label_components(mask[:, :, c])
+            ys, xs = np.nonzero(labels)
+            ids = labels[ys, xs]
+            # Group cells by blob and reduce each run in one call per stat
+            order = np.argsort(ids, kind='stable')
+            ids, ys, xs = ids[order], ys[order], xs[order]
+            _, starts, cells = np.unique(ids, return_index=True, return_counts=True)
+            n = len(starts)
+            cx = np.add.reduceat(xs, starts) / cells
+            cy = np.add.reduceat(ys, starts) / cells
+            x0 = np.minimum.reduceat(xs, starts)
+            y0 = np.minimum.reduceat(ys, starts)
+            x1 = np.maximum.reduceat(xs, starts)
+            y1 = np.maximum.reduceat(ys, starts)
+            best = np.maximum.reduceat(scores[ys, xs], starts)
+            for i in range(n):
+                detections.append(Detection(
+                    x=int((cx[i] + 0.5) * cell_w),
+                    y=int((cy[i] + 0.5) * cell_h),
+                    width=int((x1[i] - x0[i] + 1) * cell_w),
+                    height=int((y1[i] - y0[i] + 1) * cell_h),
+                    confidence=self.dequantize(best[i]),
+                    label=int(c) + label_offset,
+                    cells=int(cells[i]),
+                ))
+        detections.sort(key=lambda d: d.confidence, reverse=True)
+        return detections
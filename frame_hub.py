@@ -0,0 +1,98 @@
+"""Encode-once JPEG broadcast hub for /video_feed.
+
+The producer encodes each new frame once and publishes the bytes with a
+sequence number. Every client generator waits on a condition variable for
+a newer sequence, so a slow client simply skips to the latest frame
+instead of queueing, and no client encodes anything itself.
+"""
+import itertools
+import threading
+import time
+
+
+class ClientStats:
+    def __init__(self, client_id, remote=None):
+        self.client_id = client_id
+        self.remote = remote
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.fps = 0.0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def on_sent(self, skipped):
+        self.sent += 1
+        self.dropped += skipped
+        self._window_frames += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+    def as_dict(self):
+        return {
+            "id": self.client_id,
+            "remote": self.remote,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            "fps": round(self.fps, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+class FrameHub:
+    def __init__(self, boundary=b'frame', idle_timeout=1.0):
+        self.boundary = boundary
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+        self._clients = {}
+        self._ids = itertools.count(1)
+
+    def has_clients(self):
+        """True when at least one /video_feed client is connected"""
+        return bool(self._clients)
+
+    def client_count(self):
+        return len(self._clients)
+
+    def publish(self, jpeg):
+        """Publish one encoded frame to every connected client"""
+        with self._cond:
+            self._jpeg = jpeg
+            self._seq += 1
+            self._cond.notify_all()
+
+    def latest(self):
+        """Return (seq, jpeg) of the newest published frame"""
+        with self._cond:
+            return self._seq, self._jpeg
+
+    def stream(self, remote=None, running=lambda: True):
+        """Multipart generator for one HTTP client"""
+        client = ClientStats(next(self._ids), remote)
+        with self._cond:
+            self._clients[client.client_id] = client
+        last_seq = 0
+        try:
+            while running():
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != last_seq, self.idle_timeout):
+                        continue
+                    seq, jpeg = self._seq, self._jpeg
+                client.on_sent(seq - last_seq - 1 if last_seq else 0)
+                last_seq = seq
+                yield (b'--' + self.boundary + b'\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self._cond:
+                self._clients.pop(client.client_id, None)
+
+    def stats(self):
+        with self._cond:
+            clients = [c.as_dict() for c in self._clients.values()]
+            seq = self._seq
+        return {"published": seq, "clients": clients}
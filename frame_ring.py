@@ -0,0 +1,238 @@
+"""Ring of preallocated frame slots in multiprocessing shared memory.
+
+Handing frames to another process through a Queue or Pipe pickles every
+array: a 640x480 BGR frame is 900 KB copied into a pickle, through the
+pipe and out again. FrameRing instead lays out a fixed number of slots,
+each sized for the largest frame, in one shared_memory block. The writer
+copies a frame into the next slot and readers in any process that
+attached the block by name get numpy views of it.
+
+Each slot carries the frame's sequence number, timestamp, size and an
+optional (x0, y0, x1, y1) region. A slot can instead hold an encoded
+frame (the camera's JPEG) of up to the slot's byte size, for consumers
+that relay it or decode it at their own scale. There are no locks: the writer zeroes
+the slot's sequence before touching the pixels and stores it again
+afterwards, and a reader that sees a different sequence after copying
+knows the writer lapped it and drops the frame (a seqlock). With three or
+more slots a reader that keeps up with the newest frame is never lapped.
+
+Layout: 64-byte header, slot metadata, then the pixel slots. Readers
+that only consume can attach read-only; the mapping is then PROT_READ.
+"""
+import mmap
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = 0x474E5246  # b"FRNG"
+
+HEADER = np.dtype([("magic", "<u4"), ("slots", "<u4"), ("height", "<u4"), ("width", "<u4"),
+                   ("channels", "<u4"), ("closed", "<u4"), ("write_seq", "<u8"), ("writer_pid", "<u8")])
+HEADER_SIZE = 64
+
+SLOT = np.dtype([("seq", "<u8"), ("timestamp", "<f8"), ("height", "<u4"), ("width", "<u4"),
+                 ("roi", "<i4", 4), ("length", "<u4"), ("reserved", "<u4")])  # length: encoded bytes, 0 for pixels
+
+
+class FrameRing:
+    """Use FrameRing.create() in the writer and FrameRing.attach(name) in readers"""
+
+    def __init__(self, buf, name, owner, shm=None, mapping=None):
+        self._name = name
+        self.shm = shm
+        self._mapping = mapping  # read-only mmap when attached with readonly=True
+        self.owner = owner
+        self.header = np.ndarray((), HEADER, buffer=buf)
+        if int(self.header["magic"]) != MAGIC:
+            raise ValueError(f"shared memory {name!r} is not a frame ring")
+        self.slots = int(self.header["slots"])
+        self.shape = (int(self.header["height"]), int(self.header["width"]), int(self.header["channels"]))
+        self.slot_bytes = self.shape[0] * self.shape[1] * self.shape[2]
+        self.meta = np.ndarray((self.slots,), SLOT, buffer=buf, offset=HEADER_SIZE)
+        offset = HEADER_SIZE + _aligned(SLOT.itemsize * self.slots)
+        self.raw = np.ndarray((self.slots, self.slot_bytes), np.uint8, buffer=buf, offset=offset)
+        self.data = self.raw.reshape((self.slots,) + self.shape)
+        self.inode = None  # of the /dev/shm file, when attached read-only
+        self.written = 0
+        self.torn = 0
+
+    @classmethod
+    def create(cls, shape, slots=3, name=None):
+        """New ring of `slots` frames of at most shape (h, w, channels)"""
+        height, width, channels = shape
+        size = HEADER_SIZE + _aligned(SLOT.itemsize * slots) + slots * height * width * channels
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), HEADER, buffer=shm.buf)
+        header[()] = (MAGIC, slots, height, width, channels, 0, 0, 0)
+        del header
+        ring = cls(shm.buf, shm.name, owner=True, shm=shm)
+        ring.meta[:] = 0
+        ring.header["writer_pid"] = os.getpid()
+        return ring
+
+    @classmethod
+    def attach(cls, name, untrack=True, readonly=False):
+        """Existing ring created by another process.
+
+        Python < 3.13 registers attached blocks with the resource tracker,
+        which would unlink the writer's block when this process exits.
+        Children started by the writer share its tracker and pass
+        untrack=False so the writer's own registration survives.
+        readonly=True maps the block PROT_READ instead (POSIX shared
+        memory under /dev/shm), which never involves the tracker.
+        """
+        if readonly:
+            fd = os.open(os.path.join("/dev/shm", name.lstrip("/")), os.O_RDONLY)
+            try:
+                mapping = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+                inode = os.fstat(fd).st_ino
+            finally:
+                os.close(fd)
+            ring = cls(mapping, name, owner=False, mapping=mapping)
+            ring.inode = inode
+            return ring
+        shm = shared_memory.SharedMemory(name=name)
+        if untrack:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm.buf, shm.name, owner=False, shm=shm)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def write_seq(self):
+        """Sequence of the newest complete frame (0 before the first)"""
+        return int(self.header["write_seq"])
+
+    @property
+    def closed(self):
+        return bool(self.header["closed"])
+
+    @property
+    def writer_pid(self):
+        return int(self.header["writer_pid"])
+
+    def writer_alive(self):
+        """False once the creating process is gone, even if it died without close()"""
+        try:
+            os.kill(self.writer_pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # alive, owned by another user
+        return True
+
+    def write(self, frame, timestamp=None, roi=None):
+        """Copy frame into the next slot and return its sequence number"""
+        height, width = frame.shape[:2]
+        seq = self.write_seq + 1
+        slot = self.meta[seq % self.slots]
+        slot["seq"] = 0  # readers drop the slot while it is being rewritten
+        self.data[seq % self.slots, :height, :width] = frame.reshape(height, width, -1)
+        slot["timestamp"] = time.monotonic() if timestamp is None else timestamp
+        slot["height"], slot["width"] = height, width
+        slot["roi"] = roi if roi is not None else (0, 0, 0, 0)
+        slot["length"] = 0
+        slot["seq"] = seq
+        self.header["write_seq"] = seq
+        self.written += 1
+        return seq
+
+    def write_jpeg(self, jpeg, timestamp=None):
+        """Copy an encoded frame into the next slot and return its sequence number"""
+        length = len(jpeg)
+        if length > self.slot_bytes:
+            raise ValueError(f"{length} byte frame does not fit a {self.slot_bytes} byte slot")
+        seq = self.write_seq + 1
+        slot = self.meta[seq % self.slots]
+        slot["seq"] = 0
+        self.raw[seq % self.slots, :length] = np.frombuffer(jpeg, dtype=np.uint8)
+        slot["timestamp"] = time.monotonic() if timestamp is None else timestamp
+        slot["height"], slot["width"] = 0, 0
+        slot["roi"] = (0, 0, 0, 0)
+        slot["length"] = length
+        slot["seq"] = seq
+        self.header["write_seq"] = seq
+        self.written += 1
+        return seq
+
+    def read_jpeg(self, seq=None):
+        """(seq, timestamp, encoded bytes) of seq (default: newest), or None"""
+        seq = self.write_seq if seq is None else seq
+        slot = self.meta[seq % self.slots]
+        if seq == 0 or int(slot["seq"]) != seq or not slot["length"]:
+            return None
+        timestamp, length = float(slot["timestamp"]), int(slot["length"])
+        jpeg = self.raw[seq % self.slots, :length].tobytes()
+        if not self.valid(seq):
+            return None
+        return seq, timestamp, jpeg
+
+    def view(self, seq):
+        """(timestamp, frame view, roi) of seq in place, or None if the slot moved on.
+
+        The view aliases shared memory; call valid(seq) after using it.
+        """
+        slot = self.meta[seq % self.slots]
+        if seq == 0 or int(slot["seq"]) != seq or slot["length"]:
+            return None
+        timestamp, height, width = float(slot["timestamp"]), int(slot["height"]), int(slot["width"])
+        roi = tuple(int(v) for v in slot["roi"])
+        frame = self.data[seq % self.slots, :height, :width]
+        if self.shape[2] == 1:
+            frame = frame[:, :, 0]
+        return timestamp, frame, (roi if roi[2] > roi[0] else None)
+
+    def valid(self, seq):
+        """False if the writer started reusing seq's slot"""
+        if int(self.meta[seq % self.slots]["seq"]) == seq:
+            return True
+        self.torn += 1
+        return False
+
+    def read(self, seq=None):
+        """(seq, timestamp, frame copy, roi) of seq (default: newest), or None"""
+        seq = self.write_seq if seq is None else seq
+        found = self.view(seq)
+        if found is None:
+            return None
+        timestamp, frame, roi = found
+        frame = frame.copy()
+        if not self.valid(seq):
+            return None
+        return seq, timestamp, frame, roi
+
+    def wait(self, after_seq, timeout=None, interval=0.002):
+        """Newest sequence once it is past after_seq, or None on timeout or close"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            seq = self.write_seq
+            if seq > after_seq:
+                return seq
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+        return None
+
+    def close(self):
+        """Detach; the owner also marks the ring closed and removes the block"""
+        if self.owner:
+            self.header["closed"] = 1
+        del self.header, self.meta, self.raw, self.data
+        if self._mapping is not None:
+            self._mapping.close()
+            return
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def stats(self):
+        return {"name": self.name, "slots": self.slots, "shape": list(self.shape),
+                "write_seq": self.write_seq, "written": self.written, "torn": self.torn}
+
+
+def _aligned(size, alignment=64):
+    return -(-size // alignment) * alignment
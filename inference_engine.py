@@ -0,0 +1,147 @@
+"""Shared TFLite model loading for the tracker entry points.
+
+main2, main2_no_cv and edge_impulse_tracker each built their own
+tflite.Interpreter at import time with default threading and copied the
+input/output detail plumbing. InferenceEngine reads the model file once,
+builds interpreters from those bytes with an explicit num_threads and
+XNNPACK choice, and keeps a small pool of them for callers that infer
+concurrently (an Interpreter must not be invoked from two threads).
+
+  python inference_engine.py --threads 1 2 3 4   # invoke latency per thread count
+"""
+import argparse
+import contextlib
+import os
+import queue
+import time
+
+import numpy as np
+
+try:
+    import tflite_runtime.interpreter as tflite
+except ImportError:
+    import tensorflow.lite as tflite  # ImportError here means neither runtime is installed
+
+DEFAULT_MODEL = "ei-model.tflite"
+
+
+class InferenceEngine:
+    def __init__(self, model_path=DEFAULT_MODEL, num_threads=None, use_xnnpack=True, pool_size=1):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        with open(model_path, 'rb') as f:
+            self.model_content = f.read()
+
+        self.interpreters = [self.create_interpreter() for _ in range(max(1, pool_size))]
+        self._pool = queue.Queue()
+        for interpreter in self.interpreters:
+            self._pool.put(interpreter)
+
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+        # FOMO exports a single (1, H, W, C) heatmap; SSD exports boxes/classes/scores
+        self.is_fomo = len(self.output_details) == 1 and len(self.output_details[0]['shape']) == 4
+        self.invokes = 0
+        self.busy_time = 0.0
+
+    @property
+    def interpreter(self):
+        """The first interpreter, for callers that run inference on one thread"""
+        return self.interpreters[0]
+
+    def create_interpreter(self, num_threads=None):
+        """A new allocated interpreter built from the already loaded model bytes"""
+        kwargs = {"model_content": self.model_content,
+                  "num_threads": num_threads if num_threads is not None else self.num_threads}
+        if not self.use_xnnpack:
+            kwargs["experimental_op_resolver_type"] = tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        interpreter = tflite.Interpreter(**kwargs)
+        interpreter.allocate_tensors()
+        return interpreter
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        """Borrow a pooled interpreter for one request"""
+        interpreter = self._pool.get(timeout=timeout)
+        try:
+            yield interpreter
+        finally:
+            self._pool.put(interpreter)
+
+    def invoke(self, interpreter=None):
+        """Invoke (the primary interpreter by default) and account the time"""
+        interpreter = interpreter or self.interpreter
+        t0 = time.perf_counter()
+        interpreter.invoke()
+        self.busy_time += time.perf_counter() - t0
+        self.invokes += 1
+
+    def output(self, interpreter=None, index=0):
+        """Batch item 0 of output tensor `index`"""
+        interpreter = interpreter or self.interpreter
+        return interpreter.get_tensor(self.output_details[index]['index'])[0]
+
+    def benchmark(self, threads=None, iterations=100, warmup=10):
+        """p50/p95 invoke latency (ms) on random input for each thread count"""
+        if threads is None:
+            threads = range(1, (os.cpu_count() or 1) + 1)
+        detail = self.input_details[0]
+        dtype = np.dtype(detail['dtype'])
+        rng = np.random.default_rng(0)
+        if dtype.kind == 'f':
+            sample = rng.random(detail['shape'], dtype=np.float32).astype(dtype)
+        else:
+            info = np.iinfo(dtype)
+            sample = rng.integers(info.min, info.max + 1, detail['shape']).astype(dtype)
+
+        results = []
+        for count in threads:
+            interpreter = self.create_interpreter(num_threads=count)
+            interpreter.set_tensor(detail['index'], sample)
+            for _ in range(warmup):
+                interpreter.invoke()
+            times = []
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                interpreter.invoke()
+                times.append(time.perf_counter() - t0)
+            times.sort()
+            results.append({
+                "threads": count,
+                "p50_ms": round(times[len(times) // 2] * 1000, 3),
+                "p95_ms": round(times[int(len(times) * 0.95)] * 1000, 3),
+            })
+        return results
+
+    def stats(self):
+        return {
+            "model": self.model_path,
+            "num_threads": self.num_threads,
+            "xnnpack": self.use_xnnpack,
+            "pool_size": len(self.interpreters),
+            "pool_free": self._pool.qsize(),
+            "invokes": self.invokes,
+            "avg_invoke_ms": round(self.busy_time / self.invokes * 1000, 3) if self.invokes else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--threads', type=int, nargs='+', help="thread counts to sweep (default: 1..cpu_count)")
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--no-xnnpack', action='store_true', help="builtin kernels without the XNNPACK delegate")
+    args = parser.parse_args()
+
+    engine = InferenceEngine(args.model, use_xnnpack=not args.no_xnnpack)
+    detail = engine.input_details[0]
+    print(f"{args.model}: input {detail['shape'][1:]} {np.dtype(detail['dtype']).name}, "
+          f"{'FOMO' if engine.is_fomo else 'SSD'}, xnnpack={engine.use_xnnpack}")
+    for row in engine.benchmark(args.threads, args.iterations):
+        print(f"threads {row['threads']:>2}  p50 {row['p50_ms']:8.3f} ms  p95 {row['p95_ms']:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""TFLite inference in a separate process, fed through shared memory.
+
+main2 runs the camera reader, Flask's request threads, rendering, JPEG
+encoding and inference in one interpreter, and the Python parts of all
+of them (preprocessing, decoding, the tracker, per-client generators)
+take turns on the GIL. InferenceProcess moves the model to a child
+process with its own GIL and interpreter threads:
+
+- frames go through a FrameRing (shared memory, no pickling); the
+  caller copies one frame into a slot along with the crop to run on
+- the child preprocesses straight from the slot into its input tensor,
+  invokes and decodes, then writes the detections into a small
+  fixed-size numpy struct in a second shared block
+- a byte on one pipe announces a request and a byte on another its
+  result, so the waiting stage thread sleeps in select() without the GIL
+
+The child is this file run as a script rather than a multiprocessing
+Process: spawn would re-import main2 (and start a second camera) in it,
+and fork would copy main2's threads and sockets. It exits when the
+request pipe closes, so it never outlives the parent. If the child dies
+(killed, OOM) the next infer() starts a new one and counts a restart.
+
+  python inference_worker.py -n 200   # in-process vs worker round trip
+"""
+import os
+import select
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from fomo_decoder import Detection, FomoDecoder
+from frame_ring import FrameRing
+
+MAX_DETECTIONS = 16
+
+DETECTION = np.dtype([("x", "<i4"), ("y", "<i4"), ("width", "<i4"), ("height", "<i4"),
+                      ("confidence", "<f4"), ("label", "<i4"), ("cells", "<i4")])
+RESULT = np.dtype([("fomo", "<u4"), ("count", "<u4"), ("request", "<u8"), ("seq", "<u8"),
+                   ("dropped", "<u8"),  # request the worker answered without a result
+                   ("score", "<f4"), ("torn", "<u4"),
+                   ("preprocess_s", "<f8"), ("invoke_s", "<f8"), ("postprocess_s", "<f8"),
+                   ("invokes", "<u8"), ("detections", DETECTION, MAX_DETECTIONS)])
+
+
+def decode_detections(engine, decoder, width, height, threshold, interpreter=None):
+    """(detections sorted by confidence, best score) in a width x height crop from the model outputs"""
+    if decoder is not None:
+        # Thresholded in the int8 domain; one detection per blob of cells
+        detections = decoder.decode(engine.output(interpreter), width, height)
+        return detections, decoder.last_max_score
+    boxes = engine.output(interpreter, 0)
+    classes = engine.output(interpreter, 1)
+    scores = engine.output(interpreter, 2)
+    detections = []
+    for i in np.flatnonzero(scores > threshold):
+        ymin, xmin, ymax, xmax = boxes[i]
+        detections.append(Detection(
+            x=int((xmin + xmax) / 2 * width), y=int((ymin + ymax) / 2 * height),
+            width=int((xmax - xmin) * width), height=int((ymax - ymin) * height),
+            confidence=float(scores[i]), label=int(classes[i]), cells=0))
+    detections.sort(key=lambda d: d.confidence, reverse=True)
+    return detections, float(scores.max()) if len(scores) else 0.0
+
+
+class InferenceProcess:
+    def __init__(self, model_path, frame_shape, num_threads=None, threshold=0.12, slots=3, timeout=2.0):
+        self.model_path = model_path
+        self.frame_shape = frame_shape  # largest (h, w, channels) that will be submitted
+        self.num_threads = num_threads
+        self.threshold = threshold
+        self.slots = slots
+        self.timeout = timeout
+        self.is_fomo = None
+        self.process = None
+        self.ring = None
+        self.requests = 0
+        self.timeouts = 0
+        self.dropped = 0
+        self.restarts = 0
+        self.wait_time = 0.0
+
+    def start(self, ready_timeout=60.0):
+        self.ring = FrameRing.create(self.frame_shape, self.slots)
+        self._shm = shared_memory.SharedMemory(create=True, size=RESULT.itemsize)
+        self.result = np.ndarray((), RESULT, buffer=self._shm.buf)
+        self.result[()] = np.zeros((), RESULT)
+        request_r, self._request = os.pipe()
+        self._done, done_w = os.pipe()
+        cmd = [sys.executable, os.path.abspath(__file__), '--serve', self.ring.name, self._shm.name,
+               str(request_r), str(done_w), '--model', self.model_path, '--threshold', str(self.threshold)]
+        if self.num_threads is not None:
+            cmd += ['--threads', str(self.num_threads)]
+        self.process = subprocess.Popen(cmd, pass_fds=(request_r, done_w))
+        os.close(request_r)
+        os.close(done_w)
+        if not self._wait_done(ready_timeout):
+            self.stop()
+            raise RuntimeError(f"inference worker failed to load {self.model_path}")
+        self.is_fomo = bool(self.result["fomo"])
+        print(f"[INFER] worker process {self.process.pid} ready ({'FOMO' if self.is_fomo else 'SSD'})")
+        return self
+
+    def _wait_done(self, timeout):
+        """Consume result notifications; False on timeout or if the worker exited"""
+        ready, _, _ = select.select([self._done], [], [], max(timeout, 0))
+        return bool(ready) and bool(os.read(self._done, 64))
+
+    def restart(self):
+        """Replace a dead or wedged worker; False if the new one failed to load"""
+        print("[INFER] Restarting the inference worker")
+        self.restarts += 1
+        self.stop()
+        try:
+            self.start()
+        except (OSError, RuntimeError) as e:
+            print(f"[INFER] Worker restart failed: {e}")
+            return False
+        return True
+
+    def infer(self, frame, roi=None):
+        """(detections in crop pixels, best score, (preprocess_s, invoke_s, postprocess_s)), or None
+        when the worker gave no result (timeout, skipped frame, worker restarted)"""
+        if not self.alive() and not self.restart():
+            return None
+        t0 = time.perf_counter()
+        seq = self.ring.write(frame, roi=roi)
+        self.result["request"] = seq
+        self.requests += 1
+        try:
+            os.write(self._request, b"r")
+        except BrokenPipeError:  # died since the alive() check
+            self.restart()
+            return None
+        deadline = time.monotonic() + self.timeout
+        while int(self.result["seq"]) != seq:
+            if int(self.result["dropped"]) == seq:
+                self.dropped += 1
+                return None
+            # A result for an earlier, timed-out request may arrive first
+            if not self._wait_done(deadline - time.monotonic()):
+                self.timeouts += 1
+                if not self.alive():
+                    self.restart()
+                return None
+        result = self.result
+        detections = [Detection(*row.item()) for row in result["detections"][:int(result["count"])]]
+        timings = (float(result["preprocess_s"]), float(result["invoke_s"]), float(result["postprocess_s"]))
+        self.wait_time += time.perf_counter() - t0
+        return detections, float(result["score"]), timings
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.poll() is not None:
+                print(f"[INFER] Worker exited with code {self.process.returncode}")
+            os.close(self._request)  # a live worker exits on EOF
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            os.close(self._done)
+            self.process = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+            del self.result
+            self._shm.close()
+            self._shm.unlink()
+
+    def stats(self):
+        stats = {"pid": self.process.pid if self.process else None, "alive": self.alive(),
+                 "requests": self.requests, "timeouts": self.timeouts, "dropped": self.dropped,
+                 "restarts": self.restarts,
+                 "avg_round_trip_ms": round(self.wait_time / self.requests * 1000, 3) if self.requests else 0.0}
+        if self.ring is not None:
+            stats["invokes"] = int(self.result["invokes"])
+            stats["torn"] = int(self.result["torn"])
+            stats["ring"] = self.ring.stats()
+        return stats
+
+
+def serve(ring_name, result_name, request_fd, done_fd, model_path, num_threads, threshold):
+    """Worker side: answer requests until the request pipe closes"""
+    from inference_engine import InferenceEngine
+    from tflite_preprocess import InputPreprocessor
+
+    shm = shared_memory.SharedMemory(name=result_name)
+    resource_tracker.unregister(shm._name, "shared_memory")  # the parent owns it
+    result = np.ndarray((), RESULT, buffer=shm.buf)
+    ring = FrameRing.attach(ring_name)
+    engine = InferenceEngine(model_path, num_threads=num_threads)
+    preprocess = InputPreprocessor(engine.interpreter)
+    decoder = FomoDecoder(engine.output_details[0], threshold) if engine.is_fomo else None
+    result["fomo"] = engine.is_fomo
+    os.write(done_fd, b"R")
+
+    while os.read(request_fd, 64):
+        # Requests that arrived while busy collapse into the newest one
+        seq = int(result["request"])
+        found = ring.view(seq)
+        if found is None:
+            # Already overwritten by a newer request; tell the caller at once
+            result["dropped"] = seq
+            os.write(done_fd, b"d")
+            continue
+        _, frame, roi = found
+        height, width = frame.shape[:2] if roi is None else (roi[3] - roi[1], roi[2] - roi[0])
+
+        t0 = time.perf_counter()
+        preprocess(frame, roi)
+        del frame
+        if not ring.valid(seq):
+            result["torn"] += 1
+            result["dropped"] = seq
+            os.write(done_fd, b"d")
+            continue
+        t1 = time.perf_counter()
+        engine.invoke()
+        t2 = time.perf_counter()
+        detections, score = decode_detections(engine, decoder, width, height, threshold)
+        t3 = time.perf_counter()
+
+        count = min(len(detections), MAX_DETECTIONS)
+        for i, d in enumerate(detections[:count]):
+            result["detections"][i] = tuple(d)
+        result["count"] = count
+        result["score"] = score
+        result["preprocess_s"], result["invoke_s"], result["postprocess_s"] = t1 - t0, t2 - t1, t3 - t2
+        result["invokes"] = engine.invokes
+        result["seq"] = seq
+        os.write(done_fd, b"d")
+
+    del result
+    ring.close()
+    shm.close()
+
+
+def _benchmark(model_path, iterations, threads):
+    from inference_engine import InferenceEngine
+    from tflite_preprocess import InputPreprocessor
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+    engine = InferenceEngine(model_path, num_threads=threads)
+    preprocess = InputPreprocessor(engine.interpreter)
+    decoder = FomoDecoder(engine.output_details[0], 0.12) if engine.is_fomo else None
+
+    def local():
+        preprocess(frame)
+        engine.invoke()
+        decode_detections(engine, decoder, 320, 240, 0.12)
+
+    worker = InferenceProcess(model_path, frame.shape, num_threads=threads).start()
+    try:
+        for name, fn in (("in-process", local), ("worker", lambda: worker.infer(frame))):
+            for _ in range(10):
+                fn()
+            t0 = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            print(f"{name:<12}{(time.perf_counter() - t0) / iterations * 1000:8.2f} ms per frame")
+        print(f"worker stats: {worker.stats()}")
+    finally:
+        worker.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default="ei-model.tflite")
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--threshold', type=float, default=0.12)
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--serve', nargs=4, metavar=('RING', 'RESULT', 'REQUEST_FD', 'DONE_FD'),
+                        help=argparse.SUPPRESS)  # started by InferenceProcess
+    args = parser.parse_args()
+    if args.serve:
+        ring_name, result_name, request_fd, done_fd = args.serve
+        serve(ring_name, result_name, int(request_fd), int(done_fd), args.model, args.threads, args.threshold)
+    else:
+        _benchmark(args.model, args.iterations, args.threads or 2)
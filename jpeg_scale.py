@@ -0,0 +1,129 @@
+"""Decode JPEGs directly at a reduced scale.
+
+Every camera path decoded the full 640x480 JPEG and then resized it down
+to 320x240 (and on to the model's input). libjpeg can instead run the
+inverse DCT at 1/2, 1/4 or 1/8 scale, which skips most of the decode work
+and the resize. decode() and open_pil() take the size the consumer needs,
+read the frame size from the JPEG header and pick the largest reduction
+whose output still covers it (cv2.IMREAD_REDUCED_COLOR_* in the OpenCV
+paths, Image.draft in the PIL ones).
+
+  python jpeg_scale.py frames/   # full decode + resize vs reduced decode
+"""
+import io
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # main2_no_cv and mjpeg_reader run with PIL only
+    cv2 = None
+
+SCALES = (1, 2, 4, 8)
+
+if cv2 is not None:
+    CV2_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# Start-of-frame markers carry the image size (DHT, JPG and DAC share the range)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(jpeg):
+    """(width, height) from the JPEG's SOF segment, or None"""
+    data = memoryview(jpeg)
+    i = 2
+    end = len(data) - 9
+    while i < end:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            return (data[i + 7] << 8 | data[i + 8], data[i + 5] << 8 | data[i + 6])
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            i += 2
+            continue
+        i += 2 + (data[i + 2] << 8 | data[i + 3])
+    return None
+
+
+def reduction_for(source_size, wanted_size):
+    """Largest libjpeg scale (1, 2, 4 or 8) whose output still covers wanted_size"""
+    if not source_size or not wanted_size:
+        return 1
+    (sw, sh), (ww, wh) = source_size, wanted_size
+    best = 1
+    for scale in SCALES:
+        # libjpeg rounds scaled dimensions up
+        if -(-sw // scale) >= ww and -(-sh // scale) >= wh:
+            best = scale
+    return best
+
+
+def decode_at(jpeg, scale):
+    """cv2 decode of jpeg to BGR at 1/scale"""
+    return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), CV2_FLAGS[scale])
+
+
+def decode(jpeg, wanted_size=None):
+    """cv2 decode of jpeg to BGR, reduced as far as wanted_size (w, h) allows"""
+    scale = reduction_for(jpeg_size(jpeg), wanted_size) if wanted_size else 1
+    return decode_at(jpeg, scale)
+
+
+def open_pil(jpeg, wanted_size=None, mode='RGB'):
+    """PIL image of jpeg; Image.draft lets libjpeg decode at the reduced scale"""
+    from PIL import Image
+    img = Image.open(io.BytesIO(jpeg))
+    if wanted_size:
+        img.draft(mode, tuple(wanted_size))
+    return img.convert(mode) if img.mode != mode else img
+
+
+def _benchmark(jpegs, wanted, iterations):
+    import time
+
+    def measure(fn):
+        t0 = time.perf_counter()
+        for i in range(iterations):
+            fn(jpegs[i % len(jpegs)])
+        return (time.perf_counter() - t0) / iterations * 1000
+
+    print(f"{len(jpegs)} JPEGs of {jpeg_size(jpegs[0])}, consumer wants {wanted}, "
+          f"scale 1/{reduction_for(jpeg_size(jpegs[0]), wanted)}")
+    if cv2 is not None:
+        full = measure(lambda j: cv2.resize(decode(j), wanted))
+        reduced = measure(lambda j: cv2.resize(decode(j, wanted), wanted))
+        print(f"cv2  full decode + resize {full:6.2f} ms   reduced decode + resize {reduced:6.2f} ms   "
+              f"({full / reduced:.1f}x)")
+    full = measure(lambda j: open_pil(j).resize(wanted))
+    reduced = measure(lambda j: open_pil(j, wanted).resize(wanted))
+    print(f"PIL  full decode + resize {full:6.2f} ms   reduced decode + resize {reduced:6.2f} ms   "
+          f"({full / reduced:.1f}x)")
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('frames', nargs='?', help="directory of .jpg frames (default: synthetic 640x480)")
+    parser.add_argument('--size', type=int, nargs=2, default=(320, 240), metavar=('W', 'H'))
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.frames:
+        jpegs = []
+        for path in sorted(glob.glob(os.path.join(args.frames, '*.jpg'))):
+            with open(path, 'rb') as f:
+                jpegs.append(f.read())
+    else:
+        rng = np.random.default_rng(0)
+        noise = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        jpegs = [cv2.imencode('.jpg', cv2.GaussianBlur(noise, (9, 9), 0))[1].tobytes()]
+    _benchmark(jpegs, tuple(args.size), args.iterations)
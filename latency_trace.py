@@ -0,0 +1,89 @@
+"""Glass-to-motor latency trace.
+
+A steering command carries a FrameTag with the monotonic times at which
+its source frame was captured and inferred on and the command decided.
+The transport passes every tag that goes on the wire to
+LatencyTrace.record. A ring buffer keeps the most recent commands and
+summarises the capture -> inference -> decision -> send breakdown.
+"""
+import collections
+import json
+import threading
+
+# seq/captured: the frame the decision came from; inferred: when its
+# detections were ready; decided: when the control stage chose the command
+FrameTag = collections.namedtuple("FrameTag", "seq captured inferred decided")
+
+SEGMENTS = (
+    ("capture_to_inference", "captured", "inferred"),
+    ("inference_to_decision", "inferred", "decided"),
+    ("decision_to_send", "decided", "sent"),
+    ("capture_to_send", "captured", "sent"),
+)
+
+
+class LatencyTrace:
+    def __init__(self, size=2000):
+        self._cond = threading.Condition()
+        self._entries = collections.deque(maxlen=size)
+        self.recorded = 0
+
+    def record(self, cmd, tag, sent):
+        """One command sent at `sent` (monotonic) that was derived from tag"""
+        entry = {"seq": tag.seq, "command": cmd, "captured": tag.captured,
+                 "inferred": tag.inferred, "decided": tag.decided, "sent": sent}
+        with self._cond:
+            self._entries.append(entry)
+            self.recorded += 1
+            self._cond.notify_all()
+
+    @staticmethod
+    def _with_latencies(entry):
+        result = {"seq": entry["seq"], "command": entry["command"]}
+        for name, start, end in SEGMENTS:
+            result[name + "_ms"] = round((entry[end] - entry[start]) * 1000, 2)
+        return result
+
+    def entries(self, limit=None):
+        """Newest `limit` traced commands (all when None), oldest first"""
+        with self._cond:
+            entries = list(self._entries)
+        if limit is not None:
+            entries = entries[max(len(entries) - limit, 0):]  # [-0:] would be everything
+        return [self._with_latencies(e) for e in entries]
+
+    def summary(self):
+        with self._cond:
+            entries = list(self._entries)
+        result = {"recorded": self.recorded, "window": len(entries)}
+        for name, start, end in SEGMENTS:
+            values = sorted(e[end] - e[start] for e in entries)
+            if not values:
+                result[name] = None
+                continue
+            pick = lambda p: round(values[min(int(len(values) * p / 100), len(values) - 1)] * 1000, 2)
+            result[name] = {"p50_ms": pick(50), "p95_ms": pick(95), "max_ms": round(values[-1] * 1000, 2)}
+        return result
+
+    def follow(self, running=lambda: True, timeout=1.0):
+        """Yield entries as they are recorded (for a streaming endpoint)"""
+        with self._cond:
+            seen = self.recorded
+        while running():
+            with self._cond:
+                if not self._cond.wait_for(lambda: self.recorded != seen, timeout):
+                    continue
+                new = min(self.recorded - seen, len(self._entries))
+                batch = list(self._entries)[-new:]
+                seen = self.recorded
+            for entry in batch:
+                yield self._with_latencies(entry)
+
+    def dump(self, path):
+        """Write the buffered entries, raw timestamps included, as JSON lines"""
+        with self._cond:
+            entries = list(self._entries)
+        with open(path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        return len(entries)
@@ -0,0 +1,79 @@
+"""Newest camera frame kept as the camera's JPEG, decoded only on demand.
+
+LazyFrame stores the JPEG bytes as received so they can be relayed
+untouched, and decodes them the first time a consumer (tracker, pose
+detector) asks for pixels. A consumer that passes the size it needs gets
+a reduced-scale decode (see jpeg_scale). Decodes are cached per frame
+and scale and shared by all consumers of that frame. Sources that produce
+pixels directly (a local webcam) store the array instead.
+"""
+import threading
+import time
+
+import jpeg_scale
+
+
+class LazyFrame:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decode_lock = threading.Lock()
+        self._seq = 0
+        self._jpeg = None
+        self._size = None  # current JPEG's (w, h), read from its header on first use
+        self._pixels = {}  # libjpeg scale -> decoded frame, for the current seq
+        self.timestamp = 0.0
+        self.decodes = 0
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def set_jpeg(self, jpeg):
+        """Publish a new camera JPEG without decoding it"""
+        with self._lock:
+            self._jpeg = jpeg
+            self._size = None  # the camera may change resolution between frames
+            self._pixels = {}
+            self._seq += 1
+            self.timestamp = time.monotonic()
+
+    def set_pixels(self, frame):
+        """Publish a frame that is already decoded (no JPEG to relay)"""
+        with self._lock:
+            self._jpeg = None
+            self._size = None
+            self._pixels = {1: frame}
+            self._seq += 1
+            self.timestamp = time.monotonic()
+
+    def jpeg(self):
+        """(seq, jpeg bytes or None)"""
+        with self._lock:
+            return self._seq, self._jpeg
+
+    def pixels(self, size=None):
+        """(seq, BGR frame or None) at least size (w, h) when given, decoded once per frame and scale"""
+        with self._lock:
+            seq, jpeg, cache, jpeg_size = self._seq, self._jpeg, self._pixels, self._size
+            if jpeg is None:
+                return seq, cache.get(1)
+        if jpeg_size is None:
+            jpeg_size = jpeg_scale.jpeg_size(jpeg)
+            with self._lock:
+                if self._seq == seq:
+                    self._size = jpeg_size
+        scale = jpeg_scale.reduction_for(jpeg_size, size)
+        frame = cache.get(scale)
+        if frame is not None:
+            return seq, frame
+        with self._decode_lock:
+            frame = cache.get(scale)  # decoded by another consumer meanwhile
+            if frame is None:
+                frame = jpeg_scale.decode_at(jpeg, scale)
+                self.decodes += 1
+                cache[scale] = frame
+        return seq, frame
+
+    def stats(self):
+        return {"frames": self._seq, "decodes": self.decodes,
+                "decode_ratio": round(self.decodes / self._seq, 3) if self._seq else 0.0}
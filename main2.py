@@ -1,13 +1,34 @@
 # main2.py - Raspberry Pi Camera version
 from flask import Flask, render_template_string, Response, request, jsonify
+import atexit
+import os
 import threading
 import time
-import socket
 import requests
 import numpy as np
 import subprocess
+import select
 import sys
 import json
+
+from cadence_controller import CadenceController, parse_settings
+from camera_service import CameraClient
+from event_hub import EventHub
+from fomo_decoder import FomoDecoder
+from frame_hub import FrameHub
+from inference_worker import InferenceProcess, decode_detections
+import jpeg_scale
+from latency_trace import FrameTag, LatencyTrace
+from metrics import Registry, instrument_flask
+from mjpeg_demux import MJPEGDemuxer
+from motion_gate import MotionGate
+from motor_scheduler import CommandScheduler
+from udp_transport import CommandTransport
+from pipeline import Mailbox, Pipeline, Stage
+from presence_cascade import PresenceCascade
+from target_tracker import TargetTracker
+from telemetry import TelemetryReceiver
+from tflite_preprocess import InputPreprocessor
 try:
     import cv2
 except ImportError:
@@ -15,28 +36,43 @@ except ImportError:
     sys.exit(1)
 
 try:
-    import tflite_runtime.interpreter as tflite
+    from inference_engine import InferenceEngine
 except ImportError:
-    try:
-        import tensorflow.lite as tflite
-    except ImportError:
-        print("ERROR: Install tflight-runtime or tensorflow")
-        sys.exit(1)
+    print("ERROR: Install tflight-runtime or tensorflow")
+    sys.exit(1)
 
 # ===== CONFIG =====
-ESP8266_IP = "10.109.142.186"  # robot UDP IP
-ESP8266_PORT = 8888
-ESP8266_STATUS_PORT = 8889  # For receiving status updates
+ESP8266_IP = os.environ.get("ESP8266_IP", "10.109.142.186")  # robot UDP IP
+ESP8266_PORT = int(os.environ.get("ESP8266_PORT", 8888))
+ESP8266_STATUS_PORT = int(os.environ.get("ESP8266_STATUS_PORT", 8889))  # For receiving status updates
+ULTRASONIC_SAFE_DISTANCE = 100  # cm; closer readings are drawn as unsafe
 
 # Car Assistant API
-CAR_ASSISTANT_URL = "http://10.82.36.233:8000"  # Chat bot server IP (fallback if offline)
+CAR_ASSISTANT_URL = os.environ.get("CAR_ASSISTANT_URL", "http://10.82.36.233:8000")  # Chat bot server IP (fallback if offline)
 
 FRAME_W = 320
 FRAME_H = 240
 
+# Camera capture
+# "mjpeg" or "yuv420" (persistent rpicam-vid), "still" (rpicam-jpeg per frame),
+# "shared" (frames from camera_service.py, which start_servers.py runs)
+CAMERA_MODE = os.environ.get("CAMERA_MODE", "mjpeg")
+CAMERA_W = 640
+CAMERA_H = 480
+CAMERA_FPS = 30
+CAMERA_STALL_TIMEOUT = 2.0  # Restart rpicam-vid if no data arrives for this long
+CAMERA_RESTART_DELAY = 1.0
+# Largest size any consumer needs (render, model crops); JPEGs are decoded
+# at the largest 1/2, 1/4 or 1/8 DCT scale that still covers it
+CAMERA_DECODE_SIZE = (FRAME_W, FRAME_H)
+
 # TFLite model
 MODEL_PATH = "ei-model.tflite"
+INFERENCE_THREADS = 2  # Leave cores for capture, rendering and JPEG encoding
 CONFIDENCE_THRESHOLD = 0.12  # Lower for better edge detection
+# Run the model in a child process fed through shared memory, so inference
+# no longer competes with capture, Flask and rendering for the GIL
+INFERENCE_PROCESS = os.environ.get("INFERENCE_PROCESS", "0") == "1"
 
 # Speed control variables
 forward_speed = 200  # Default forward speed (0-255) - increased
@@ -45,22 +81,40 @@ turn_speed = 120     # Default turn speed (0-255) - increased
 # Target tracking variables
 DEBOUNCE_FRAMES = 5   # Reduced for faster response
 SEARCH_FRAMES = 15    # Reduced search time
-detection_history = []  # Track recent detections
-HISTORY_SIZE = 3      # Smaller window for faster response
-position_history = []  # Track position for smoothing
-POSITION_HISTORY_SIZE = 3
-frames_without_detection = 0
-last_known_x = None
-target_locked = False
+TRACK_MIN_HITS = 2    # Detections a new track needs before it is followed
 
 CMD_MIN_INTERVAL = 0.05
-FRAME_SKIP = 4
+CMD_KEEPALIVE_INTERVAL = 0.5  # Re-send the last command this often while nothing else is sent
+TURN_PULSE_MS = 60  # Turn pulse length before the scheduled STOP
+FRAME_SKIP = 6  # Starting frames per inference; the tracker predicts the rest
+INFERENCE_TARGET_RATE = 5.0  # Wanted steering decisions from the model per second
+INFERENCE_CPU_BUDGET = 0.5   # Fraction of one core inference may use
+PRESENCE_CASCADE = True  # Cheap empty-scene check before the full detector
+MOTION_MAX_STALENESS = 1.0  # Static scene: still run inference at least this often (s)
+CONTROL_INTERVAL = 0.12  # Re-issue an unchanged motor decision at most this often
+
+# Region-of-interest inference: once a target is tracked, run the model on
+# a square crop around it at capture resolution instead of the whole frame
+ROI_ENABLED = True
+ROI_MARGIN = 3.0          # Crop side as a multiple of the target's larger dimension
+ROI_MIN_SIZE = 192        # Smallest crop side in CAMERA_W-wide pixels
+ROI_FULL_SCAN_EVERY = 5   # Every Nth inference still scans the full frame
+
+METRICS_ENABLED = True  # Stage/step histograms and counters for /metrics
+
+# The page draws zones, target and status on a canvas from /events; the
+# camera's JPEGs go to /video_feed untouched. True burns the overlay into
+# re-encoded frames instead (clients without the canvas, recordings).
+SERVER_OVERLAY = False
 
 # ===== GLOBALS =====
 app = Flask(__name__)
-frame_lock = threading.Lock()
-output_frame = None
+metrics = Registry(prefix="robot_", enabled=METRICS_ENABLED)
+instrument_flask(app, metrics)
+steps = metrics.histogram("step_seconds", "Latency of individual steps inside the stages", ("step",))
 running = True
+video_hub = FrameHub()  # JPEG encoded once per frame, shared by all /video_feed clients
+event_hub = EventHub()  # Per-frame overlay metadata for /events clients
 
 mode_lock = threading.Lock()
 current_mode = "MANUAL"  # MANUAL or AUTO
@@ -70,33 +124,65 @@ mic_lock = threading.Lock()
 current_mic_source = "raspberry_pi"  # "raspberry_pi" or "phone"
 phone_audio_stream = None
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-last_send_time = 0.0
-last_sent_cmd = None
+# Every command derived from a frame is traced from capture to sendto
+trace = LatencyTrace()
+glass_to_motor = metrics.histogram("glass_to_motor_seconds", "Frame capture to UDP send of the command derived from it")
+
+def command_sent(cmd, tag, sent):
+    trace.record(cmd, tag, sent)
+    glass_to_motor.observe(sent - tag.captured)
+
+# Owns the UDP socket: coalesces bursts, sends STOP immediately and
+# suppresses duplicates, re-sending the last command as a keepalive
+transport = CommandTransport(ESP8266_IP, ESP8266_PORT, min_interval=CMD_MIN_INTERVAL,
+                             keepalive_interval=CMD_KEEPALIVE_INTERVAL, metrics=metrics,
+                             on_send=command_sent)
 
 # Ultrasonic status
-ultrasonic_distance = 0
-ultrasonic_safe = True
-status_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-status_sock.bind(('', ESP8266_STATUS_PORT))
-status_sock.settimeout(0.1)
+telemetry = TelemetryReceiver(ESP8266_STATUS_PORT, safe_distance=ULTRASONIC_SAFE_DISTANCE).start()
 
 # TFLite setup
-interpreter = tflite.Interpreter(model_path=MODEL_PATH)
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
-input_shape = input_details[0]['shape']
-input_height = input_shape[1]
-input_width = input_shape[2]
-input_channels = input_shape[3]
-input_index = input_details[0]['index']
-is_fomo = len(output_details) == 1 and len(output_details[0]['shape']) == 4
+if INFERENCE_PROCESS:
+    # Slots fit a full-resolution frame (yuv420 mode is not decoded reduced)
+    worker = InferenceProcess(MODEL_PATH, (CAMERA_H, CAMERA_W, 3), num_threads=INFERENCE_THREADS,
+                              threshold=CONFIDENCE_THRESHOLD).start()
+    atexit.register(worker.stop)
+    engine = interpreter = output_details = preprocess = decoder = None
+    is_fomo = worker.is_fomo
+else:
+    worker = None
+    engine = InferenceEngine(MODEL_PATH, num_threads=INFERENCE_THREADS)
+    interpreter = engine.interpreter
+    output_details = engine.output_details
+    preprocess = InputPreprocessor(interpreter)  # writes camera frames straight into the input tensor
+    is_fomo = engine.is_fomo
+    decoder = FomoDecoder(output_details[0], CONFIDENCE_THRESHOLD) if is_fomo else None
 
 # ===== Raspberry Pi Camera =====
 class RPiCamera:
-    def __init__(self):
+    """Raspberry Pi camera reader.
+
+    In "mjpeg" and "yuv420" modes a single long-lived rpicam-vid process
+    streams frames to stdout and the reader thread demuxes them from the
+    pipe; the process is restarted automatically if it exits or stalls.
+    "still" mode keeps the old behaviour of one rpicam-jpeg call per frame.
+    "shared" mode opens no device: it reads the JPEGs camera_service.py
+    publishes in shared memory, so other processes can use the camera too.
+    Each frame is published as latest = (seq, captured, frame, jpeg),
+    captured being the monotonic time its bytes arrived from the camera and
+    jpeg the camera's own encoding (None in yuv420 mode).
+    """
+    def __init__(self, width=CAMERA_W, height=CAMERA_H, framerate=CAMERA_FPS, mode=CAMERA_MODE,
+                 decode_size=CAMERA_DECODE_SIZE):
+        self.width = width
+        self.height = height
+        self.decode_size = decode_size  # JPEG modes decode at a reduced scale covering this
+        self.framerate = framerate
+        self.mode = mode
         self.frame = None
+        self.latest = None
+        self.frame_count = 0
+        self.restarts = 0
         self.running = False
         self.thread = None
         self.process = None
@@ -111,23 +197,118 @@ class RPiCamera:
     def _capture_frames(self):
         while self.running:
             try:
-                cmd = ['rpicam-jpeg', '-o', '-', '--width', '640', '--height', '480', 
-                       '--nopreview', '-n', '-t', '1']
-                
-                while self.running:
-                    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=2)
-                    if result.returncode == 0 and result.stdout:
-                        try:
-                            frame = cv2.imdecode(np.frombuffer(result.stdout, dtype=np.uint8), cv2.IMREAD_COLOR)
-                            if frame is not None:
-                                self.frame = frame
-                        except:
-                            pass
-                    time.sleep(0.03)
-                            
+                if self.mode == "still":
+                    self._capture_stills()
+                elif self.mode == "shared":
+                    self._capture_shared()
+                else:
+                    self._capture_stream()
             except Exception as e:
                 print(f"[CAMERA] Error: {e}")
-                time.sleep(1)
+            if self.running:
+                self.restarts += 1
+                print(f"[CAMERA] Capture stopped, restarting in {CAMERA_RESTART_DELAY}s...")
+                time.sleep(CAMERA_RESTART_DELAY)
+
+    def _capture_stills(self):
+        cmd = ['rpicam-jpeg', '-o', '-', '--width', str(self.width), '--height', str(self.height),
+               '--nopreview', '-n', '-t', '1']
+        while self.running:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=2)
+            captured = time.monotonic()
+            if result.returncode == 0 and result.stdout:
+                try:
+                    frame = jpeg_scale.decode(result.stdout, self.decode_size)
+                    if frame is not None:
+                        self._set_frame(frame, captured, result.stdout)
+                except:
+                    pass
+            time.sleep(0.03)
+
+    def _capture_shared(self):
+        client = CameraClient()
+        print(f"[CAMERA] Reading frames from the camera service ({client.name})")
+        try:
+            while self.running:
+                found = client.next_jpeg(timeout=CAMERA_STALL_TIMEOUT)
+                if found is None:
+                    raise RuntimeError(f"no frames from the camera service for {CAMERA_STALL_TIMEOUT}s")
+                _, captured, jpeg = found  # captured by the service, same monotonic clock
+                with steps.time("jpeg_decode"):
+                    frame = jpeg_scale.decode(jpeg, self.decode_size)
+                if frame is not None:
+                    self._set_frame(frame, captured, jpeg)
+        finally:
+            client.close()
+
+    def _capture_stream(self):
+        cmd = ['rpicam-vid', '-t', '0', '-n', '--nopreview',
+               '--width', str(self.width), '--height', str(self.height),
+               '--framerate', str(self.framerate), '--codec', self.mode, '-o', '-']
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        print(f"[CAMERA] rpicam-vid started ({self.mode} {self.width}x{self.height}@{self.framerate})")
+        try:
+            if self.mode == "yuv420":
+                self._read_yuv420(self.process.stdout)
+            else:
+                self._read_mjpeg(self.process.stdout)
+        finally:
+            self._stop_process()
+
+    def _wait_readable(self, pipe):
+        ready, _, _ = select.select([pipe], [], [], CAMERA_STALL_TIMEOUT)
+        if not ready:
+            raise RuntimeError(f"no data from rpicam-vid for {CAMERA_STALL_TIMEOUT}s")
+
+    def _read_mjpeg(self, pipe):
+        demuxer = MJPEGDemuxer()
+        while self.running:
+            self._wait_readable(pipe)
+            chunk = pipe.read(65536)
+            captured = time.monotonic()
+            if not chunk:
+                return
+            # Only decode the newest complete JPEG from this chunk
+            jpeg = demuxer.latest(chunk)
+            if jpeg is not None:
+                with steps.time("jpeg_decode"):
+                    frame = jpeg_scale.decode(jpeg, self.decode_size)
+                if frame is not None:
+                    self._set_frame(frame, captured, jpeg)
+
+    def _read_yuv420(self, pipe):
+        # rpicam-vid writes I420 planes back to back; widths that are a
+        # multiple of 64 have no row padding.
+        frame_size = self.width * self.height * 3 // 2
+        raw = bytearray(frame_size)
+        view = memoryview(raw)
+        while self.running:
+            filled = 0
+            while filled < frame_size:
+                self._wait_readable(pipe)
+                n = pipe.readinto(view[filled:])
+                if not n:
+                    return
+                filled += n
+            captured = time.monotonic()
+            yuv = np.frombuffer(raw, dtype=np.uint8).reshape(self.height * 3 // 2, self.width)
+            with steps.time("yuv_convert"):
+                frame = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+            self._set_frame(frame, captured)
+
+    def _set_frame(self, frame, captured, jpeg=None):
+        self.frame = frame
+        self.frame_count += 1
+        self.latest = (self.frame_count, captured, frame, jpeg)
+
+    def _stop_process(self):
+        process, self.process = self.process, None
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
                 
     def read(self):
         return self.frame is not None, self.frame
@@ -137,8 +318,7 @@ class RPiCamera:
         
     def release(self):
         self.running = False
-        if self.process:
-            self.process.terminate()
+        self._stop_process()
         if self.thread:
             self.thread.join()
 
@@ -152,21 +332,20 @@ else:
     print("[CAMERA] Waiting for camera initialization...")
 
 def send_burst(command, times, delay=0.05):
-    for _ in range(times):
-        sock.sendto(command.encode(), (ESP8266_IP, ESP8266_PORT))
-        time.sleep(delay)
-    sock.sendto("STOP".encode(), (ESP8266_IP, ESP8266_PORT))
+    """Schedule command `times` times, then STOP, without blocking"""
+    motor.burst(command, times, int(delay * 1000))
 
-def send_speed_command(direction):
-    """Send direction command with current speed settings"""
-    global forward_speed, turn_speed
+def speed_command(direction):
+    """Direction command with current speed settings"""
     if direction == "FORWARD":
-        cmd = f"FORWARD:{forward_speed}"
+        return f"FORWARD:{forward_speed}"
     elif direction in ["LEFT", "RIGHT"]:
-        cmd = f"{direction}:{turn_speed}"
-    else:
-        cmd = direction
-    sock.sendto(cmd.encode(), (ESP8266_IP, ESP8266_PORT))
+        return f"{direction}:{turn_speed}"
+    return direction
+
+def send_speed_command(direction):
+    """Send direction command with current speed settings"""
+    transport.send(speed_command(direction))
 
 def query_car_assistant(question):
     """Send POST request to car assistant /query endpoint with fallback"""
@@ -181,228 +360,317 @@ def query_car_assistant(question):
     except Exception as e:
         return {"error": f"API offline - {str(e)}"}
 
-# ===== UDP sending helpers (rate-limited, send-on-change) =====
-def send_udp_once(cmd):
-    global last_send_time, last_sent_cmd
-    try:
-        sock.sendto(cmd.encode(), (ESP8266_IP, ESP8266_PORT))
-        last_send_time = time.time()
-        last_sent_cmd = cmd
-        print("[UDP] ->", cmd)
-    except Exception as e:
-        print("[UDP] send error:", e)
-
-def send_udp_if_changed(cmd):
-    now = time.time()
-    global last_send_time, last_sent_cmd
-    if cmd == last_sent_cmd and (now - last_send_time) < CMD_MIN_INTERVAL:
-        return
-    if (now - last_send_time) < CMD_MIN_INTERVAL and cmd != last_sent_cmd:
-        # respect min interval
-        return
-    send_udp_once(cmd)
-
-def tracking_loop():
-    global output_frame, current_mode, frames_without_detection, last_known_x, target_locked, camera, ultrasonic_distance, ultrasonic_safe
-    frame_count = 0
-
-    while running:
-        ret, frame = camera.read()
-        if not ret or frame is None:
-            time.sleep(0.1)
-            continue
-
-        img = cv2.resize(frame, (FRAME_W, FRAME_H))
-        H, W = img.shape[:2]
-
-        # Always draw zone lines regardless of mode
-        # 3-Zone system: LEFT | CENTER | RIGHT (adjusted for better edge detection)
-        left_zone = int(W * 0.35)   # 0-35% (wider left zone)
-        right_zone = int(W * 0.65)  # 65-100% (wider right zone)
-        
-        # Draw zone boundaries with thick white lines
-        cv2.line(img, (left_zone, 0), (left_zone, H), (255, 255, 255), 5)
-        cv2.line(img, (right_zone, 0), (right_zone, H), (255, 255, 255), 5)
-        
-        # Draw colored zone overlays (semi-transparent)
-        overlay = img.copy()
-        cv2.rectangle(overlay, (0, 0), (left_zone, H), (0, 255, 255), -1)  # Yellow LEFT
-        cv2.rectangle(overlay, (left_zone, 0), (right_zone, H), (0, 255, 0), -1)  # Green CENTER
-        cv2.rectangle(overlay, (right_zone, 0), (W, H), (255, 0, 255), -1)  # Magenta RIGHT
-        cv2.addWeighted(overlay, 0.1, img, 0.9, 0, img)
-        
-        # Zone labels
-        cv2.putText(img, "LEFT", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-        cv2.putText(img, "CENTER", (left_zone+10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        cv2.putText(img, "RIGHT", (right_zone+10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
-
-        with mode_lock:
-            mode_now = current_mode
-
-        if mode_now == "AUTO":
-            frame_count += 1
-            if frame_count % FRAME_SKIP != 0:
-                with frame_lock:
-                    output_frame = img.copy()
-                continue
-
-            # TFLite inference
-            img_resized = cv2.resize(img, (input_width, input_height), interpolation=cv2.INTER_NEAREST)
-            if input_channels == 1:
-                img_processed = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
-                img_processed = np.expand_dims(img_processed, axis=-1)
+# Turn pulses and their follow-up STOPs are sent from the scheduler thread
+motor = CommandScheduler(transport.send).start()
+
+def publish_frame(img):
+    """Encode the rendered frame once for /video_feed viewers"""
+    if video_hub.has_clients():
+        with steps.time("jpeg_encode"):
+            (flag, encodedImage) = cv2.imencode(".jpg", img)
+        if flag:
+            video_hub.publish(encodedImage.tobytes())
+
+# ===== Tracking pipeline =====
+# capture -> inference -> control, with render consuming every captured
+# frame. Stages are linked by latest-value-wins mailboxes so a slow stage
+# never makes the others wait, and inference always sees the newest frame.
+infer_box = Mailbox("inference")
+control_box = Mailbox("control")
+render_box = Mailbox("render")
+
+ZONE_LEFT = 0.35   # 0-35% (wider left zone)
+ZONE_RIGHT = 0.65  # 65-100% (wider right zone)
+
+capture_seq = 0
+last_camera_count = 0
+# Latest control decision for the renderer; replaced as a whole by the
+# control stage, never mutated.
+overlay_state = {"status": "STOP", "zone_color": (0, 0, 255), "detection": None, "others": []}
+last_status = None
+last_command_time = 0.0
+# (seq, captured, inferred) of the newest frame folded into the tracker;
+# control decisions are tagged with it
+last_inference = None
+
+def set_last_inference(seq, captured):
+    global last_inference
+    last_inference = (seq, captured, time.monotonic())
+
+# One alpha-beta track per person; DEBOUNCE_FRAMES and SEARCH_FRAMES count
+# inference results, not camera frames
+tracker = TargetTracker(gate=FRAME_W * 0.25, max_missed=SEARCH_FRAMES, min_hits=TRACK_MIN_HITS,
+                        bounds=(FRAME_W, FRAME_H))
+roi_stats = {"roi": 0, "full": 0, "last_roi": None}
+# Inference runs on motion (FRAME_SKIP apart) or when the last one is stale
+motion_gate = MotionGate(min_frames=FRAME_SKIP, max_staleness=MOTION_MAX_STALENESS)
+# Retunes the gate's frame spacing from measured capture FPS and inference latency
+# Tier 1 presence check; the model only runs on frames that may hold a person
+cascade = PresenceCascade(enabled=PRESENCE_CASCADE)
+cadence = CadenceController(INFERENCE_TARGET_RATE, INFERENCE_CPU_BUDGET, frame_skip=FRAME_SKIP,
+                            viewers=video_hub.client_count)
+
+def capture_stage():
+    """Grab each new camera frame and hand it to inference and rendering"""
+    global capture_seq, last_camera_count
+    if camera.frame_count == last_camera_count:
+        time.sleep(0.002)
+        return None
+    last_camera_count = camera.frame_count
+    latest = camera.latest
+    if latest is None:
+        time.sleep(0.1)
+        return None
+    _, captured, frame, jpeg = latest
+
+    capture_seq += 1
+    motion_gate.min_frames = cadence.observe_frame()
+    render_box.put((capture_seq, frame, jpeg))
+
+    with mode_lock:
+        mode_now = current_mode
+    if mode_now == "AUTO":
+        if motion_gate.should_infer(frame):
+            now = time.monotonic()
+            if cascade.should_detect(frame, locked=tracker.target(now) is not None, now=now):
+                # Inference resizes straight from the camera resolution
+                infer_box.put((capture_seq, frame, captured, motion_gate.trigger_time))
             else:
-                img_processed = img_resized[:, :, ::-1]
-            
-            input_data = np.expand_dims(img_processed, axis=0)
-            if input_details[0]['dtype'] == np.float32:
-                input_data = np.float32(input_data) / 255.0
-            elif input_details[0]['dtype'] == np.int8:
-                input_data = (input_data.astype(np.int16) - 128).astype(np.int8)
-            
-            interpreter.set_tensor(input_index, input_data)
-            interpreter.invoke()
-
-            detected = False
-            center_x = 0
-
-            if is_fomo:
-                output_data = interpreter.get_tensor(output_details[0]['index'])[0]
-                if output_details[0]['dtype'] == np.int8:
-                    output_data = (output_data.astype(np.float32) + 128) / 255.0
-                if output_data.shape[2] > 1:
-                    output_data = output_data[:, :, 1:]
-                
-                max_idx = np.argmax(output_data)
-                max_y, max_x, max_c = np.unravel_index(max_idx, output_data.shape)
-                max_val = output_data[max_y, max_x, max_c]
-
-                # Add to detection history for smoothing
-                detection_history.append(max_val)
-                if len(detection_history) > HISTORY_SIZE:
-                    detection_history.pop(0)
-                
-                # Use average confidence for more stable detection
-                avg_confidence = sum(detection_history) / len(detection_history)
-                
-                if avg_confidence > CONFIDENCE_THRESHOLD:
-                    detected = True
-                    grid_h, grid_w, _ = output_data.shape
-                    center_x = int((max_x + 0.5) * (W / grid_w))
-                    center_y = int((max_y + 0.5) * (H / grid_h))
-                    
-                    # Add position smoothing
-                    position_history.append(center_x)
-                    if len(position_history) > POSITION_HISTORY_SIZE:
-                        position_history.pop(0)
-                    
-                    # Use smoothed position
-                    center_x = int(sum(position_history) / len(position_history))
-                    
-                    # Update tracking
-                    last_known_x = center_x
-                    frames_without_detection = 0
-                    target_locked = True
-                    
-                    # Show detection with confidence and zone info
-                    zone_name = "LEFT" if center_x < left_zone else "RIGHT" if center_x > right_zone else "CENTER"
-                    cv2.circle(img, (center_x, center_y), 15, (0, 255, 0), 3)
-                    cv2.putText(img, f"{avg_confidence:.2f} {zone_name}", (center_x+20, center_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                # Tier 1 sees the empty scene: an inference that found nobody
+                tracker.update([], captured)
+                set_last_inference(capture_seq, captured)
+        control_box.put(capture_seq)
+    return capture_seq
+
+def select_roi(frame_h, frame_w, captured):
+    """Square crop (x0, y0, x1, y1) in capture pixels around the target, or None for a full scan"""
+    if not ROI_ENABLED or (roi_stats["roi"] + roi_stats["full"]) % ROI_FULL_SCAN_EVERY == 0:
+        return None
+    target = tracker.target(captured)
+    if target is None or target.missed > 0:
+        return None  # Lost it: look at the whole frame again
+    scale = frame_w / FRAME_W
+    side = int(max(target.width, target.height, 1) * scale * ROI_MARGIN)
+    side = min(max(side, ROI_MIN_SIZE * frame_w // CAMERA_W), frame_h, frame_w)
+    x0 = min(max(int(target.x * scale) - side // 2, 0), frame_w - side)
+    y0 = min(max(int(target.y * scale) - side // 2, 0), frame_h - side)
+    return (x0, y0, x0 + side, y0 + side)
+
+def inference_stage(item):
+    """Run the TFLite model on the newest frame and fold the detections into the tracker"""
+    seq, frame, captured, trigger = item
+    frame_h, frame_w = frame.shape[:2]
+    roi = select_roi(frame_h, frame_w, captured)
+    if roi is None:
+        x0, y0, W, H = 0, 0, frame_w, frame_h
+        roi_stats["full"] += 1
+    else:
+        x0, y0 = roi[0], roi[1]
+        W, H = roi[2] - x0, roi[3] - y0
+        roi_stats["roi"] += 1
+
+    if worker is not None:
+        # The frame is copied into a shared slot; this thread sleeps until
+        # the worker writes the detections back
+        answer = worker.infer(frame, roi)
+        if answer is None:
+            print("[INFER] No answer from the inference worker, frame skipped")
+            motion_gate.record_result(trigger)
+            return None
+        detections, score, (preprocess_s, invoke_s, postprocess_s) = answer
+        cadence.observe_inference(preprocess_s + invoke_s)
+        steps.observe(preprocess_s, "preprocess")
+        steps.observe(invoke_s, "invoke")
+        steps.observe(postprocess_s, "postprocess")
+    else:
+        t0 = time.perf_counter()
+        preprocess(frame, roi)
+        t1 = time.perf_counter()
+        engine.invoke()
+        t2 = time.perf_counter()
+        cadence.observe_inference(t2 - t0)
+        steps.observe(t1 - t0, "preprocess")
+        steps.observe(t2 - t1, "invoke")
+        detections, score = decode_detections(engine, decoder, W, H, CONFIDENCE_THRESHOLD)
+        steps.observe(time.perf_counter() - t2, "postprocess")
+
+    # Crop pixels -> display (FRAME_W x FRAME_H) coordinates
+    sx, sy = FRAME_W / frame_w, FRAME_H / frame_h
+    display_roi = None if roi is None else (
+        int(roi[0] * sx), int(roi[1] * sy), int(roi[2] * sx), int(roi[3] * sy))
+    roi_stats["last_roi"] = display_roi
+    detections = [d._replace(x=int((d.x + x0) * sx), y=int((d.y + y0) * sy),
+                             width=int(d.width * sx), height=int(d.height * sy))
+                  for d in detections]
+    result = {"seq": seq, "score": score, "roi": roi, "detections": detections}
+    # A crop only vouches for the tracks predicted inside it
+    tracker.update(detections, captured, roi=display_roi)
+    set_last_inference(seq, captured)
+    if roi is None:
+        cascade.report(frame, bool(detections))
+    motion_gate.record_result(trigger)
+    control_box.put(seq)
+    return result
+
+def control_stage(seq):
+    """Steer towards the tracked target's predicted position (every frame)"""
+    global overlay_state, last_status, last_command_time
+
+    with mode_lock:
+        mode_now = current_mode
+    if mode_now != "AUTO":
+        return None
+
+    now = time.monotonic()
+    left_zone = int(FRAME_W * ZONE_LEFT)
+    right_zone = int(FRAME_W * ZONE_RIGHT)
+    detection = None
+    target = tracker.target(now)
+
+    # Control logic with 3 zones (improved responsiveness)
+    status = "STOP"
+    zone_color = (0, 0, 255)  # Red for stop
+
+    # Between inferences, and for a few missed ones, steer on the prediction
+    if target is not None and target.missed < DEBOUNCE_FRAMES:
+        if target.x < left_zone:
+            status = "LEFT"
+            zone_color = (0, 255, 255)  # Yellow
+        elif target.x < right_zone:
+            status = "FORWARD"
+            zone_color = (0, 255, 0)  # Green
+        else:
+            status = "RIGHT"
+            zone_color = (255, 0, 255)  # Magenta
+        zone_name = "CENTER" if status == "FORWARD" else status
+        predicted = "" if target.missed == 0 else " PRED"
+        detection = {"x": target.x, "y": target.y, "width": target.width, "height": target.height,
+                     "label": f"{target.confidence:.2f} {zone_name}{predicted}"}
+
+    # Re-issue at the old inference cadence so turn pulses keep their
+    # duty cycle, but react at once when the decision changes
+    if status != last_status or now - last_command_time >= CONTROL_INTERVAL:
+        last_status = status
+        last_command_time = now
+        source = last_inference
+        tag = FrameTag(source[0], source[1], source[2], now) if source is not None else None
+        if status == "LEFT":
+            motor.pulse(speed_command("LEFT"), TURN_PULSE_MS, tag=tag)
+        elif status == "FORWARD":
+            motor.send_now(speed_command("FORWARD"), tag=tag)
+        elif status == "RIGHT":
+            motor.pulse(speed_command("RIGHT"), TURN_PULSE_MS, tag=tag)
+        else:
+            motor.stop(tag)
+
+    others = [(t.x, t.y) for t in tracker.others(now)]
+    overlay_state = {"status": status, "zone_color": zone_color, "detection": detection, "others": others}
+    return status
+
+def overlay_event(seq):
+    """Compact per-frame state for the canvas overlay, in FRAME_W x FRAME_H coordinates"""
+    with mode_lock:
+        mode_now = current_mode
+    event = {"seq": seq, "w": FRAME_W, "h": FRAME_H, "mode": mode_now, "drawn": SERVER_OVERLAY,
+             "zones": [ZONE_LEFT, ZONE_RIGHT], "speed": [forward_speed, turn_speed],
+             "distance": telemetry.distance, "safe": telemetry.safe}
+    if mode_now == "AUTO":
+        state = overlay_state
+        event.update(status=state["status"], target=state["detection"], others=state["others"],
+                     roi=roi_stats["last_roi"], boxes=not is_fomo)
+    return event
+
+def render_stage(item):
+    """Publish the overlay state and the frame for viewers"""
+    seq, frame, jpeg = item
+    if event_hub.has_clients():
+        event_hub.publish(overlay_event(seq))
+    if not SERVER_OVERLAY:
+        if video_hub.has_clients():
+            if jpeg is not None:
+                video_hub.publish(jpeg)  # the camera's bytes, no decode/encode pass
             else:
-                boxes = interpreter.get_tensor(output_details[0]['index'])[0]
-                scores = interpreter.get_tensor(output_details[2]['index'])[0]
-                best_idx = np.argmax(scores)
-                # Add to detection history for smoothing
-                detection_history.append(scores[best_idx])
-                if len(detection_history) > HISTORY_SIZE:
-                    detection_history.pop(0)
-                
-                # Use average confidence for more stable detection
-                avg_confidence = sum(detection_history) / len(detection_history)
-                
-                if avg_confidence > CONFIDENCE_THRESHOLD:
-                    ymin, xmin, ymax, xmax = boxes[best_idx]
-                    center_x = int((xmin + xmax) / 2 * W)
-                    center_y = int((ymin + ymax) / 2 * H)
-                    detected = True
-                    
-                    # Add position smoothing
-                    position_history.append(center_x)
-                    if len(position_history) > POSITION_HISTORY_SIZE:
-                        position_history.pop(0)
-                    
-                    # Use smoothed position
-                    center_x = int(sum(position_history) / len(position_history))
-                    
-                    # Update tracking
-                    last_known_x = center_x
-                    frames_without_detection = 0
-                    target_locked = True
-                    
-                    zone_name = "LEFT" if center_x < left_zone else "RIGHT" if center_x > right_zone else "CENTER"
-                    cv2.rectangle(img, (int(xmin*W), int(ymin*H)), (int(xmax*W), int(ymax*H)), (0,255,0), 3)
-                    cv2.putText(img, f"{avg_confidence:.2f} {zone_name}", (int(xmin*W), int(ymin*H)-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-            # Target tracking logic
-            if not detected:
-                frames_without_detection += 1
-            
-            # Use last known position if recently lost
-            tracking_x = center_x if detected else last_known_x
-            
-            # Control logic with 3 zones (improved responsiveness)
-            status = "STOP"
-            zone_color = (0, 0, 255)  # Red for stop
-            
-            if detected or (target_locked and frames_without_detection < DEBOUNCE_FRAMES):
-                if tracking_x and tracking_x < left_zone:
-                    status = "LEFT"
-                    zone_color = (0, 255, 255)  # Yellow
-                    send_speed_command("LEFT")
-                    time.sleep(0.06)  # Reduced delay for faster response
-                    send_udp_once("STOP")
-                elif tracking_x and tracking_x < right_zone:
-                    status = "FORWARD"
-                    zone_color = (0, 255, 0)  # Green
-                    send_speed_command("FORWARD")
-                else:
-                    status = "RIGHT"
-                    zone_color = (255, 0, 255)  # Magenta
-                    send_speed_command("RIGHT")
-                    time.sleep(0.06)  # Reduced delay for faster response
-                    send_udp_once("STOP")
+                publish_frame(cv2.resize(frame, (FRAME_W, FRAME_H)))
+        return seq
+
+    img = cv2.resize(frame, (FRAME_W, FRAME_H))  # a new image; inference may still read frame
+    H, W = img.shape[:2]
+
+    # Always draw zone lines regardless of mode
+    # 3-Zone system: LEFT | CENTER | RIGHT (adjusted for better edge detection)
+    left_zone = int(W * ZONE_LEFT)
+    right_zone = int(W * ZONE_RIGHT)
+    
+    # Draw zone boundaries with thick white lines
+    cv2.line(img, (left_zone, 0), (left_zone, H), (255, 255, 255), 5)
+    cv2.line(img, (right_zone, 0), (right_zone, H), (255, 255, 255), 5)
+    
+    # Draw colored zone overlays (semi-transparent)
+    overlay = img.copy()
+    cv2.rectangle(overlay, (0, 0), (left_zone, H), (0, 255, 255), -1)  # Yellow LEFT
+    cv2.rectangle(overlay, (left_zone, 0), (right_zone, H), (0, 255, 0), -1)  # Green CENTER
+    cv2.rectangle(overlay, (right_zone, 0), (W, H), (255, 0, 255), -1)  # Magenta RIGHT
+    cv2.addWeighted(overlay, 0.1, img, 0.9, 0, img)
+    
+    # Zone labels
+    cv2.putText(img, "LEFT", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+    cv2.putText(img, "CENTER", (left_zone+10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+    cv2.putText(img, "RIGHT", (right_zone+10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 255), 2)
+
+    with mode_lock:
+        mode_now = current_mode
+
+    # Latest ultrasonic sample from the telemetry thread (never blocks)
+    ultrasonic_distance = telemetry.distance
+    ultrasonic_safe = telemetry.safe
+
+    if mode_now == "AUTO":
+        state = overlay_state
+        detection = state["detection"]
+        roi = roi_stats["last_roi"]
+        if roi is not None:
+            cv2.rectangle(img, roi[:2], roi[2:], (255, 255, 0), 1)  # Crop the model last looked at
+        for x, y in state["others"]:
+            cv2.circle(img, (x, y), 10, (160, 160, 160), 2)  # Other people, not followed
+        if detection is not None:
+            if not is_fomo:
+                xmin, ymin = detection["x"] - detection["width"] // 2, detection["y"] - detection["height"] // 2
+                xmax, ymax = xmin + detection["width"], ymin + detection["height"]
+                cv2.rectangle(img, (xmin, ymin), (xmax, ymax), (0,255,0), 3)
+                cv2.putText(img, detection["label"], (xmin, ymin-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
             else:
-                if frames_without_detection > SEARCH_FRAMES:
-                    target_locked = False
-                    last_known_x = None
-                    position_history.clear()  # Clear position history when target lost
-                send_udp_if_changed("STOP")
-            
-            # Status display
-            cv2.putText(img, f"STATUS: {status}", (10, H-60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, zone_color, 3)
-            cv2.putText(img, f"SPEED: F{forward_speed} T{turn_speed}", (10, H-40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            safety_color = (0, 255, 0) if ultrasonic_safe else (0, 0, 255)
-            cv2.putText(img, f"ULTRASONIC: {ultrasonic_distance}cm", (10, H-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, safety_color, 2)
-        else:
-            # Manual mode - show static status
-            cv2.putText(img, "STATUS: MANUAL", (10, H-60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 3)
-            cv2.putText(img, f"SPEED: F{forward_speed} T{turn_speed}", (10, H-40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            safety_color = (0, 255, 0) if ultrasonic_safe else (0, 0, 255)
-            cv2.putText(img, f"ULTRASONIC: {ultrasonic_distance}cm", (10, H-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, safety_color, 2)
+                cv2.circle(img, (detection["x"], detection["y"]), 15, (0, 255, 0), 3)
+                cv2.putText(img, detection["label"], (detection["x"]+20, detection["y"]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
-        # Check for ultrasonic status updates
-        try:
-            data, addr = status_sock.recvfrom(64)
-            status_msg = data.decode().strip()
-            if status_msg.startswith("DIST:"):
-                ultrasonic_distance = int(status_msg.split(":")[1])
-                ultrasonic_safe = ultrasonic_distance > 100 or ultrasonic_distance == 0
-        except:
-            pass
+        # Status display
+        cv2.putText(img, f"STATUS: {state['status']}", (10, H-60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, state["zone_color"], 3)
+    else:
+        # Manual mode - show static status
+        cv2.putText(img, "STATUS: MANUAL", (10, H-60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 3)
+    cv2.putText(img, f"SPEED: F{forward_speed} T{turn_speed}", (10, H-40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    safety_color = (0, 255, 0) if ultrasonic_safe else (0, 0, 255)
+    cv2.putText(img, f"ULTRASONIC: {ultrasonic_distance}cm", (10, H-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, safety_color, 2)
 
-        with frame_lock:
-            output_frame = img.copy()
-        time.sleep(0.001)
+    publish_frame(img)
+    return seq
+
+pipeline = Pipeline([
+    Stage("capture", capture_stage),
+    Stage("inference", inference_stage, infer_box),
+    Stage("control", control_stage, control_box),
+    Stage("render", render_stage, render_box),
+])
+pipeline.instrument(metrics.histogram("stage_seconds", "Pipeline stage latency", ("stage",)))
+metrics.gauge("stage_fps", "Items processed per second by each stage",
+              lambda: {(s.name,): s.fps for s in pipeline.stages}, ("stage",))
+metrics.gauge("mailbox_drops", "Items overwritten before their stage read them",
+              lambda: {(b.name,): b.drops for b in (infer_box, control_box, render_box)}, ("mailbox",))
+metrics.gauge("camera_frames", "Frames decoded from the camera", lambda: camera.frame_count)
+metrics.gauge("camera_restarts", "rpicam-vid restarts", lambda: camera.restarts)
+metrics.gauge("udp_coalesced", "Commands replaced before they were sent", lambda: transport.coalesced)
+metrics.gauge("udp_errors", "Failed UDP sends", lambda: transport.errors)
+metrics.gauge("video_clients", "Connected /video_feed clients", video_hub.client_count)
+metrics.gauge("ultrasonic_distance_cm", "Latest ultrasonic reading", lambda: telemetry.distance)
 
 # ===== Flask endpoints and video generator =====
 HTML_PAGE = """
@@ -413,7 +681,8 @@ HTML_PAGE = """
   <title>Robot Control</title>
   <style>
     body{background:#111;color:#eee;font-family:Arial;text-align:center}
-    .video{border:4px solid #333;display:inline-block;margin:12px}
+    .video{border:4px solid #333;display:inline-block;margin:12px;position:relative;line-height:0}
+    #overlay{position:absolute;left:0;top:0;pointer-events:none}
     .btn{padding:12px 18px;margin:6px;font-size:16px;border-radius:6px;border:none;cursor:pointer}
     .btn-mode{background:#1e90ff;color:#fff;width:80%}
     .btn-danger{background:#dc3545;color:#fff}
@@ -438,14 +707,18 @@ HTML_PAGE = """
     .mic-pi{background:#28a745;color:#fff}
     .mic-phone{background:#1e90ff;color:#fff}
     .btn-mic{width:100%;margin:5px 0}
+    .telemetry{font-size:18px;margin:6px}
+    .unsafe{color:#dc3545}
   </style>
 </head>
 <body>
   <h1>Human Follower Robot</h1>
   <div class="video">
-    <img src="{{ url_for('video_feed') }}" width="400" />
+    <img id="video" src="{{ url_for('video_feed') }}" width="400" />
+    <canvas id="overlay"></canvas>
   </div>
   <h3>Mode: <span id="mode">{{ mode }}</span></h3>
+  <div class="telemetry">Ultrasonic: <span id="distance">--</span> cm</div>
   <button class="btn btn-mode" onclick="setMode('AUTO')">ENABLE AUTO TRACKING</button>
   <button class="btn btn-mode btn-danger" onclick="setMode('MANUAL')">SWITCH TO MANUAL</button>
 
@@ -600,6 +873,82 @@ fetch('/chat', {
   document.getElementById('api-status').textContent = 'API Status: Error';
 });
 
+// Ultrasonic distance from the telemetry receiver
+function pollTelemetry(){
+  fetch('/telemetry?seconds=0')
+    .then(r => r.json())
+    .then(data => {
+      const el = document.getElementById('distance');
+      el.textContent = data.distance;
+      el.className = data.safe ? '' : 'unsafe';
+    })
+    .catch(e => {});
+}
+setInterval(pollTelemetry, 500);
+pollTelemetry();
+
+// Overlay drawn from /events over the untouched camera stream
+const STATUS_COLORS = {LEFT: '#ffff00', FORWARD: '#00ff00', RIGHT: '#ff00ff', STOP: '#ff0000'};
+const video = document.getElementById('video');
+const canvas = document.getElementById('overlay');
+const ctx = canvas.getContext('2d');
+
+function label(text, x, y, color, size){
+  ctx.font = 'bold ' + size + 'px Arial';
+  ctx.fillStyle = color;
+  ctx.fillText(text, x, y);
+}
+
+function drawOverlay(ev){
+  canvas.width = video.clientWidth;
+  canvas.height = video.clientHeight;
+  document.getElementById('distance').textContent = ev.distance;
+  document.getElementById('distance').className = ev.safe ? '' : 'unsafe';
+  if (ev.drawn) return;  // server burned the overlay into the frames
+  const W = canvas.width, H = canvas.height, sx = W / ev.w, sy = H / ev.h;
+  const left = W * ev.zones[0], right = W * ev.zones[1];
+  ctx.globalAlpha = 0.1;
+  ctx.fillStyle = '#ffff00'; ctx.fillRect(0, 0, left, H);
+  ctx.fillStyle = '#00ff00'; ctx.fillRect(left, 0, right - left, H);
+  ctx.fillStyle = '#ff00ff'; ctx.fillRect(right, 0, W - right, H);
+  ctx.globalAlpha = 1;
+  ctx.strokeStyle = '#fff'; ctx.lineWidth = 4;
+  ctx.beginPath(); ctx.moveTo(left, 0); ctx.lineTo(left, H); ctx.moveTo(right, 0); ctx.lineTo(right, H); ctx.stroke();
+  label('LEFT', 8, 24, '#ffff00', 18);
+  label('CENTER', left + 8, 24, '#00ff00', 18);
+  label('RIGHT', right + 8, 24, '#ff00ff', 18);
+
+  if (ev.mode === 'AUTO') {
+    if (ev.roi) {
+      ctx.strokeStyle = '#00ffff'; ctx.lineWidth = 1;
+      ctx.strokeRect(ev.roi[0] * sx, ev.roi[1] * sy, (ev.roi[2] - ev.roi[0]) * sx, (ev.roi[3] - ev.roi[1]) * sy);
+    }
+    ctx.strokeStyle = '#a0a0a0'; ctx.lineWidth = 2;
+    ev.others.forEach(p => { ctx.beginPath(); ctx.arc(p[0] * sx, p[1] * sy, 10, 0, 2 * Math.PI); ctx.stroke(); });
+    const t = ev.target;
+    if (t) {
+      ctx.strokeStyle = '#00ff00'; ctx.lineWidth = 3;
+      if (ev.boxes) {
+        const x = (t.x - t.width / 2) * sx, y = (t.y - t.height / 2) * sy;
+        ctx.strokeRect(x, y, t.width * sx, t.height * sy);
+        label(t.label, x, y - 6, '#00ff00', 12);
+      } else {
+        ctx.beginPath(); ctx.arc(t.x * sx, t.y * sy, 15, 0, 2 * Math.PI); ctx.stroke();
+        label(t.label, t.x * sx + 20, t.y * sy, '#00ff00', 12);
+      }
+    }
+    label('STATUS: ' + ev.status, 8, H - 50, STATUS_COLORS[ev.status] || '#fff', 16);
+  } else {
+    label('STATUS: MANUAL', 8, H - 50, '#fff', 16);
+  }
+  label('SPEED: F' + ev.speed[0] + ' T' + ev.speed[1], 8, H - 30, '#fff', 12);
+  label('ULTRASONIC: ' + ev.distance + 'cm', 8, H - 10, ev.safe ? '#00ff00' : '#ff0000', 12);
+}
+
+if (window.EventSource) {
+  new EventSource('/events').onmessage = e => drawOverlay(JSON.parse(e.data));
+}
+
 // Initialize microphone status
 fetch('/get_mic_source')
   .then(r => r.json())
@@ -622,15 +971,87 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate(request.remote_addr), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/events')
+def events():
+    # Overlay state per rendered frame as Server-Sent Events
+    return Response(event_hub.stream(running=lambda: running), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/telemetry')
+def telemetry_status():
+    seconds = request.args.get('seconds', type=float)
+    return jsonify(telemetry.snapshot(seconds))
+
+@app.route('/cadence', methods=['GET', 'POST'])
+def cadence_status():
+    # GET only reports; POST target_rate and/or cpu_budget (JSON or form) to retune
+    if request.method == 'POST':
+        try:
+            target_rate, cpu_budget = parse_settings(request.get_json(silent=True) or request.form.to_dict())
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        cadence.configure(target_rate, cpu_budget)
+    return jsonify(cadence.stats())
+
+@app.route('/cascade_stats')
+def cascade_stats():
+    return jsonify(cascade.stats())
+
+@app.route('/motion_stats')
+def motion_stats():
+    return jsonify(motion_gate.stats())
+
+@app.route('/pipeline_stats')
+def pipeline_stats():
+    stats = pipeline.stats()
+    stats["mailboxes"] = {box.name: box.stats() for box in (infer_box, control_box, render_box)}
+    stats["tracker"] = tracker.stats()
+    stats["engine"] = worker.stats() if worker is not None else engine.stats()
+    stats["roi"] = dict(roi_stats)
+    stats["motor"] = motor.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics_export():
+    # Prometheus text by default, ?format=json for a readable summary
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary())
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/trace')
+def trace_status():
+    limit = request.args.get('limit', default=50, type=int)
+    if limit < 0:
+        return jsonify({"status": "error", "message": "limit must be 0 or more"}), 400
+    return jsonify({"summary": trace.summary(), "entries": trace.entries(limit)})
+
+@app.route('/trace/stream')
+def trace_stream():
+    # One JSON object per line for every traced command, as it is sent
+    lines = (json.dumps(entry) + "\n" for entry in trace.follow(running=lambda: running))
+    return Response(lines, mimetype='application/x-ndjson')
+
+@app.route('/udp_stats')
+def udp_stats():
+    return jsonify(transport.stats())
+
+@app.route('/video_stats')
+def video_stats():
+    stats = video_hub.stats()
+    stats["events"] = event_hub.stats()
+    return jsonify(stats)
 
 @app.route('/set_mode/<mode>')
 def set_mode(mode):
-    global current_mode
+    global current_mode, last_inference
     with mode_lock:
         current_mode = mode
     # ensure robot safe state on mode switch
-    send_udp_once("STOP")
+    tracker.reset()
+    last_inference = None
+    motor.stop()
     return "OK"
 
 @app.route('/control/<cmd>')
@@ -638,7 +1059,7 @@ def control(cmd):
     with mode_lock:
         if current_mode == "MANUAL":
             # direct immediate command (single send). The ESP implements safety timeout.
-            send_udp_once(cmd.upper())
+            motor.override(cmd.upper())
     return "OK"
 
 @app.route('/set_speed/<speed_type>/<int:value>')
@@ -708,24 +1129,14 @@ def chat():
     except Exception as e:
         return jsonify({"response": "Sorry, there was an error processing your request."})
 
-def generate():
-    while running:
-        with frame_lock:
-            frame = None if output_frame is None else output_frame.copy()
-        if frame is None:
-            time.sleep(0.05)
-            continue
-        (flag, encodedImage) = cv2.imencode(".jpg", frame)
-        if not flag:
-            time.sleep(0.05)
-            continue
-        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
-        time.sleep(0.02)
+def generate(remote=None):
+    # Frames are encoded once by the tracking loop; each client just waits
+    # for the next sequence number and skips ahead if it falls behind.
+    return video_hub.stream(remote, running=lambda: running)
 
 # ===== app start =====
 if __name__ == '__main__':
-    t = threading.Thread(target=tracking_loop, daemon=True)
-    t.start()
+    pipeline.start()
     # start Flask
     print("Starting Flask on 0.0.0.0:5000")
     app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
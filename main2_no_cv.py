@@ -1,33 +1,41 @@
 # main2.py - ESP32-CAM version (no OpenCV)
-from flask import Flask, render_template_string, Response
+from flask import Flask, render_template_string, Response, request, jsonify
+import os
 import threading
 import time
-import socket
 import requests
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import io
 import sys
 
+from cadence_controller import CadenceController, parse_settings
+from frame_hub import FrameHub
+import jpeg_scale
+from mjpeg_demux import MJPEGDemuxer
+from presence_cascade import PresenceCascade
+from motion_gate import MotionGate
+from tflite_preprocess import InputPreprocessor
+from motor_scheduler import CommandScheduler
+from udp_transport import CommandTransport
+
 try:
-    import tflite_runtime.interpreter as tflite
+    from inference_engine import InferenceEngine
 except ImportError:
-    try:
-        import tensorflow.lite as tflite
-    except ImportError:
-        print("ERROR: Install tensorflow")
-        sys.exit(1)
+    print("ERROR: Install tensorflow")
+    sys.exit(1)
 
 # ===== CONFIG =====
-ESP32_STREAM_URL = "http://10.30.152.68/stream"  # ESP32-CAM IP
-ESP8266_IP = "10.30.152.186"  # robot UDP IP
-ESP8266_PORT = 8888
+ESP32_STREAM_URL = os.environ.get("ESP32_STREAM_URL", "http://10.30.152.68/stream")  # ESP32-CAM IP
+ESP8266_IP = os.environ.get("ESP8266_IP", "10.30.152.186")  # robot UDP IP
+ESP8266_PORT = int(os.environ.get("ESP8266_PORT", 8888))
 
 FRAME_W = 320
 FRAME_H = 240
 
 # TFLite model
 MODEL_PATH = "ei-model.tflite"
+INFERENCE_THREADS = 2
 CONFIDENCE_THRESHOLD = 0.15
 
 # Speed control variables
@@ -44,32 +52,37 @@ last_known_x = None
 target_locked = False
 
 CMD_MIN_INTERVAL = 0.08
-FRAME_SKIP = 2
+CMD_KEEPALIVE_INTERVAL = 0.5  # Re-send the last command this often while nothing else is sent
+TURN_PULSE_MS = 80
+FRAME_SKIP = 2  # Starting frames per inference
+INFERENCE_TARGET_RATE = 7.0  # Wanted steering decisions from the model per second
+INFERENCE_CPU_BUDGET = 0.5   # Fraction of one core inference may use
+PRESENCE_CASCADE = True  # Cheap empty-scene check before the full detector
+MOTION_MAX_STALENESS = 1.0  # Static scene: still run inference at least this often (s)
 
 # ===== GLOBALS =====
 app = Flask(__name__)
-frame_lock = threading.Lock()
-output_frame = None
 running = True
+video_hub = FrameHub()
+motion_gate = MotionGate(min_frames=FRAME_SKIP, max_staleness=MOTION_MAX_STALENESS)
+cascade = PresenceCascade(enabled=PRESENCE_CASCADE)
+cadence = CadenceController(INFERENCE_TARGET_RATE, INFERENCE_CPU_BUDGET, frame_skip=FRAME_SKIP,
+                            viewers=video_hub.client_count)
 
 mode_lock = threading.Lock()
 current_mode = "MANUAL"
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-last_send_time = 0.0
-last_sent_cmd = None
+# Owns the UDP socket: coalesces bursts, sends STOP immediately and
+# suppresses duplicates, re-sending the last command as a keepalive
+transport = CommandTransport(ESP8266_IP, ESP8266_PORT, min_interval=CMD_MIN_INTERVAL,
+                             keepalive_interval=CMD_KEEPALIVE_INTERVAL)
 
 # TFLite setup
-interpreter = tflite.Interpreter(model_path=MODEL_PATH)
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
-input_shape = input_details[0]['shape']
-input_height = input_shape[1]
-input_width = input_shape[2]
-input_channels = input_shape[3]
-input_index = input_details[0]['index']
-is_fomo = len(output_details) == 1 and len(output_details[0]['shape']) == 4
+engine = InferenceEngine(MODEL_PATH, num_threads=INFERENCE_THREADS)
+interpreter = engine.interpreter
+output_details = engine.output_details
+preprocess = InputPreprocessor(interpreter, source_order="RGB")
+is_fomo = engine.is_fomo
 
 # ===== MJPEG Stream Reader =====
 class MJPEGCamera:
@@ -90,18 +103,15 @@ class MJPEGCamera:
         while self.running:
             try:
                 response = requests.get(self.url, stream=True, timeout=5)
-                buffer = b''
+                demuxer = MJPEGDemuxer()
                 for chunk in response.iter_content(chunk_size=1024):
                     if not self.running:
                         break
-                    buffer += chunk
-                    start = buffer.find(b'\xff\xd8')
-                    end = buffer.find(b'\xff\xd9')
-                    if start != -1 and end != -1 and end > start:
-                        jpeg_data = buffer[start:end+2]
-                        buffer = buffer[end+2:]
+                    jpeg_data = demuxer.latest(chunk)
+                    if jpeg_data is not None:
                         try:
-                            img = Image.open(io.BytesIO(jpeg_data))
+                            # libjpeg decodes straight to the display size (or just above)
+                            img = jpeg_scale.open_pil(jpeg_data, (FRAME_W, FRAME_H))
                             self.frame = np.array(img)
                         except:
                             pass
@@ -129,38 +139,27 @@ else:
     print("[ERROR] Cannot connect to ESP32-CAM stream")
     sys.exit(1)
 
-def send_udp_once(cmd):
-    global last_send_time, last_sent_cmd
-    try:
-        sock.sendto(cmd.encode(), (ESP8266_IP, ESP8266_PORT))
-        last_send_time = time.time()
-        last_sent_cmd = cmd
-        print("[UDP] ->", cmd)
-    except Exception as e:
-        print("[UDP] send error:", e)
-
-def send_udp_if_changed(cmd):
-    now = time.time()
-    global last_send_time, last_sent_cmd
-    if cmd == last_sent_cmd and (now - last_send_time) < CMD_MIN_INTERVAL:
-        return
-    if (now - last_send_time) < CMD_MIN_INTERVAL and cmd != last_sent_cmd:
-        return
-    send_udp_once(cmd)
-
-def send_speed_command(direction):
-    global forward_speed, turn_speed
+def speed_command(direction):
     if direction == "FORWARD":
-        cmd = f"FORWARD:{forward_speed}"
+        return f"FORWARD:{forward_speed}"
     elif direction in ["LEFT", "RIGHT"]:
-        cmd = f"{direction}:{turn_speed}"
-    else:
-        cmd = direction
-    sock.sendto(cmd.encode(), (ESP8266_IP, ESP8266_PORT))
+        return f"{direction}:{turn_speed}"
+    return direction
+
+def send_speed_command(direction):
+    transport.send(speed_command(direction))
+
+motor = CommandScheduler(transport.send).start()
+
+def publish_frame(img):
+    """Encode the rendered frame once for /video_feed viewers"""
+    if video_hub.has_clients():
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG')
+        video_hub.publish(buffer.getvalue())
 
 def tracking_loop():
-    global output_frame, current_mode, frames_without_detection, last_known_x, target_locked, camera
-    frame_count = 0
+    global current_mode, frames_without_detection, last_known_x, target_locked, camera
 
     while running:
         ret, frame = camera.read()
@@ -178,8 +177,8 @@ def tracking_loop():
                 continue
 
         # Convert to PIL Image for processing
-        img = Image.fromarray(frame)
-        img = img.resize((FRAME_W, FRAME_H))
+        source = Image.fromarray(frame)
+        img = source.resize((FRAME_W, FRAME_H))
         img_array = np.array(img)
         
         # Create drawing context
@@ -202,33 +201,27 @@ def tracking_loop():
             mode_now = current_mode
 
         if mode_now == "AUTO":
-            frame_count += 1
-            if frame_count % FRAME_SKIP != 0:
-                with frame_lock:
-                    output_frame = np.array(img)
+            # Skip the model while the scene is static (bounded by staleness)
+            motion_gate.min_frames = cadence.observe_frame()
+            if not motion_gate.should_infer(frame):
+                publish_frame(img)
                 continue
-
-            # TFLite inference
-            img_resized = img.resize((input_width, input_height))
-            if input_channels == 1:
-                img_processed = img_resized.convert('L')
-                img_processed = np.expand_dims(np.array(img_processed), axis=-1)
-            else:
-                img_processed = np.array(img_resized)
-            
-            input_data = np.expand_dims(img_processed, axis=0)
-            if input_details[0]['dtype'] == np.float32:
-                input_data = np.float32(input_data) / 255.0
-            elif input_details[0]['dtype'] == np.int8:
-                input_data = (input_data.astype(np.int16) - 128).astype(np.int8)
-            
-            interpreter.set_tensor(input_index, input_data)
-            interpreter.invoke()
+            trigger = motion_gate.trigger_time
+
+            # Tier 1: the full model only runs when the scene may hold a person
+            run_model = cascade.should_detect(frame, locked=target_locked)
+            if run_model:
+                # TFLite inference on the undrawn source frame
+                t0 = time.perf_counter()
+                preprocess(source)
+                engine.invoke()
+                cadence.observe_inference(time.perf_counter() - t0)
+                motion_gate.record_result(trigger)
 
             detected = False
             center_x = 0
 
-            if is_fomo:
+            if run_model and is_fomo:
                 output_data = interpreter.get_tensor(output_details[0]['index'])[0]
                 if output_details[0]['dtype'] == np.int8:
                     output_data = (output_data.astype(np.float32) + 128) / 255.0
@@ -259,6 +252,9 @@ def tracking_loop():
                     draw.ellipse([center_x-10, center_y-10, center_x+10, center_y+10], outline=(0,255,0), width=3)
                     draw.text((center_x+15, center_y), f"{avg_confidence:.2f}", fill=(0,255,0))
 
+            if run_model:
+                cascade.report(frame, detected)
+
             # Control logic
             if not detected:
                 frames_without_detection += 1
@@ -269,29 +265,24 @@ def tracking_loop():
             if detected or (target_locked and frames_without_detection < DEBOUNCE_FRAMES):
                 if tracking_x and tracking_x < left_zone:
                     status = "LEFT"
-                    send_speed_command("LEFT")
-                    time.sleep(0.08)
-                    send_udp_once("STOP")
+                    motor.pulse(speed_command("LEFT"), TURN_PULSE_MS)
                 elif tracking_x and tracking_x < right_zone:
                     status = "FORWARD"
-                    send_speed_command("FORWARD")
+                    motor.send_now(speed_command("FORWARD"))
                 else:
                     status = "RIGHT"
-                    send_speed_command("RIGHT")
-                    time.sleep(0.08)
-                    send_udp_once("STOP")
+                    motor.pulse(speed_command("RIGHT"), TURN_PULSE_MS)
             else:
                 if frames_without_detection > SEARCH_FRAMES:
                     target_locked = False
                     last_known_x = None
-                send_udp_if_changed("STOP")
+                motor.stop()
             
             draw.text((10, FRAME_H-40), f"STATUS: {status}", fill=(255,255,255))
         else:
             draw.text((10, FRAME_H-40), "STATUS: MANUAL", fill=(255,255,255))
 
-        with frame_lock:
-            output_frame = np.array(img)
+        publish_frame(img)
         time.sleep(0.005)
 
 # Flask routes (simplified)
@@ -301,32 +292,45 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate(request.remote_addr), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/udp_stats')
+def udp_stats():
+    return jsonify(transport.stats())
+
+@app.route('/cadence', methods=['GET', 'POST'])
+def cadence_status():
+    # GET only reports; POST target_rate and/or cpu_budget (JSON or form) to retune
+    if request.method == 'POST':
+        try:
+            target_rate, cpu_budget = parse_settings(request.get_json(silent=True) or request.form.to_dict())
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        cadence.configure(target_rate, cpu_budget)
+    return jsonify(cadence.stats())
+
+@app.route('/cascade_stats')
+def cascade_stats():
+    return jsonify(cascade.stats())
+
+@app.route('/motion_stats')
+def motion_stats():
+    return jsonify(motion_gate.stats())
+
+@app.route('/video_stats')
+def video_stats():
+    return jsonify(video_hub.stats())
 
 @app.route('/set_mode/<mode>')
 def set_mode(mode):
     global current_mode
     with mode_lock:
         current_mode = mode
-    send_udp_once("STOP")
+    motor.stop()
     return "OK"
 
-def generate():
-    while running:
-        with frame_lock:
-            frame = None if output_frame is None else output_frame.copy()
-        if frame is None:
-            time.sleep(0.05)
-            continue
-        
-        # Convert numpy array to JPEG
-        img = Image.fromarray(frame.astype('uint8'))
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG')
-        frame_bytes = buffer.getvalue()
-        
-        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        time.sleep(0.02)
+def generate(remote=None):
+    return video_hub.stream(remote, running=lambda: running)
 
 if __name__ == '__main__':
     t = threading.Thread(target=tracking_loop, daemon=True)
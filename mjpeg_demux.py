@@ -0,0 +1,132 @@
+"""Incremental MJPEG demuxer shared by the camera stream readers.
+
+Chunks from an HTTP multipart stream (ESP32-CAM) or a raw MJPEG pipe
+(rpicam-vid) are appended to one growable bytearray. The marker scan
+resumes where the previous chunk stopped, so each byte is searched once,
+and every complete JPEG in a chunk is found. When a part carries a
+Content-Length header the frame is cut by length instead of scanning for
+the end marker.
+"""
+
+SOI = b'\xff\xd8'
+EOI = b'\xff\xd9'
+
+# Bytes kept before a not-yet-seen SOI so a multipart header split across
+# chunks can still be matched to its frame.
+HEADER_WINDOW = 256
+
+
+class MJPEGDemuxer:
+    def __init__(self, max_frame_size=1 << 20):
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray()
+        self._start = -1      # SOI offset of the frame being assembled
+        self._scan = 0        # where to resume the EOI search
+        self._length = None   # Content-Length of the frame being assembled
+        self._consumed = 0
+        self.frames = 0       # complete frames found
+        self.dropped = 0      # frames skipped by latest()
+        self.resyncs = 0      # oversized/corrupt frames discarded
+
+    def feed(self, chunk):
+        """Append a chunk and return every complete JPEG it finished."""
+        spans = self._scan_chunk(chunk)
+        with memoryview(self._buf) as view:
+            frames = [bytes(view[a:b]) for a, b in spans]
+        self._compact()
+        return frames
+
+    def latest(self, chunk):
+        """Append a chunk and return only the newest complete JPEG (or None).
+
+        Older frames completed by the same chunk are counted as dropped and
+        never copied out of the buffer.
+        """
+        spans = self._scan_chunk(chunk)
+        frame = None
+        if spans:
+            self.dropped += len(spans) - 1
+            a, b = spans[-1]
+            with memoryview(self._buf) as view:
+                frame = bytes(view[a:b])
+        self._compact()
+        return frame
+
+    def reset(self):
+        self._buf.clear()
+        self._start = -1
+        self._scan = 0
+        self._length = None
+        self._consumed = 0
+
+    def _scan_chunk(self, chunk):
+        buf = self._buf
+        buf += chunk
+        size = len(buf)
+        spans = []
+        consumed = 0
+
+        while True:
+            if self._start < 0:
+                start = buf.find(SOI, consumed)
+                if start < 0:
+                    consumed = max(consumed, size - HEADER_WINDOW)
+                    break
+                self._start = start
+                self._scan = start + 2
+                self._length = self._content_length(buf, consumed, start)
+                if self._length and self._length > self.max_frame_size:
+                    self._length = None
+            start = self._start
+
+            if self._length:
+                end = start + self._length
+                if end > size:
+                    break
+                if buf[end - 2:end] != EOI:
+                    # Header disagrees with the data; fall back to scanning.
+                    self._length = None
+                    continue
+            else:
+                eoi = buf.find(EOI, self._scan)
+                if eoi < 0:
+                    self._scan = max(start + 2, size - 1)
+                    if size - start > self.max_frame_size:
+                        self.resyncs += 1
+                        self._start = -1
+                        consumed = size - 1
+                    break
+                end = eoi + 2
+
+            spans.append((start, end))
+            self.frames += 1
+            consumed = end
+            self._start = -1
+
+        self._consumed = consumed
+        return spans
+
+    def _compact(self):
+        consumed = self._consumed
+        if consumed:
+            del self._buf[:consumed]
+            if self._start >= 0:
+                self._start -= consumed
+                self._scan -= consumed
+            self._consumed = 0
+
+    @staticmethod
+    def _content_length(buf, lo, soi):
+        with memoryview(buf) as view:
+            header = bytes(view[max(lo, soi - HEADER_WINDOW):soi])
+        if not header.endswith(b'\r\n\r\n'):
+            return None
+        lowered = header.lower()
+        idx = lowered.rfind(b'content-length:')
+        if idx < 0:
+            return None
+        line_end = lowered.find(b'\r\n', idx)
+        try:
+            return int(lowered[idx + 15:line_end])
+        except ValueError:
+            return None
@@ -5,9 +5,13 @@ import io
 import threading
 import time
 
+import jpeg_scale
+from mjpeg_demux import MJPEGDemuxer
+
 class MJPEGReader:
-    def __init__(self, url):
+    def __init__(self, url, size=None):
         self.url = url
+        self.size = size  # (w, h) wanted; decode at the reduced JPEG scale covering it
         self.frame = None
         self.running = False
         self.thread = None
@@ -28,24 +32,18 @@ class MJPEGReader:
             response = requests.get(self.url, stream=True, timeout=5)
             response.raise_for_status()
             
-            buffer = b''
+            demuxer = MJPEGDemuxer()
             for chunk in response.iter_content(chunk_size=1024):
                 if not self.running:
                     break
                     
-                buffer += chunk
-                
-                # Look for JPEG boundaries
-                start = buffer.find(b'\xff\xd8')  # JPEG start
-                end = buffer.find(b'\xff\xd9')    # JPEG end
+                # Newest complete JPEG in this chunk, stale ones are dropped
+                jpeg_data = demuxer.latest(chunk)
                 
-                if start != -1 and end != -1 and end > start:
-                    jpeg_data = buffer[start:end+2]
-                    buffer = buffer[end+2:]
-                    
+                if jpeg_data is not None:
                     try:
                         # Convert to PIL Image then numpy array
-                        img = Image.open(io.BytesIO(jpeg_data))
+                        img = jpeg_scale.open_pil(jpeg_data, self.size)
                         self.frame = np.array(img)
                     except Exception as e:
                         print(f"Error decoding frame: {e}")
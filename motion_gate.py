@@ -0,0 +1,111 @@
+"""Cheap change detector that decides whether a frame is worth inferring on.
+
+A fixed FRAME_SKIP runs the model at the same rate in an empty, static
+room as while chasing someone. MotionGate subsamples each frame to a tiny
+grayscale grid by striding (no resize, no OpenCV), compares it with a
+running-average background and reports motion when enough cells changed.
+Inference then runs on motion, spaced at least min_frames apart, and at
+least every max_staleness seconds even when nothing moves so a person
+standing still is not forgotten.
+"""
+import collections
+import time
+
+import numpy as np
+
+
+def sample_grid(frame, grid):
+    """float32 grayscale (grid[1], grid[0]) view of frame, taken by striding"""
+    h, w = frame.shape[:2]
+    step_x = max(1, w // grid[0])
+    step_y = max(1, h // grid[1])
+    small = frame[step_y // 2::step_y, step_x // 2::step_x]
+    if small.ndim == 3:
+        # Channel order does not matter for change detection
+        return small.mean(axis=2, dtype=np.float32)
+    return small.astype(np.float32)
+
+
+class MotionGate:
+    def __init__(self, grid=(32, 24), pixel_threshold=18, area_threshold=0.02,
+                 background_alpha=0.1, min_frames=1, max_staleness=1.0):
+        self.grid = grid                          # (width, height) of the sampled grid
+        self.pixel_threshold = pixel_threshold    # grey-level change counting as motion
+        self.area_threshold = area_threshold      # fraction of changed cells
+        self.background_alpha = background_alpha  # background adaptation rate per frame
+        self.min_frames = min_frames              # frames between inferences, at least
+        self.max_staleness = max_staleness        # seconds without inference, at most
+        self.background = None
+        self.frames = 0
+        self.inferences = 0
+        self.motion_frames = 0
+        self.stale_inferences = 0
+        self.last_change = 0.0
+        self.last_infer_frame = -min_frames
+        self.last_infer_time = 0.0
+        self.trigger_time = 0.0   # when the motion behind the latest inference began
+        self._motion_since = None
+        self._infer_times = collections.deque()
+        self.last_latency = 0.0
+        self.avg_latency = 0.0
+
+    def should_infer(self, frame, now=None):
+        """Feed one frame; True when it should go to the model"""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        small = sample_grid(frame, self.grid)
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small
+            motion = True
+            self.last_change = 1.0
+        else:
+            diff = np.abs(small - self.background)
+            self.last_change = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+            motion = self.last_change >= self.area_threshold
+            self.background += self.background_alpha * (small - self.background)
+
+        if motion:
+            self.motion_frames += 1
+            if self._motion_since is None:
+                self._motion_since = now
+
+        if self.frames - self.last_infer_frame < self.min_frames:
+            return False
+        stale = now - self.last_infer_time >= self.max_staleness
+        if not (motion or stale or self._motion_since is not None):
+            return False
+
+        if self._motion_since is not None:
+            self.trigger_time = self._motion_since
+        else:
+            self.trigger_time = now
+            self.stale_inferences += 1
+        self._motion_since = None
+        self.last_infer_frame = self.frames
+        self.last_infer_time = now
+        self.inferences += 1
+        self._infer_times.append(now)
+        while now - self._infer_times[0] > 60.0:
+            self._infer_times.popleft()
+        return True
+
+    def record_result(self, trigger_time, now=None):
+        """Note that the inference started at trigger_time produced its result"""
+        now = time.monotonic() if now is None else now
+        latency = now - trigger_time
+        self.last_latency = latency
+        self.avg_latency = latency if not self.avg_latency else 0.9 * self.avg_latency + 0.1 * latency
+
+    def stats(self, now=None):
+        now = time.monotonic() if now is None else now
+        return {
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "inferences_per_min": sum(1 for t in list(self._infer_times) if now - t <= 60.0),
+            "skipped_ratio": round(1.0 - self.inferences / self.frames, 3) if self.frames else 0.0,
+            "motion_frames": self.motion_frames,
+            "stale_inferences": self.stale_inferences,
+            "last_change": round(self.last_change, 4),
+            "detection_latency_ms": round(self.last_latency * 1000, 1),
+            "avg_detection_latency_ms": round(self.avg_latency * 1000, 1),
+        }
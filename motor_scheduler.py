@@ -0,0 +1,132 @@
+"""Non-blocking motor command scheduler.
+
+Turn pulses used to be "send LEFT, sleep 60 ms, send STOP" inside the
+vision loop. Here a pulse is a small program of (delay_ms, command) steps
+kept in a heap and sent by a dedicated thread at their due time. A new
+program cancels any follow-ups still pending from the previous decision,
+and stop() drops everything and sends STOP from the caller's thread.
+A command can carry a tag, which is passed on as send(cmd, tag).
+
+Transmissions hold a send lock, and cancelling bumps a generation
+number. If the thread popped a command just before a cancel, it sees
+the new generation and drops the command instead of sending it after
+the caller's STOP.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+
+class CommandScheduler:
+    def __init__(self, send, stop_command="STOP"):
+        self.send = send  # callable(cmd[, tag]) doing the actual transmission
+        self.stop_command = stop_command
+        self._cond = threading.Condition()
+        self._heap = []  # (due, order, cmd, tag)
+        self._order = itertools.count()
+        self._send_lock = threading.Lock()  # keeps each transmission whole and in order
+        self._generation = 0  # bumped by every cancel; older popped commands are dropped
+        self.running = False
+        self.thread = None
+        self.sent = 0
+        self.cancelled = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="motor-scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.thread:
+            self.thread.join()
+
+    def program(self, steps, tag=None):
+        """Replace pending commands with steps: [(delay_ms, cmd), ...]; tag goes with the first"""
+        now = time.monotonic()
+        with self._cond:
+            self.cancelled += len(self._heap)
+            self._heap = [(now + delay_ms / 1000.0, next(self._order), cmd, tag if i == 0 else None)
+                          for i, (delay_ms, cmd) in enumerate(steps)]
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def send_now(self, cmd, tag=None):
+        """Send cmd as soon as possible, cancelling pending follow-ups"""
+        self.program([(0, cmd)], tag)
+
+    def pulse(self, cmd, duration_ms, then=None, tag=None):
+        """Send cmd now and `then` (STOP by default) after duration_ms"""
+        self.program([(0, cmd), (duration_ms, then or self.stop_command)], tag)
+
+    def burst(self, cmd, times, interval_ms, then=None):
+        """Send cmd `times` times interval_ms apart, followed by `then`"""
+        steps = [(i * interval_ms, cmd) for i in range(times)]
+        steps.append((times * interval_ms, then or self.stop_command))
+        self.program(steps)
+
+    def cancel(self):
+        """Drop pending commands, including one the thread is about to send"""
+        with self._cond:
+            self.cancelled += len(self._heap)
+            self._heap = []
+            self._generation += 1
+
+    def override(self, cmd, tag=None):
+        """Preempt everything and send cmd from the caller's thread; nothing scheduled follows it"""
+        self.cancel()
+        with self._send_lock:
+            self._transmit(cmd, tag)
+
+    def stop(self, tag=None):
+        """Preempt everything and send STOP immediately"""
+        self.override(self.stop_command, tag)
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self.running:
+                    return
+                due, _, cmd, tag = heapq.heappop(self._heap)
+                generation = self._generation
+            with self._send_lock:
+                if generation != self._generation:
+                    self.cancelled += 1  # cancelled after it was popped
+                    continue
+                self.max_lateness = max(self.max_lateness, time.monotonic() - due)
+                self._transmit(cmd, tag)
+
+    def _transmit(self, cmd, tag=None):
+        try:
+            if tag is None:
+                self.send(cmd)
+            else:
+                self.send(cmd, tag)
+            self.sent += 1
+        except Exception as e:
+            print(f"[SCHEDULER] send error: {e}")
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "cancelled": self.cancelled,
+            "pending": self.pending(),
+            "max_lateness_ms": round(self.max_lateness * 1000, 2),
+        }
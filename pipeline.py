@@ -0,0 +1,171 @@
+"""Pipeline stages connected by single-slot "latest value wins" mailboxes.
+
+Each stage runs on its own thread and pulls from one Mailbox. A producer
+that outpaces its consumer overwrites the unread item instead of queueing
+it, so downstream stages always work on the freshest data; every
+overwrite is counted as a drop on that mailbox.
+"""
+import collections
+import threading
+import time
+
+
+class Mailbox:
+    def __init__(self, name):
+        self.name = name
+        self._cond = threading.Condition()
+        self._item = None
+        self._fresh = False
+        self.puts = 0
+        self.drops = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._fresh:
+                self.drops += 1
+            self._item = item
+            self._fresh = True
+            self.puts += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Take the newest unread item, or None after timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._fresh, timeout):
+                return None
+            self._fresh = False
+            return self._item
+
+    def peek(self):
+        """Newest item without consuming it (may already have been read)"""
+        return self._item
+
+    def clear(self):
+        with self._cond:
+            self._item = None
+            self._fresh = False
+
+    def stats(self):
+        return {"puts": self.puts, "drops": self.drops}
+
+
+class Stage:
+    """Runs fn on its own thread.
+
+    With an inbox, fn(item) is called for every item taken from it; without
+    one fn() is polled and is expected to pace itself (a capture source).
+    fn returns None when it did no work so idle polls are not counted.
+    """
+    def __init__(self, name, fn, inbox=None, poll_timeout=0.5, samples=1000):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.poll_timeout = poll_timeout
+        self.running = False
+        self.thread = None
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.last_latency = 0.0
+        self.avg_latency = 0.0
+        self.fps = 0.0
+        self.latencies = collections.deque(maxlen=samples)  # recent latencies for percentiles
+        self.observer = None  # optional callable(latency) fed every recorded latency
+        self._started = None
+        self._window_start = 0.0
+        self._window_count = 0
+
+    def start(self):
+        self.running = True
+        self._started = time.monotonic()
+        self._window_start = self._started
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _run(self):
+        while self.running:
+            if self.inbox is not None:
+                item = self.inbox.get(self.poll_timeout)
+                if item is None:
+                    continue
+            t0 = time.perf_counter()
+            try:
+                result = self.fn(item) if self.inbox is not None else self.fn()
+            except Exception as e:
+                self.errors += 1
+                print(f"[PIPELINE] {self.name} error: {e}")
+                time.sleep(0.1)
+                continue
+            if result is None:
+                continue
+            self._record(time.perf_counter() - t0)
+
+    def _record(self, latency):
+        self.processed += 1
+        self.busy_time += latency
+        self.last_latency = latency
+        self.latencies.append(latency)
+        if self.observer is not None:
+            self.observer(latency)
+        self.avg_latency = latency if self.processed == 1 else 0.9 * self.avg_latency + 0.1 * latency
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+    def percentile(self, p):
+        """Latency (s) at percentile p over the recent samples"""
+        samples = sorted(self.latencies)
+        if not samples:
+            return 0.0
+        return samples[min(int(len(samples) * p / 100), len(samples) - 1)]
+
+    def stats(self):
+        uptime = time.monotonic() - self._started if self._started else 0.0
+        stats = {
+            "processed": self.processed,
+            "fps": round(self.fps, 1),
+            "latency_ms": round(self.last_latency * 1000, 2),
+            "avg_latency_ms": round(self.avg_latency * 1000, 2),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "busy": round(self.busy_time / uptime, 3) if uptime else 0.0,
+            "errors": self.errors,
+        }
+        if self.inbox is not None:
+            stats["inbox"] = self.inbox.name
+            stats["inbox_drops"] = self.inbox.drops
+        return stats
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join(1.0)
+
+    def instrument(self, histogram):
+        """Feed every stage's latencies into histogram, labelled by stage name"""
+        for stage in self.stages:
+            stage.observer = lambda latency, name=stage.name: histogram.observe(latency, name)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -0,0 +1,89 @@
+"""Two-tier detection: a pixel-statistics presence check before the model.
+
+With nobody in view every inference frame still paid for the full FOMO
+model. PresenceCascade keeps a grayscale model of the empty scene on the
+same tiny strided grid MotionGate uses, learned from frames on which the
+detector found nobody. Tier 1 (every candidate frame, microseconds)
+measures how much of the grid differs from that empty scene; tier 2, the
+full detector, only runs when that foreground fraction is large enough,
+while a target is being tracked, before the empty scene has been learned,
+or every recheck_interval seconds in case a person has been absorbed
+into the background.
+"""
+import time
+
+import numpy as np
+
+from motion_gate import sample_grid
+
+
+class PresenceCascade:
+    def __init__(self, grid=(32, 24), pixel_threshold=25, area_threshold=0.03,
+                 learn_rate=0.01, confirm_rate=0.5, recheck_interval=5.0, enabled=True):
+        self.grid = grid
+        self.pixel_threshold = pixel_threshold    # grey-level difference from the empty scene
+        self.area_threshold = area_threshold      # foreground fraction that escalates to the detector
+        self.learn_rate = learn_rate              # drift tracking on clearly empty tier-1 frames
+        self.confirm_rate = confirm_rate          # update when the detector confirms nobody is there
+        self.recheck_interval = recheck_interval  # run the detector at least this often (s)
+        self.enabled = enabled
+        self.empty_scene = None
+        self.last_foreground = 0.0
+        self.last_full = 0.0
+        self.tier1_runs = 0
+        self.tier2_runs = 0
+        self.escalations = {"disabled": 0, "locked": 0, "presence": 0, "recheck": 0, "learning": 0}
+
+    def should_detect(self, frame, locked=False, now=None):
+        """Tier 1 on frame; True when the full detector should run on it"""
+        now = time.monotonic() if now is None else now
+        self.tier1_runs += 1
+        reason = None
+        if not self.enabled:
+            reason = "disabled"
+        elif locked:
+            reason = "locked"
+        elif self.empty_scene is None:
+            reason = "learning"
+        else:
+            small = sample_grid(frame, self.grid)
+            if small.shape != self.empty_scene.shape:
+                self.empty_scene = None
+                reason = "learning"
+            else:
+                diff = np.abs(small - self.empty_scene)
+                self.last_foreground = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+                if self.last_foreground >= self.area_threshold:
+                    reason = "presence"
+                elif now - self.last_full >= self.recheck_interval:
+                    reason = "recheck"
+                elif self.last_foreground < self.area_threshold / 2:
+                    self.empty_scene += self.learn_rate * (small - self.empty_scene)
+
+        if reason is None:
+            return False
+        self.escalations[reason] += 1
+        self.tier2_runs += 1
+        self.last_full = now
+        return True
+
+    def report(self, frame, found):
+        """Result of the full detector on frame; nobody found teaches the empty scene"""
+        if found:
+            return
+        small = sample_grid(frame, self.grid)
+        if self.empty_scene is None or self.empty_scene.shape != small.shape:
+            self.empty_scene = small
+        else:
+            self.empty_scene += self.confirm_rate * (small - self.empty_scene)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "tier1_runs": self.tier1_runs,
+            "tier2_runs": self.tier2_runs,
+            "tier2_ratio": round(self.tier2_runs / self.tier1_runs, 3) if self.tier1_runs else 0.0,
+            "escalations": dict(self.escalations),
+            "last_foreground": round(self.last_foreground, 4),
+            "empty_scene_learned": self.empty_scene is not None,
+        }
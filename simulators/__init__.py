@@ -0,0 +1,9 @@
+"""Local stand-ins for the robot's ESP8266 motor controller and ESP32-CAM.
+
+Run both with `python -m simulators` from the repository root and point
+the entry points at them through ESP8266_IP / ESP32_STREAM_URL.
+"""
+from simulators.esp8266 import ESP8266Simulator
+from simulators.esp32_cam import ESP32CamSimulator, load_frames, synthetic_frames
+
+__all__ = ["ESP8266Simulator", "ESP32CamSimulator", "load_frames", "synthetic_frames"]
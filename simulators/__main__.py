@@ -0,0 +1,96 @@
+"""Run the ESP8266 and ESP32-CAM simulators together.
+
+  python -m simulators                              # synthetic frames, clean link
+  python -m simulators --stream drive.mjpeg --fps 15 --jitter-ms 40 --loss 0.05
+  python -m simulators --event-frame 75 --log commands.jsonl
+
+Then start an entry point against them, e.g.
+
+  ESP8266_IP=127.0.0.1 ESP32_STREAM_URL=http://127.0.0.1:8081/stream python unified_app.py
+
+--event-frame N reports frame-to-command latency: the time from the first
+delivery of frame N (e.g. where a person enters a recording) to the first
+motion command the simulated ESP8266 receives after it.
+"""
+import argparse
+import time
+
+from simulators.esp8266 import ESP8266Simulator
+from simulators.esp32_cam import ESP32CamSimulator, load_frames, synthetic_frames
+
+
+def command_latency(cam, esp, frame_index):
+    sent = cam.first_sent(frame_index)
+    if sent is None:
+        return None
+    for arrival, command in esp.commands():
+        if arrival >= sent and command.split(':')[0] in ("FORWARD", "BACKWARD", "LEFT", "RIGHT"):
+            return arrival - sent
+    return None
+
+
+def command_rates(esp, seconds):
+    counts = {}
+    for _, command in esp.commands():
+        name = command.split(':')[0]
+        counts[name] = counts.get(name, 0) + 1
+    total = sum(counts.values())
+    return total, round(total / seconds, 2) if seconds > 0 else 0.0, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m simulators", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stream', help="directory of .jpg frames or a recorded MJPEG stream (default: synthetic)")
+    parser.add_argument('--fps', type=float, default=15.0)
+    parser.add_argument('--http-port', type=int, default=8081)
+    parser.add_argument('--udp-port', type=int, default=8888)
+    parser.add_argument('--status-port', type=int, default=8889)
+    parser.add_argument('--status-interval', type=float, default=0.5, help="seconds between DIST packets")
+    parser.add_argument('--distance', type=int, default=0, help="ultrasonic reading in cm (0 = no echo)")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="max extra delay per frame and packet")
+    parser.add_argument('--loss', type=float, default=0.0, help="drop probability per frame and packet")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--event-frame', type=int, help="measure command latency from this frame")
+    parser.add_argument('--log', help="write the command log (JSON lines) here on exit")
+    parser.add_argument('--duration', type=float, default=0.0, help="stop after this many seconds (0 = Ctrl+C)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every command")
+    args = parser.parse_args()
+
+    frames = load_frames(args.stream) if args.stream else synthetic_frames()
+    if not frames:
+        parser.error("no frames found")
+    jitter = args.jitter_ms / 1000.0
+    cam = ESP32CamSimulator(frames, port=args.http_port, fps=args.fps, jitter=jitter,
+                            loss=args.loss, seed=args.seed).start()
+    esp = ESP8266Simulator(port=args.udp_port, status_port=args.status_port,
+                           status_interval=args.status_interval, distance=args.distance,
+                           jitter=jitter, loss=args.loss, seed=args.seed, verbose=args.verbose).start()
+
+    start = time.time()
+    try:
+        while not args.duration or time.time() - start < args.duration:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.time() - start
+    cam.stop()
+    esp.stop()
+
+    total, rate, counts = command_rates(esp, elapsed)
+    print(f"\n[SIM] {elapsed:.1f}s: camera {cam.stats()}")
+    print(f"[SIM] ESP8266 {esp.stats()}")
+    print(f"[SIM] {total} commands applied ({rate}/s): {counts}")
+    if args.event_frame is not None:
+        latency = command_latency(cam, esp, args.event_frame)
+        if latency is None:
+            print(f"[SIM] no motion command after frame {args.event_frame}")
+        else:
+            print(f"[SIM] frame {args.event_frame} -> first motion command: {latency * 1000:.0f} ms")
+    if args.log:
+        esp.save_log(args.log)
+        print(f"[SIM] command log written to {args.log}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""HTTP stand-in for the ESP32-CAM stream server (esp_cam_code.ino).
+
+GET /stream answers with multipart/x-mixed-replace using the firmware's
+boundary and part layout (part header, JPEG, then "\\r\\n--boundary\\r\\n"),
+replaying recorded JPEGs at fps. jitter delays individual frames and
+loss skips them, like a congested Wi-Fi link. The send time of every
+frame is logged so command latency can be measured against it.
+"""
+import glob
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mjpeg_demux import MJPEGDemuxer
+
+PART_BOUNDARY = "123456789000000000000987654321"
+STREAM_CONTENT_TYPE = "multipart/x-mixed-replace;boundary=" + PART_BOUNDARY
+STREAM_BOUNDARY = ("\r\n--" + PART_BOUNDARY + "\r\n").encode()
+STREAM_PART = "Content-Type: image/jpeg\r\nContent-Length: %u\r\n\r\n"
+
+
+def load_frames(source):
+    """JPEGs from a directory of .jpg files or a recorded MJPEG stream"""
+    if os.path.isdir(source):
+        frames = []
+        for path in sorted(glob.glob(os.path.join(source, '*.jpg')) + glob.glob(os.path.join(source, '*.jpeg'))):
+            with open(path, 'rb') as f:
+                frames.append(f.read())
+        return frames
+    demuxer = MJPEGDemuxer(max_frame_size=4 << 20)
+    frames = []
+    with open(source, 'rb') as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            frames.extend(demuxer.feed(chunk))
+    return frames
+
+
+def synthetic_frames(count=150, width=320, height=240):
+    """Empty room for the first half, then a figure walking across"""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    room = cv2.GaussianBlur(rng.integers(40, 200, (height, width, 3), dtype=np.uint8), (21, 21), 0)
+    frames = []
+    for i in range(count):
+        frame = room.copy()
+        if i >= count // 2:
+            x = (i - count // 2) * 4 % (width + 40) - 40
+            cv2.rectangle(frame, (x, height // 4), (x + 40, height - 20), (230, 230, 230), -1)
+        frames.append(cv2.imencode('.jpg', frame)[1].tobytes())
+    return frames
+
+
+class ESP32CamSimulator:
+    def __init__(self, frames, host="0.0.0.0", port=8081, fps=15.0, jitter=0.0, loss=0.0,
+                 loop=True, seed=None):
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.fps = fps
+        self.jitter = jitter  # max extra delay per frame in seconds
+        self.loss = loss      # probability of skipping a frame
+        self.loop = loop
+        self.random = random.Random(seed)
+        self.server = None
+        self.thread = None
+        self.log = []         # (send time, frame index) for every frame written
+        self.clients = 0
+        self.sent = 0
+        self.skipped = 0
+
+    @property
+    def url(self):
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"http://{host}:{self.server.server_address[1] if self.server else self.port}/stream"
+
+    def start(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.split('?')[0] != "/stream":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", STREAM_CONTENT_TYPE)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                simulator.clients += 1
+                try:
+                    simulator._stream(self.wfile)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    simulator.clients -= 1
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="esp32cam-http", daemon=True)
+        self.thread.start()
+        print(f"[SIM] ESP32-CAM serving {len(self.frames)} frames at {self.url} ({self.fps} fps)")
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _stream(self, wfile):
+        interval = 1.0 / self.fps if self.fps > 0 else 0.0
+        due = time.monotonic()
+        index = 0
+        while True:
+            if index >= len(self.frames):
+                if not self.loop:
+                    return
+                index = 0
+            if interval:
+                due += interval
+                time.sleep(max(0.0, due - time.monotonic()))
+            if self.loss and self.random.random() < self.loss:
+                self.skipped += 1
+                index += 1
+                continue
+            if self.jitter:
+                time.sleep(self.random.uniform(0.0, self.jitter))
+            jpeg = self.frames[index]
+            wfile.write((STREAM_PART % len(jpeg)).encode())
+            wfile.write(jpeg)
+            wfile.write(STREAM_BOUNDARY)
+            wfile.flush()
+            self.log.append((time.time(), index))
+            self.sent += 1
+            index += 1
+
+    def first_sent(self, frame_index):
+        """Send time of the first delivery of frame_index, or None"""
+        for sent, index in self.log:
+            if index == frame_index:
+                return sent
+        return None
+
+    def stats(self):
+        return {"frames": len(self.frames), "sent": self.sent, "skipped": self.skipped,
+                "clients": self.clients, "fps": self.fps}
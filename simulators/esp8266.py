@@ -0,0 +1,226 @@
+"""UDP stand-in for the ESP8266 motor controller (esp8266_udp_listener.ino).
+
+Commands are parsed the way the firmware parses them: "TYPE:value" sets
+a speed (constrained to the firmware's ranges) and, for FORWARD,
+BACKWARD, LEFT and RIGHT, starts that motion; bare words are matched
+exactly. While the simulated ultrasonic distance is inside
+safe_distance the robot is held stopped and commands are ignored, as in
+the firmware's loop(). Once a command has been received, "DIST:<cm>"
+packets go back to the sender's status_port every status_interval.
+
+Every packet is logged with its arrival time (time.time(), so logs from
+separate processes line up) to measure command rates and end-to-end
+latency. jitter and loss apply to both directions; like a real Wi-Fi
+link, jitter can reorder commands.
+"""
+import heapq
+import json
+import random
+import socket
+import threading
+import time
+
+MOTIONS = ("FORWARD", "BACKWARD", "LEFT", "RIGHT", "STOP", "MOTOR_TEST", "FORWARD_DIFF")
+
+
+def constrain(value, low, high):
+    return max(low, min(high, value))
+
+
+def to_int(text):
+    """Arduino String.toInt(): leading integer, 0 when there is none"""
+    digits = ""
+    for i, ch in enumerate(text.strip()):
+        if ch.isdigit() or (i == 0 and ch in "+-"):
+            digits += ch
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+class ESP8266Simulator:
+    def __init__(self, host="0.0.0.0", port=8888, status_port=8889, status_interval=0.5,
+                 distance=0, safe_distance=50, jitter=0.0, loss=0.0, seed=None, verbose=False):
+        self.host = host
+        self.port = port
+        self.status_port = status_port
+        self.status_interval = status_interval
+        self.distance = distance            # cm, or a callable returning cm (0 = no echo)
+        self.safe_distance = safe_distance
+        self.jitter = jitter                # max extra one-way delay in seconds
+        self.loss = loss                    # probability of dropping a packet
+        self.verbose = verbose
+        self.random = random.Random(seed)
+        self.sock = None
+        self.status_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.python_ip = None
+        self.running = False
+        self.threads = []
+        self._cond = threading.Condition()
+        self._queue = []  # (due, order, arrival, payload, sender)
+        self._order = 0
+
+        # Robot state as the firmware keeps it
+        self.motion = "STOP"
+        self.forward_speed = 80
+        self.turn_speed = 80
+        self.left_motor_speed = 150
+        self.right_motor_speed = 150
+
+        self.log = []
+        self.received = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.unknown = 0
+        self.status_sent = 0
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.host, self.port))
+        self.sock.settimeout(0.2)
+        self.running = True
+        for target, name in ((self._receive_loop, "esp8266-rx"), (self._apply_loop, "esp8266-apply"),
+                             (self._status_loop, "esp8266-status")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        print(f"[SIM] ESP8266 listening on udp {self.host}:{self.port}, DIST to port {self.status_port}")
+        return self
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify()
+        for thread in self.threads:
+            thread.join(1.0)
+        if self.sock:
+            self.sock.close()
+        self.status_sock.close()
+
+    def current_distance(self):
+        return int(self.distance() if callable(self.distance) else self.distance)
+
+    def _delay(self):
+        return self.random.uniform(0.0, self.jitter) if self.jitter else 0.0
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                payload, sender = self.sock.recvfrom(255)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            arrival = time.time()
+            self.received += 1
+            if self.loss and self.random.random() < self.loss:
+                self.dropped += 1
+                self.log.append({"time": arrival, "raw": payload.decode(errors='replace'), "dropped": True})
+                continue
+            with self._cond:
+                self._order += 1
+                heapq.heappush(self._queue, (time.monotonic() + self._delay(), self._order, arrival, payload, sender))
+                self._cond.notify()
+
+    def _apply_loop(self):
+        while self.running:
+            with self._cond:
+                while self.running:
+                    if not self._queue:
+                        self._cond.wait(0.2)
+                        continue
+                    delay = self._queue[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self.running:
+                    return
+                _, _, arrival, payload, sender = heapq.heappop(self._queue)
+            self._handle(payload, sender, arrival)
+
+    def _handle(self, payload, sender, arrival):
+        command = payload.decode(errors='replace')
+        entry = {"time": arrival, "applied": time.time(), "raw": command}
+        distance = self.current_distance()
+        if 0 < distance < self.safe_distance:
+            # The firmware stops and returns before reading the packet
+            self.motion = "STOP"
+            self.blocked += 1
+            entry["blocked"] = True
+            self.log.append(entry)
+            return
+        self.python_ip = sender[0]
+        entry["action"] = self.execute(command)
+        self.log.append(entry)
+        if self.verbose:
+            print(f"[SIM] ESP8266 <- {command} ({self.motion} F{self.forward_speed} T{self.turn_speed})")
+
+    def execute(self, command):
+        """Apply one command like esp8266_udp_listener.ino; returns the resulting action"""
+        if command.find(':') > 0:
+            cmd_type, _, value = command.partition(':')
+            speed = to_int(value)
+            if cmd_type == "SPEED":
+                self.forward_speed = constrain(speed, 50, 255)
+                self.turn_speed = constrain(speed, 30, 150)
+                return "SPEED"
+            if cmd_type == "LEFT_SPEED":
+                self.left_motor_speed = constrain(speed, 50, 255)
+                return "LEFT_SPEED"
+            if cmd_type == "RIGHT_SPEED":
+                self.right_motor_speed = constrain(speed, 50, 255)
+                return "RIGHT_SPEED"
+            if cmd_type in ("FORWARD", "BACKWARD"):
+                self.forward_speed = constrain(speed, 100, 255)
+                self.motion = cmd_type
+                return cmd_type
+            if cmd_type in ("LEFT", "RIGHT"):
+                self.turn_speed = constrain(speed, 80, 200)
+                self.motion = cmd_type
+                return cmd_type
+        elif command in MOTIONS:
+            self.motion = command
+            return command
+        self.unknown += 1
+        return None
+
+    def _status_loop(self):
+        while self.running:
+            time.sleep(self.status_interval)
+            if self.python_ip is None:
+                continue
+            if self.loss and self.random.random() < self.loss:
+                continue
+            delay = self._delay()
+            if delay:
+                time.sleep(delay)
+            try:
+                message = f"DIST:{self.current_distance()}"
+                self.status_sock.sendto(message.encode(), (self.python_ip, self.status_port))
+                self.status_sent += 1
+            except OSError as e:
+                print(f"[SIM] status send error: {e}")
+
+    def commands(self):
+        """Applied commands as (time applied after jitter, raw command)"""
+        return [(e["applied"], e["raw"]) for e in self.log if e.get("action")]
+
+    def save_log(self, path):
+        with open(path, 'w') as f:
+            for entry in self.log:
+                f.write(json.dumps(entry) + "\n")
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "unknown": self.unknown,
+            "status_sent": self.status_sent,
+            "motion": self.motion,
+            "forward_speed": self.forward_speed,
+            "turn_speed": self.turn_speed,
+        }
@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
 # start_servers.py - Start both main robot control and AI chatbot servers
+import os
 import subprocess
 import sys
 import time
 import threading
 
+def start_camera_service():
+    """Start the camera service, the only process that opens the camera"""
+    print("[STARTUP] Starting camera service...")
+    try:
+        subprocess.run([sys.executable, "camera_service.py"], check=True)
+    except KeyboardInterrupt:
+        print("[STARTUP] Camera service stopped by user")
+    except Exception as e:
+        print(f"[STARTUP] Camera service error: {e}")
+
 def start_main_server():
     """Start the main robot control server"""
     print("[STARTUP] Starting main robot control server...")
     try:
-        subprocess.run([sys.executable, "main2.py"], check=True)
+        # Track from the camera service's frames instead of opening the camera
+        env = dict(os.environ, CAMERA_MODE="shared")
+        subprocess.run([sys.executable, "main2.py"], check=True, env=env)
     except KeyboardInterrupt:
         print("[STARTUP] Main server stopped by user")
     except Exception as e:
@@ -30,14 +43,18 @@ if __name__ == "__main__":
     print("=" * 50)
     print("🤖 ROBOT CONTROL SYSTEM STARTUP")
     print("=" * 50)
+    print("Camera service: shared memory 'robot_camera'")
     print("Main Robot Control: http://localhost:5000")
     print("AI Voice Assistant: http://localhost:5001")
     print("=" * 50)
     
-    # Start both servers in separate threads
+    # Start the camera service and both servers in separate threads
+    camera_thread = threading.Thread(target=start_camera_service, daemon=True)
     main_thread = threading.Thread(target=start_main_server, daemon=True)
     chatbot_thread = threading.Thread(target=start_chatbot_server, daemon=True)
     
+    camera_thread.start()
+    time.sleep(1)  # main2 and the chatbot attach to the camera service's frames
     main_thread.start()
     chatbot_thread.start()
     
@@ -0,0 +1,183 @@
+"""Constant-velocity target tracking between inference frames.
+
+The trackers used to keep a short list of scores and x positions, average
+them with pop(0) and fall back to the last seen x when inference skipped a
+frame. TargetTracker keeps an alpha-beta filter per detected person in
+fixed-size numpy arrays (position, velocity, size, confidence, hit/miss
+counters), associates each new set of detections with the predicted
+tracks by nearest distance inside a gate, and can be asked for the
+followed target's predicted position at any time, so the steering logic
+runs on every camera frame rather than only on frames with inference.
+A track is only followed once it has matched min_hits detections, so a
+single false positive never steers the robot. An update from a cropped
+inference passes its region; tracks predicted outside it were not
+looked at and keep coasting without counting a miss.
+"""
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# x, y, width, height in frame pixels (x, y predicted to the query time),
+# vx in pixels per second. missed counts consecutive updates that did not
+# match this track (0 = seen in the latest inference).
+Track = namedtuple("Track", "id x y width height vx confidence hits missed")
+
+
+class TargetTracker:
+    def __init__(self, max_tracks=8, alpha=0.6, beta=0.2, gate=80.0, max_missed=15,
+                 max_predict=0.5, confidence_alpha=0.5, min_hits=2, bounds=None):
+        self.alpha = alpha              # position correction gain
+        self.beta = beta                # velocity correction gain
+        self.gate = gate                # max association distance in pixels
+        self.max_missed = max_missed    # updates without a match before a track is dropped
+        self.max_predict = max_predict  # seconds a track may be extrapolated past its last match
+        self.confidence_alpha = confidence_alpha
+        self.min_hits = min_hits        # matched detections before a track can be locked
+        self.bounds = bounds            # (width, height) to clamp predictions to
+        self._lock = threading.Lock()
+
+        self.pos = np.zeros((max_tracks, 2))
+        self.vel = np.zeros((max_tracks, 2))
+        self.size = np.zeros((max_tracks, 2))
+        self.conf = np.zeros(max_tracks)
+        self.stamp = np.zeros(max_tracks)
+        self.hits = np.zeros(max_tracks, dtype=np.int32)
+        self.missed = np.zeros(max_tracks, dtype=np.int32)
+        self.ids = np.zeros(max_tracks, dtype=np.int64)
+        self.active = np.zeros(max_tracks, dtype=bool)
+        self.locked = -1  # slot of the followed track
+        self.next_id = 1
+        self.updates = 0
+        self.created = 0
+        self.lost = 0
+
+    def update(self, detections, now=None, roi=None):
+        """Fold one inference result (objects with x, y, width, height, confidence) in.
+
+        roi is the (x0, y0, x1, y1) the inference covered, None for the whole frame.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.updates += 1
+            slots = np.flatnonzero(self.active)
+            dt = np.clip(now - self.stamp[slots], 0.0, self.max_predict)
+            predicted = self.pos[slots] + self.vel[slots] * dt[:, None]
+            matched_slots, matched_dets = self._associate(predicted, detections)
+
+            a, b, ca = self.alpha, self.beta, self.confidence_alpha
+            for i, d in zip(matched_slots, matched_dets):
+                slot = slots[i]
+                det = detections[d]
+                residual = np.array((det.x, det.y), dtype=float) - predicted[i]
+                self.pos[slot] = predicted[i] + a * residual
+                if dt[i] > 0:
+                    self.vel[slot] += (b / dt[i]) * residual
+                self.size[slot] += a * (np.array((det.width, det.height), dtype=float) - self.size[slot])
+                self.conf[slot] += ca * (det.confidence - self.conf[slot])
+                self.stamp[slot] = now
+                self.hits[slot] += 1
+                self.missed[slot] = 0
+
+            # Unmatched tracks coast from their last match until max_missed
+            unmatched = np.setdiff1d(slots, slots[matched_slots] if matched_slots else [])
+            if roi is not None and len(unmatched):
+                x0, y0, x1, y1 = roi
+                at = self.pos[unmatched] + self.vel[unmatched] * dt[np.searchsorted(slots, unmatched), None]
+                inside = (at[:, 0] >= x0) & (at[:, 0] < x1) & (at[:, 1] >= y0) & (at[:, 1] < y1)
+                unmatched = unmatched[inside]
+            self.missed[unmatched] += 1
+            self.conf[unmatched] *= 1.0 - ca
+            dropped = unmatched[self.missed[unmatched] > self.max_missed]
+            self.active[dropped] = False
+            self.lost += len(dropped)
+
+            for d in range(len(detections)):
+                if d not in matched_dets:
+                    self._spawn(detections[d], now)
+
+            if self.locked >= 0 and not self.active[self.locked]:
+                self.locked = -1
+            if self.locked < 0:
+                seen = np.flatnonzero(self.active & (self.missed == 0) & (self.hits >= self.min_hits))
+                if len(seen):
+                    self.locked = int(seen[np.argmax(self.conf[seen])])
+
+    def _associate(self, predicted, detections):
+        """Greedy nearest-first matching of predicted tracks to detections"""
+        if not len(predicted) or not detections:
+            return [], []
+        points = np.array([(d.x, d.y) for d in detections], dtype=float)
+        cost = np.linalg.norm(predicted[:, None, :] - points[None, :, :], axis=2)
+        track_used = np.zeros(len(predicted), dtype=bool)
+        det_used = np.zeros(len(points), dtype=bool)
+        matched_slots, matched_dets = [], []
+        for flat in np.argsort(cost, axis=None):
+            i, d = divmod(int(flat), len(points))
+            if cost[i, d] > self.gate:
+                break
+            if track_used[i] or det_used[d]:
+                continue
+            track_used[i] = det_used[d] = True
+            matched_slots.append(i)
+            matched_dets.append(d)
+        return matched_slots, matched_dets
+
+    def _spawn(self, det, now):
+        free = np.flatnonzero(~self.active)
+        if not len(free):
+            return
+        slot = free[0]
+        self.pos[slot] = (det.x, det.y)
+        self.vel[slot] = 0.0
+        self.size[slot] = (det.width, det.height)
+        self.conf[slot] = det.confidence
+        self.stamp[slot] = now
+        self.hits[slot] = 1
+        self.missed[slot] = 0
+        self.ids[slot] = self.next_id
+        self.active[slot] = True
+        self.next_id += 1
+        self.created += 1
+
+    def _predict(self, slot, now):
+        dt = min(max(now - self.stamp[slot], 0.0), self.max_predict)
+        x, y = self.pos[slot] + self.vel[slot] * dt
+        if self.bounds is not None:
+            x = min(max(x, 0.0), self.bounds[0] - 1)
+            y = min(max(y, 0.0), self.bounds[1] - 1)
+        return Track(id=int(self.ids[slot]), x=int(x), y=int(y),
+                     width=int(self.size[slot, 0]), height=int(self.size[slot, 1]),
+                     vx=float(self.vel[slot, 0]), confidence=float(self.conf[slot]),
+                     hits=int(self.hits[slot]), missed=int(self.missed[slot]))
+
+    def target(self, now=None):
+        """Predicted state of the followed track, or None when nothing is locked"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.locked < 0:
+                return None
+            return self._predict(self.locked, now)
+
+    def others(self, now=None):
+        """Predicted states of every other live track"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [self._predict(slot, now) for slot in np.flatnonzero(self.active)
+                    if slot != self.locked]
+
+    def reset(self):
+        with self._lock:
+            self.active[:] = False
+            self.locked = -1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracks": int(self.active.sum()),
+                "locked_id": int(self.ids[self.locked]) if self.locked >= 0 else None,
+                "updates": self.updates,
+                "created": self.created,
+                "lost": self.lost,
+            }
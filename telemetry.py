@@ -0,0 +1,96 @@
+"""Background receiver for ESP8266 ultrasonic telemetry.
+
+The ESP8266 sends "DIST:<cm>" datagrams to the status port roughly every
+500 ms. A dedicated thread blocks on the socket and handles every packet
+as it arrives, so the vision loop never waits on the network; it just
+reads the latest sample, which is published as one immutable tuple.
+"""
+import collections
+import socket
+import threading
+import time
+
+
+class TelemetryReceiver:
+    def __init__(self, port, history_size=240, safe_distance=100):
+        self.port = port
+        self.safe_distance = safe_distance
+        self.history = collections.deque(maxlen=history_size)  # (timestamp, distance_cm)
+        self.latest = (0.0, 0)  # (timestamp, distance_cm); replaced, never mutated
+        self.packets = 0
+        self.bad_packets = 0
+        self.running = False
+        self.thread = None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('', port))
+        self.sock.settimeout(0.5)  # only bounds how long stop() waits
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.sock.close()
+
+    def _run(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self.running:
+                    print(f"[TELEMETRY] Socket error: {e}")
+                    time.sleep(0.5)
+                continue
+            self._handle(data)
+
+    def _handle(self, data):
+        msg = data.decode(errors='ignore').strip()
+        if not msg.startswith("DIST:"):
+            self.bad_packets += 1
+            return
+        try:
+            distance = int(msg[5:])
+        except ValueError:
+            self.bad_packets += 1
+            return
+        sample = (time.time(), distance)
+        self.history.append(sample)
+        self.latest = sample
+        self.packets += 1
+
+    @property
+    def distance(self):
+        return self.latest[1]
+
+    @property
+    def safe(self):
+        distance = self.latest[1]
+        return distance > self.safe_distance or distance == 0
+
+    def age(self):
+        """Seconds since the last DIST packet, or None if none arrived yet"""
+        ts = self.latest[0]
+        return time.time() - ts if ts else None
+
+    def snapshot(self, seconds=None):
+        ts, distance = self.latest
+        history = list(self.history)
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            history = [s for s in history if s[0] >= cutoff]
+        return {
+            "distance": distance,
+            "safe": self.safe,
+            "timestamp": ts or None,
+            "age": self.age(),
+            "packets": self.packets,
+            "bad_packets": self.bad_packets,
+            "history": [{"t": round(t, 3), "distance": d} for t, d in history],
+        }
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 import cv2
+import os
 import time
 
-url = "http://10.30.152.68/stream"
+url = os.environ.get("ESP32_STREAM_URL", "http://10.30.152.68/stream")
 print(f"Testing connection to: {url}")
 
 # Try different backends
@@ -0,0 +1,61 @@
+"""Unit tests for InferenceEngine's interpreter pool.
+
+  python -m pytest test_inference_engine.py
+"""
+import os
+import queue
+import threading
+import unittest
+
+import numpy as np
+
+from inference_engine import DEFAULT_MODEL, InferenceEngine
+
+MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_MODEL)
+
+
+@unittest.skipUnless(os.path.exists(MODEL), f"{DEFAULT_MODEL} not present")
+class InferenceEnginePoolTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = InferenceEngine(MODEL, num_threads=1, pool_size=2)
+        detail = self.engine.input_details[0]
+        self.sample = np.zeros(detail['shape'], dtype=detail['dtype'])
+
+    def test_two_sessions_borrow_distinct_interpreters(self):
+        with self.engine.session() as first, self.engine.session() as second:
+            self.assertIsNot(first, second)
+            self.assertEqual(self.engine.stats()["pool_free"], 0)
+            with self.assertRaises(queue.Empty):
+                with self.engine.session(timeout=0.01):
+                    pass
+        self.assertEqual(self.engine.stats()["pool_free"], 2)
+
+    def test_sessions_invoke_concurrently(self):
+        errors = []
+
+        def run():
+            try:
+                with self.engine.session(timeout=5) as interpreter:
+                    interpreter.set_tensor(self.engine.input_details[0]['index'], self.sample)
+                    self.engine.invoke(interpreter)
+                    self.engine.output(interpreter)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.engine.stats()["pool_free"], 2)
+
+    def test_session_is_returned_after_an_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.engine.session():
+                raise RuntimeError("inference failed")
+        self.assertEqual(self.engine.stats()["pool_free"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Unit tests for CommandScheduler's ordering of STOP against scheduled commands.
+
+  python -m pytest test_motor_scheduler.py
+"""
+import threading
+import time
+import unittest
+
+from motor_scheduler import CommandScheduler
+
+
+class CommandSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.scheduler = CommandScheduler(self.send).start()
+
+    def tearDown(self):
+        self.release.set()
+        self.scheduler.shutdown()
+
+    def send(self, cmd, tag=None):
+        if cmd == "SLOW":
+            self.release.wait(1.0)
+        self.sent.append(cmd)
+
+    def test_pulse_sends_stop_after_duration(self):
+        self.scheduler.pulse("LEFT", 20)
+        time.sleep(0.1)
+        self.assertEqual(self.sent, ["LEFT", "STOP"])
+
+    def test_stop_cancels_pending_follow_ups(self):
+        self.scheduler.burst("LEFT", 3, 50)
+        time.sleep(0.02)
+        self.scheduler.stop()
+        time.sleep(0.2)
+        self.assertEqual(self.sent, ["LEFT", "STOP"])
+
+    def test_stop_waits_for_command_in_flight(self):
+        self.scheduler.send_now("SLOW")
+        time.sleep(0.02)  # the thread is inside send("SLOW")
+        threading.Timer(0.05, self.release.set).start()
+        self.scheduler.stop()
+        self.assertEqual(self.sent, ["SLOW", "STOP"])
+
+    def test_cancel_drops_command_queued_behind_one_in_flight(self):
+        self.scheduler.send_now("SLOW")
+        time.sleep(0.02)
+        self.scheduler.send_now("LEFT")
+        time.sleep(0.02)
+        self.scheduler.cancel()
+        self.release.set()
+        time.sleep(0.05)
+        self.assertEqual(self.sent, ["SLOW"])
+        self.assertEqual(self.scheduler.stats()["pending"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Unit tests for TargetTracker's locking, ROI miss accounting and prediction.
+
+  python -m pytest test_target_tracker.py
+"""
+import unittest
+
+from fomo_decoder import Detection
+from target_tracker import TargetTracker
+
+
+def person(x, y=100, confidence=0.9):
+    return Detection(x=x, y=y, width=20, height=40, confidence=confidence, label=0, cells=1)
+
+
+class TargetTrackerTest(unittest.TestCase):
+    def test_no_lock_before_min_hits(self):
+        tracker = TargetTracker(min_hits=3)
+        tracker.update([person(100)], now=1.0)
+        tracker.update([person(102)], now=1.1)
+        self.assertIsNone(tracker.target(1.1))
+        tracker.update([person(104)], now=1.2)
+        target = tracker.target(1.2)
+        self.assertIsNotNone(target)
+        self.assertEqual(target.hits, 3)
+
+    def test_single_false_positive_is_not_locked(self):
+        tracker = TargetTracker(min_hits=2)
+        tracker.update([person(100)], now=1.0)
+        tracker.update([], now=1.1)
+        self.assertIsNone(tracker.target(1.1))
+
+    def test_tracks_outside_roi_do_not_count_misses(self):
+        tracker = TargetTracker(gate=50)
+        for now in (1.0, 1.1):
+            tracker.update([person(100), person(400)], now=now)
+        for i in range(5):
+            tracker.update([person(100)], now=1.2 + i * 0.1, roi=(50, 50, 200, 200))
+        (outside,) = tracker.others(1.6)
+        self.assertEqual(outside.missed, 0)
+        tracker.update([person(100)], now=1.7)  # full frame: now it is a miss
+        (outside,) = tracker.others(1.7)
+        self.assertEqual(outside.missed, 1)
+
+    def test_unmatched_track_inside_roi_counts_a_miss(self):
+        tracker = TargetTracker(gate=50)
+        for now in (1.0, 1.1):
+            tracker.update([person(100)], now=now)
+        tracker.update([], now=1.2, roi=(50, 50, 200, 200))
+        self.assertEqual(tracker.target(1.2).missed, 1)
+
+    def test_prediction_stops_after_max_predict(self):
+        tracker = TargetTracker(max_predict=0.5)
+        tracker.update([person(100)], now=1.0)
+        tracker.update([person(110)], now=1.1)
+        vx = tracker.target(1.1).vx
+        self.assertGreater(vx, 0)
+        at_limit = tracker.target(1.1 + 0.5)
+        self.assertEqual(tracker.target(1.1 + 5.0).x, at_limit.x)
+        self.assertGreater(at_limit.x, tracker.target(1.1).x)
+
+    def test_locked_track_kept_with_more_detections_than_tracks(self):
+        tracker = TargetTracker(max_tracks=2, gate=50)
+        for now in (1.0, 1.1):
+            tracker.update([person(100)], now=now)
+        locked = tracker.target(1.1).id
+        crowd = [person(300), person(400, confidence=0.99), person(500), person(102, confidence=0.5)]
+        tracker.update(crowd, now=1.2)
+        self.assertEqual(tracker.target(1.2).id, locked)
+        self.assertEqual(tracker.stats()["tracks"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Unit tests for CommandTransport's STOP, coalescing and keepalive rules.
+
+  python -m pytest test_udp_transport.py
+"""
+import socket
+import time
+import unittest
+
+from udp_transport import CommandTransport
+
+
+class CommandTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sink.bind(("127.0.0.1", 0))
+        self.sink.settimeout(0.05)
+        self.transports = []
+
+    def tearDown(self):
+        for transport in self.transports:
+            transport.close()
+        self.sink.close()
+
+    def transport(self, min_interval=0.05, keepalive_interval=None):
+        host, port = self.sink.getsockname()
+        transport = CommandTransport(host, port, min_interval=min_interval,
+                                     keepalive_interval=keepalive_interval, verbose=False)
+        self.transports.append(transport)
+        return transport
+
+    def received(self, wait=0.0):
+        time.sleep(wait)
+        packets = []
+        while True:
+            try:
+                packets.append(self.sink.recv(256).decode())
+            except socket.timeout:
+                return packets
+
+    def test_stop_burst_sends_one_packet(self):
+        transport = self.transport(keepalive_interval=0.5)
+        for _ in range(10):
+            transport.send("STOP")
+        self.assertEqual(self.received(0.1), ["STOP"])
+        self.assertEqual(transport.suppressed, 9)
+
+    def test_stop_after_other_command_is_sent_at_once(self):
+        transport = self.transport(min_interval=0.2, keepalive_interval=0.5)
+        transport.send("STOP")
+        transport.send("FORWARD:200")  # queued behind the rate limit
+        transport.send("STOP")  # intent back to what is on the wire
+        transport.send("LEFT:120")
+        time.sleep(0.25)  # LEFT goes out at the next free slot
+        transport.send("STOP")
+        self.assertEqual(self.received(), ["STOP", "LEFT:120", "STOP"])
+
+    def test_repeated_stop_without_keepalive_is_sent_min_interval_apart(self):
+        transport = self.transport(min_interval=0.1, keepalive_interval=None)
+        transport.send("STOP")
+        transport.send("STOP")
+        time.sleep(0.15)
+        transport.send("STOP")
+        self.assertEqual(self.received(), ["STOP", "STOP"])
+        self.assertEqual(transport.suppressed, 1)
+
+    def test_stop_bypasses_rate_limit_and_drops_queued_command(self):
+        transport = self.transport(min_interval=0.2)
+        transport.send("FORWARD:200")
+        transport.send("LEFT:120")  # queued behind the rate limit
+        transport.send("STOP")
+        self.assertEqual(self.received(0.3), ["FORWARD:200", "STOP"])
+        self.assertEqual(transport.coalesced, 1)
+
+    def test_changes_within_interval_coalesce_to_latest(self):
+        transport = self.transport(min_interval=0.1)
+        transport.send("FORWARD:200")
+        transport.send("LEFT:120")
+        transport.send("RIGHT:120")
+        self.assertEqual(self.received(0.2), ["FORWARD:200", "RIGHT:120"])
+        self.assertEqual(transport.coalesced, 1)
+
+    def test_duplicate_is_suppressed_within_keepalive_interval(self):
+        transport = self.transport(keepalive_interval=0.5)
+        transport.send("FORWARD:200")
+        transport.send("FORWARD:200")
+        self.assertEqual(self.received(), ["FORWARD:200"])
+        self.assertEqual(transport.suppressed, 1)
+
+    def test_last_command_is_resent_as_keepalive(self):
+        transport = self.transport(keepalive_interval=0.1)
+        transport.send("STOP")
+        packets = self.received(0.35)
+        self.assertGreaterEqual(len(packets), 3)
+        self.assertEqual(set(packets), {"STOP"})
+        self.assertGreaterEqual(transport.keepalives, 2)
+
+    def test_no_keepalive_when_disabled(self):
+        transport = self.transport(keepalive_interval=None)
+        transport.send("STOP")
+        self.assertEqual(self.received(0.3), ["STOP"])
+        self.assertEqual(transport.keepalives, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
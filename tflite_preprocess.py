@@ -0,0 +1,99 @@
+"""Preprocessing that writes frames straight into the TFLite input tensor.
+
+The old path resized twice (capture -> 320x240 -> model size), flipped
+channels with [:, :, ::-1], called np.expand_dims and then allocated
+int16 and int8 arrays to quantize with a hard-coded -128 offset.
+
+InputPreprocessor resizes once from the source frame into a preallocated
+scratch buffer and then does colour ordering, normalisation and
+quantization in a single table lookup through a 256-entry LUT built from
+the model's real (scale, zero_point). The lookup (cv2.LUT, or np.take in
+the PIL-only path) writes into a view of the interpreter's own input
+buffer, so no frame-sized arrays are allocated per call.
+"""
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # main2_no_cv runs with PIL only
+    cv2 = None
+
+
+def build_lut(dtype, quantization):
+    """Map every uint8 pixel value to the model's input representation"""
+    pixels = np.arange(256, dtype=np.float64) / 255.0
+    scale, zero_point = quantization if quantization else (0.0, 0)
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return pixels.astype(dtype)
+    if not scale:
+        # Unquantized integer input: feed raw pixel values
+        return np.arange(256).astype(dtype)
+    info = np.iinfo(dtype)
+    return np.clip(np.round(pixels / scale + zero_point), info.min, info.max).astype(dtype)
+
+
+class InputPreprocessor:
+    def __init__(self, interpreter, input_index=0, interpolation=None, source_order="BGR"):
+        detail = interpreter.get_input_details()[input_index]
+        _, self.height, self.width, self.channels = detail['shape']
+        self.index = detail['index']
+        self.dtype = detail['dtype']
+        self.quantization = detail.get('quantization')
+        self.lut = build_lut(self.dtype, self.quantization)
+        self.source_order = source_order
+        self.interpolation = interpolation
+        if cv2 is not None and interpolation is None:
+            self.interpolation = cv2.INTER_LINEAR
+        self._tensor = interpreter.tensor(self.index)
+        self._resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._gray = np.empty((self.height, self.width), dtype=np.uint8)
+        self._rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def __call__(self, frame, roi=None):
+        """Fill the input tensor from frame (optionally the (x0, y0, x1, y1) crop roi)"""
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1] if isinstance(frame, np.ndarray) else frame.crop(roi)
+        if isinstance(frame, np.ndarray) and cv2 is not None:
+            pixels = self._prepare_array(frame)
+        else:
+            if isinstance(frame, np.ndarray):
+                from PIL import Image
+                frame = Image.fromarray(frame)
+            pixels = self._prepare_pil(frame)
+
+        # The view must not outlive this call: the interpreter refuses to
+        # invoke while references to its buffers exist.
+        tensor = self._tensor()[0]
+        out = tensor[:, :, 0] if self.channels == 1 else tensor
+        if cv2 is not None and pixels.flags.c_contiguous:
+            cv2.LUT(pixels, self.lut, dst=out)
+        else:
+            np.take(self.lut, pixels, out=out, mode='clip')
+        del tensor, out
+
+    def _prepare_array(self, frame):
+        size = (self.width, self.height)
+        if frame.ndim == 2 or frame.shape[2] == 1:
+            gray = frame.reshape(frame.shape[:2])
+            cv2.resize(gray, size, dst=self._gray, interpolation=self.interpolation)
+            if self.channels == 1:
+                return self._gray
+            cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR, dst=self._resized)
+            return self._resized
+        cv2.resize(frame, size, dst=self._resized, interpolation=self.interpolation)
+        if self.channels == 1:
+            code = cv2.COLOR_BGR2GRAY if self.source_order == "BGR" else cv2.COLOR_RGB2GRAY
+            cv2.cvtColor(self._resized, code, dst=self._gray)
+            return self._gray
+        if self.source_order == "BGR":
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            return self._rgb
+        return self._resized
+
+    def _prepare_pil(self, image):
+        image = image.resize((self.width, self.height))
+        if self.channels == 1:
+            return np.asarray(image.convert('L'))
+        return np.asarray(image.convert('RGB'))
@@ -0,0 +1,154 @@
+"""Rate-limited UDP command transport for the ESP8266.
+
+Callers state their current intent with send(cmd) as often as they like;
+the transport decides what actually goes on the wire:
+
+- STOP cancels any queued command and, when it changes what is on the
+  wire, is sent immediately regardless of the rate limit. Callers repeat
+  STOP on every idle tick; those repeats are suppressed like any other
+  duplicate (or sent min_interval apart with keepalives off) and the
+  keepalive covers a lost one.
+- A changed command is sent at once if the last packet is older than
+  min_interval, otherwise it is queued and sent at the next free slot.
+  If several changes arrive within one interval only the latest is sent
+  (the others are counted as coalesced).
+- Repeating the command already on the wire is suppressed until it is
+  keepalive_interval old.
+- The flush thread re-sends the last command every keepalive_interval
+  while nothing else is sent, so a lost packet (a lost STOP above all:
+  the firmware has no command timeout) is recovered without the caller
+  asking. keepalive_interval=None turns the keepalives off.
+
+With a metrics Registry every sendto is timed and counted per command.
+A command may carry a tag (e.g. the frame it was derived from); on_send
+is called with (cmd, tag, send_time) for every tagged packet sent.
+"""
+import socket
+import threading
+import time
+
+
+class CommandTransport:
+    def __init__(self, host, port, min_interval=0.05, keepalive_interval=0.5,
+                 stop_commands=("STOP",), verbose=True, metrics=None, on_send=None):
+        self.addr = (host, port)
+        self.min_interval = min_interval
+        self.keepalive_interval = keepalive_interval
+        self.stop_commands = stop_commands
+        self.verbose = verbose
+        self.on_send = on_send
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.send_seconds = None
+        self.commands_sent = None
+        if metrics is not None:
+            self.send_seconds = metrics.histogram("udp_send_seconds", "UDP sendto latency")
+            self.commands_sent = metrics.counter("udp_commands_total", "UDP commands sent", ("command",))
+        self._cond = threading.Condition()
+        self._pending = None  # (cmd, tag)
+        self.last_cmd = None
+        self.last_send_time = 0.0
+        self.sent = 0
+        self.coalesced = 0
+        self.suppressed = 0
+        self.keepalives = 0
+        self.errors = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._flush_loop, name="udp-transport", daemon=True)
+        self.thread.start()
+
+    def send(self, cmd, tag=None):
+        """Declare the current command intent"""
+        with self._cond:
+            now = time.monotonic()
+            since_last = now - self.last_send_time
+
+            if cmd in self.stop_commands:
+                if self._pending is not None:
+                    self._pending = None
+                    self.coalesced += 1
+                repeat_after = self.min_interval if self.keepalive_interval is None else self.keepalive_interval
+                if cmd != self.last_cmd or since_last >= repeat_after:
+                    self._transmit(cmd, now, tag)
+                else:
+                    self.suppressed += 1
+                return
+
+            if cmd == self.last_cmd:
+                if self._pending is not None:
+                    # Intent went back to what is already on the wire
+                    self._pending = None
+                    self.coalesced += 1
+                    return
+                if self.keepalive_interval is None or since_last < self.keepalive_interval:
+                    self.suppressed += 1
+                    return
+
+            if self._pending is None and since_last >= self.min_interval:
+                self._transmit(cmd, now, tag)
+                return
+
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (cmd, tag)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.thread.join()
+        self.sock.close()
+
+    def _flush_loop(self):
+        with self._cond:
+            while self.running:
+                if self._pending is None:
+                    if self.last_cmd is None or self.keepalive_interval is None:
+                        self._cond.wait()
+                        continue
+                    delay = self.last_send_time + self.keepalive_interval - time.monotonic()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    self.keepalives += 1
+                    self._transmit(self.last_cmd, time.monotonic())
+                    continue
+                delay = self.last_send_time + self.min_interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                (cmd, tag), self._pending = self._pending, None
+                self._transmit(cmd, time.monotonic(), tag)
+
+    def _transmit(self, cmd, now, tag=None):
+        # Called with the condition held so sends are strictly ordered
+        try:
+            t0 = time.perf_counter()
+            self.sock.sendto(cmd.encode(), self.addr)
+            if self.send_seconds is not None:
+                self.send_seconds.observe(time.perf_counter() - t0)
+                self.commands_sent.inc(cmd.split(':')[0])
+        except Exception as e:
+            self.errors += 1
+            print("[UDP] send error:", e)
+            return
+        self.last_cmd = cmd
+        self.last_send_time = now
+        self.sent += 1
+        self._cond.notify()  # the flush thread restarts its keepalive timer
+        if tag is not None and self.on_send is not None:
+            self.on_send(cmd, tag, now)
+        if self.verbose:
+            print("[UDP] ->", cmd)
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "suppressed": self.suppressed,
+            "keepalives": self.keepalives,
+            "errors": self.errors,
+            "last_cmd": self.last_cmd,
+            "min_interval": self.min_interval,
+            "keepalive_interval": self.keepalive_interval,
+        }
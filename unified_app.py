@@ -2,33 +2,56 @@ from flask import Flask, render_template_string, Response, request, jsonify
 import cv2
 import requests
 import numpy as np
+import os
 import socket
 import threading
 import time
 import mediapipe as mp
 
+from frame_hub import FrameHub
+from lazy_frame import LazyFrame
+from metrics import Registry, instrument_flask
+from mjpeg_demux import MJPEGDemuxer
+
 app = Flask(__name__)
 
 # Configuration
-ESP32_STREAM_URL = "http://10.30.152.68/stream"
-ESP8266_IP = "10.30.152.186"
-ESP8266_PORT = 8888
+ESP32_STREAM_URL = os.environ.get("ESP32_STREAM_URL", "http://10.30.152.68/stream")
+ESP8266_IP = os.environ.get("ESP8266_IP", "10.30.152.186")
+ESP8266_PORT = int(os.environ.get("ESP8266_PORT", 8888))
+METRICS_ENABLED = True  # Step histograms and counters for /metrics
+VIDEO_PASS_THROUGH = True  # Manual mode: relay the ESP32's JPEGs to /video_feed as received
+POSE_INPUT_SIZE = (256, 192)  # Pose runs on the newest frame decoded at the reduced scale covering this
+CENTER_THRESHOLD = 0.08       # Nose offset from centre, as a fraction of frame width, that triggers a turn
 
 # Global state
 current_mode = "manual"  # manual, auto
 camera_source = "esp32"  # esp32, local
-frame_lock = threading.Lock()
-current_frame = None
+camera_frame = LazyFrame()  # Newest camera frame; ESP32 JPEGs are decoded only when pixels are needed
 running = True
+video_hub = FrameHub()
+
+metrics = Registry(prefix="robot_", enabled=METRICS_ENABLED)
+instrument_flask(app, metrics)
+steps = metrics.histogram("step_seconds", "Latency of individual processing steps", ("step",))
+frames_received = metrics.counter("camera_frames_total", "Frames received per camera source", ("source",))
+commands_sent = metrics.counter("udp_commands_total", "UDP commands sent", ("command",))
+metrics.gauge("video_clients", "Connected /video_feed clients", video_hub.client_count)
 
 # UDP socket
 udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-# MediaPipe for human detection
+# MediaPipe for human detection; `pose` is only ever used by pose_worker
 mp_pose = mp.solutions.pose
 pose = mp_pose.Pose(static_image_mode=False, model_complexity=0,
                     min_detection_confidence=0.45, min_tracking_confidence=0.4)
 
+# Latest pose result, replaced as a whole by pose_worker and read by the
+# encoder: seq of the frame, normalised landmarks (or None), nose (x, y)
+# when visible, and the command sent for it
+pose_state = {"seq": 0, "landmarks": None, "nose": None, "command": None}
+pose_stats = {"processed": 0, "skipped": 0, "fps": 0.0, "last_latency_ms": 0.0}
+
 class CameraManager:
     def __init__(self):
         self.esp32_active = False
@@ -60,34 +83,27 @@ class CameraManager:
         self.local_active = False
         
     def _esp32_stream_worker(self):
-        global current_frame
         try:
             stream = requests.get(ESP32_STREAM_URL, stream=True, timeout=5)
-            bytes_data = b''
+            demuxer = MJPEGDemuxer()
             for chunk in stream.iter_content(chunk_size=2048):
                 if not self.esp32_active or not running:
                     break
-                bytes_data += chunk
-                a = bytes_data.find(b'\\xff\\xd8')
-                b = bytes_data.find(b'\\xff\\xd9')
-                if a != -1 and b != -1:
-                    jpg = bytes_data[a:b+2]
-                    bytes_data = bytes_data[b+2:]
-                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
-                        with frame_lock:
-                            current_frame = frame
+                jpg = demuxer.latest(chunk)
+                if jpg is not None:
+                    frames_received.inc("esp32")
+                    camera_frame.set_jpeg(jpg)
         except Exception as e:
             print(f"ESP32 stream error: {e}")
             
     def _local_camera_worker(self):
-        global current_frame
         cap = cv2.VideoCapture(0)  # Use default camera
         while self.local_active and running:
-            ret, frame = cap.read()
+            with steps.time("capture"):
+                ret, frame = cap.read()
             if ret:
-                with frame_lock:
-                    current_frame = frame
+                frames_received.inc("local")
+                camera_frame.set_pixels(frame)
             time.sleep(0.033)  # ~30 FPS
         cap.release()
 
@@ -96,65 +112,109 @@ camera_manager = CameraManager()
 def send_robot_command(command):
     """Send UDP command to ESP8266"""
     try:
-        udp_socket.sendto(command.encode(), (ESP8266_IP, ESP8266_PORT))
+        with steps.time("udp_send"):
+            udp_socket.sendto(command.encode(), (ESP8266_IP, ESP8266_PORT))
+        commands_sent.inc(command.split(':')[0])
         print(f"Sent: {command}")
         return True
     except Exception as e:
         print(f"UDP error: {e}")
         return False
 
-def generate_frames():
-    """Generate video frames for streaming"""
-    global current_frame
+def frame_encoder_loop():
+    """Render and encode each new camera frame once for all viewers (pose runs in pose_worker)"""
+    last_seq = 0
     while running:
-        with frame_lock:
-            frame = current_frame.copy() if current_frame is not None else None
-            
+        seq = camera_frame.seq
+        if seq == last_seq or not video_hub.has_clients():
+            time.sleep(0.01)
+            continue
+        last_seq = seq
+        auto = current_mode == "auto"
+
+        if not auto and VIDEO_PASS_THROUGH:
+            _, jpeg = camera_frame.jpeg()
+            if jpeg is not None:
+                video_hub.publish(jpeg)  # nothing is drawn in manual mode
+                continue
+
+        with steps.time("jpeg_decode"):
+            _, frame = camera_frame.pixels()
         if frame is None:
-            time.sleep(0.1)
             continue
             
-        # Process frame based on mode
-        if current_mode == "auto":
-            frame = process_human_detection(frame)
+        # Draw the pose worker's latest result; the decode is shared, so copy
+        if auto:
+            frame = draw_pose(frame.copy(), pose_state)
             
-        ret, buffer = cv2.imencode('.jpg', frame)
+        with steps.time("jpeg_encode"):
+            ret, buffer = cv2.imencode('.jpg', frame)
         if ret:
-            yield (b'--frame\\r\\n'
-                   b'Content-Type: image/jpeg\\r\\n\\r\\n' + buffer.tobytes() + b'\\r\\n')
-        time.sleep(0.033)
+            video_hub.publish(buffer.tobytes())
 
-def process_human_detection(frame):
-    """Process frame for human detection and tracking"""
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(rgb_frame)
-    
-    if results.pose_landmarks:
-        # Draw pose landmarks
-        mp.solutions.drawing_utils.draw_landmarks(
-            frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-        
-        # Simple tracking logic
-        landmarks = results.pose_landmarks.landmark
-        nose = landmarks[mp_pose.PoseLandmark.NOSE]
-        
-        if nose.visibility > 0.5:
-            h, w = frame.shape[:2]
-            x = int(nose.x * w)
-            
-            # Draw center line and target
-            cv2.line(frame, (w//2, 0), (w//2, h), (0, 255, 0), 2)
-            cv2.circle(frame, (x, int(nose.y * h)), 10, (0, 0, 255), -1)
-            
-            # Simple tracking commands
-            center_threshold = 50
-            if x < w//2 - center_threshold:
-                send_robot_command("LEFT")
-            elif x > w//2 + center_threshold:
-                send_robot_command("RIGHT")
-            else:
-                send_robot_command("FORWARD")
-    
+def generate_frames(remote=None):
+    """Generate video frames for streaming"""
+    return video_hub.stream(remote, running=lambda: running)
+
+def pose_worker():
+    """Run pose detection once per new frame in auto mode and steer the robot"""
+    global pose_state
+    last_seq = 0
+    window_start, window_count = time.monotonic(), 0
+    while running:
+        seq = camera_frame.seq
+        if current_mode != "auto":
+            last_seq = seq  # frames seen while idle are not skipped ones
+            time.sleep(0.005)
+            continue
+        if seq == last_seq:
+            time.sleep(0.005)
+            continue
+        if last_seq:
+            pose_stats["skipped"] += max(0, seq - last_seq - 1)
+
+        t0 = time.perf_counter()
+        seq, frame = camera_frame.pixels(POSE_INPUT_SIZE)
+        last_seq = seq
+        if frame is None:
+            continue
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with steps.time("pose"):
+            results = pose.process(rgb_frame)
+
+        nose = None
+        command = None
+        if results.pose_landmarks:
+            landmark = results.pose_landmarks.landmark[mp_pose.PoseLandmark.NOSE]
+            if landmark.visibility > 0.5:
+                nose = (landmark.x, landmark.y)
+                # Simple tracking commands
+                if nose[0] < 0.5 - CENTER_THRESHOLD:
+                    command = "LEFT"
+                elif nose[0] > 0.5 + CENTER_THRESHOLD:
+                    command = "RIGHT"
+                else:
+                    command = "FORWARD"
+        if command is not None and current_mode == "auto":
+            send_robot_command(command)
+        pose_state = {"seq": seq, "landmarks": results.pose_landmarks, "nose": nose, "command": command}
+
+        pose_stats["processed"] += 1
+        pose_stats["last_latency_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        window_count += 1
+        now = time.monotonic()
+        if now - window_start >= 1.0:
+            pose_stats["fps"] = round(window_count / (now - window_start), 1)
+            window_start, window_count = now, 0
+
+def draw_pose(frame, state):
+    """Draw a pose result (normalised coordinates) onto a frame of any size"""
+    if state["landmarks"] is not None:
+        mp.solutions.drawing_utils.draw_landmarks(frame, state["landmarks"], mp_pose.POSE_CONNECTIONS)
+    if state["nose"] is not None:
+        h, w = frame.shape[:2]
+        cv2.line(frame, (w//2, 0), (w//2, h), (0, 255, 0), 2)
+        cv2.circle(frame, (int(state["nose"][0] * w), int(state["nose"][1] * h)), 10, (0, 0, 255), -1)
     return frame
 
 HTML_TEMPLATE = """
@@ -254,7 +314,26 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    return Response(generate_frames(request.remote_addr), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video_stats')
+def video_stats():
+    stats = video_hub.stats()
+    stats["camera"] = camera_frame.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics_export():
+    # Prometheus text by default, ?format=json for a readable summary
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary())
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/pose_stats')
+def pose_status():
+    stats = dict(pose_stats)
+    stats["command"] = pose_state["command"]
+    return jsonify(stats)
 
 @app.route('/set_mode', methods=['POST'])
 def set_mode():
@@ -297,6 +376,8 @@ def control():
 if __name__ == '__main__':
     # Start with ESP32 camera by default
     camera_manager.start_esp32_stream()
+    threading.Thread(target=frame_encoder_loop, daemon=True).start()
+    threading.Thread(target=pose_worker, daemon=True).start()
     
     try:
         app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)